@@ -0,0 +1,156 @@
+"""JSON API лент только для чтения.
+
+Ленты те же, что и на HTML-страницах: все посты, группа и автор.
+Страницы выбираются курсором (``?cursor=``, см. ``CursorPaginator``),
+размер страницы задаёт ``?limit=``, состав полей — ``?fields=id,text``.
+Ответ отдаётся потоком (``StreamingHttpResponse``): посты читаются из
+базы через ``iterator()`` и сразу сериализуются, поэтому память не
+зависит от размера страницы, а ссылка на следующую страницу идёт в
+конце документа.
+
+ETag зависит от поколения ленты в кэше (``posts.caching``), которое
+меняется при любом изменении её постов и комментариев, и от параметров
+запроса; Last-Modified — дата самого свежего поста ленты. Если ничего
+не изменилось, отвечаем 304 без чтения постов. Ответы, прочитанные
+с реплики, этих заголовков не получают: отстающая реплика отдала бы
+старые посты с ETag нового поколения.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from . import caching, routers
+from .models import Group, Post
+from .pagination import FORWARD, CursorPaginator
+
+User = get_user_model()
+
+
+def _image(post):
+    return post.image.url if post.image else None
+
+
+FIELDS = {
+    "id": lambda post: post.pk,
+    "text": lambda post: post.text,
+    "pub_date": lambda post: post.pub_date.isoformat(),
+    "author": lambda post: post.author.username,
+    "group": lambda post: post.group.slug if post.group_id else None,
+    "image": _image,
+    "comment_count": lambda post: post.comment_count,
+    "url": lambda post: reverse("post", args=[post.author.username,
+                                              post.pk]),
+}
+# Связанные объекты, которые нужны полям.
+RELATED = {"author": "author", "group": "group", "url": "author"}
+# Посты сериализуются и отдаются серверу пачками этого размера.
+CHUNK_SIZE = 100
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _parse(request):
+    """Поля и размер страницы из запроса или текст ошибки."""
+    names = [name for name in request.GET.get("fields", "").split(",")
+             if name]
+    unknown = set(names) - set(FIELDS)
+    if unknown:
+        return None, None, f"неизвестные поля: {', '.join(sorted(unknown))}"
+    try:
+        limit = int(request.GET.get("limit", settings.ITEMS_PER_PAGE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        return None, None, (f"limit должен быть от 1 до "
+                            f"{settings.API_MAX_PAGE_SIZE}")
+    return names or list(FIELDS), limit, None
+
+
+def _feed_response(request, posts, scope):
+    names, limit, error = _parse(request)
+    if error:
+        return _error(error)
+
+    etag = last_modified = None
+    if not routers.reading_replica():
+        etag = quote_etag(hashlib.md5(
+            f"{caching.feed_version(scope)}|{request.GET.urlencode()}"
+            .encode()).hexdigest())
+        latest = posts.order_by("-pub_date").values_list("pub_date",
+                                                         flat=True).first()
+        last_modified = int(latest.timestamp()) if latest else None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+    related = sorted({RELATED[name] for name in names if name in RELATED})
+    posts = posts.select_related(*related) if related else posts
+    paginator = CursorPaginator(posts, limit)
+    rows = paginator.forward_rows(request.GET.get("cursor"))
+    fields = [(name, FIELDS[name]) for name in names]
+    response = StreamingHttpResponse(
+        _stream(request, paginator, rows, fields, limit),
+        content_type="application/json")
+    if etag is not None:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _stream(request, paginator, rows, fields, limit):
+    yield '{"results":['
+    chunk = []
+    count = 0
+    last = None
+    for post in rows.iterator(chunk_size=CHUNK_SIZE):
+        count += 1
+        if count > limit:
+            break
+        last = post
+        item = json.dumps({name: value(post) for name, value in fields},
+                          ensure_ascii=False)
+        chunk.append(item if count == 1 else "," + item)
+        if len(chunk) >= CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk)
+    next_url = None
+    if count > limit:
+        query = request.GET.copy()
+        query["cursor"] = paginator.encode_cursor(FORWARD, last)
+        next_url = f"{request.path}?{query.urlencode()}"
+    yield f'],"next":{json.dumps(next_url)}}}'
+
+
+@require_safe
+def index(request):
+    return _feed_response(request, Post.objects.all(), caching.ALL_POSTS)
+
+
+@require_safe
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error("группа не найдена", status=404)
+    return _feed_response(request, group.posts.all(),
+                          caching.group_scope(group.id))
+
+
+@require_safe
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return _error("автор не найден", status=404)
+    return _feed_response(request, author.posts.all(),
+                          caching.author_scope(author.id))
@@ -0,0 +1,21 @@
+"""Бэкенды кэша для профилей ``settings.CACHE_PROFILES``."""
+from django.core.cache.backends import filebased
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Файловый кэш, ``has_key`` которого не падает на удалённом файле.
+
+    В Django 2.2 ``has_key`` (а через него и ``add``) сначала проверяет,
+    есть ли файл, и только потом открывает его. Если другой процесс
+    удалил файл между этими шагами — например, снял блокировку
+    ``caching.get_or_build`` — запрос падает с ``FileNotFoundError``.
+    В Django 3.2.15 исправлено так же.
+    """
+
+    def has_key(self, key, version=None):
+        fname = self._key_to_file(key, version)
+        try:
+            with open(fname, "rb") as f:
+                return not self._is_expired(f)
+        except FileNotFoundError:
+            return False
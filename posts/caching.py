@@ -0,0 +1,128 @@
+"""Кэш страниц лент с поколениями вместо фиксированного времени жизни.
+
+Каждая лента (все посты, группа, автор, подписки пользователя) имеет
+поколение. Оно входит в ключ фрагмента, поэтому после изменения поста
+достаточно записать новое поколение: старые фрагменты просто перестают
+читаться и вытесняются сами, а время жизни фрагментов можно держать
+большим.
+
+Поколение — метка времени в наносекундах, и новое поколение
+записывается ``set``, а не ``incr``: в файловом кэше и кэше в базе
+``incr`` — это чтение и запись, и одновременные смены поколения из
+разных процессов терялись бы. ``set`` атомарен во всех бэкендах, а две
+одновременные смены в худшем случае запишут одну из двух новых меток.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import profiling, routers
+
+ALL_POSTS = "posts"
+# Меняется после каждого пересчёта рекомендаций (posts.suggestions).
+SUGGESTIONS = "suggestions"
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def author_scope(author_id):
+    return f"author:{author_id}"
+
+
+def follows_scope(user_id):
+    return f"follows:{user_id}"
+
+
+def comments_scope(post_id):
+    """Комментарии поста вместе с именами их авторов."""
+    return f"comments:{post_id}"
+
+
+def post_scopes(author_id, group_id):
+    """Ленты, в которых виден пост автора ``author_id``."""
+    scopes = [ALL_POSTS, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def card_key(post):
+    """Ключ отрендеренной карточки поста; меняется с ``post.updated``.
+
+    ``updated`` сдвигается и при переименовании группы или автора поста
+    (``posts.signals``), ведь их имена тоже на карточке.
+    """
+    return f"post-card:{post.pk}:{post.updated.timestamp()}"
+
+
+def _generation_key(scope):
+    return f"feed-generation:{scope}"
+
+
+def feed_version(*scopes):
+    """Строка с лентами ``scopes`` и их поколениями для ключа фрагмента."""
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Если поколение вытеснили из кэша, новая метка не совпадёт
+            # со старыми.
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return ";".join(f"{scope}={found[key]}"
+                    for scope, key in zip(scopes, keys))
+
+
+def bump(*scopes):
+    """Начать новое поколение для ``scopes`` после фиксации транзакции.
+
+    Если сменить поколение раньше, читатель может увидеть новый ключ,
+    ещё читая старые строки, и надолго закэшировать под ним старый
+    фрагмент.
+    """
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    generation = time.time_ns()
+    cache.set_many({_generation_key(scope): generation for scope in scopes},
+                   timeout=None)
+
+
+def get_or_build(key, build, timeout=None):
+    """Прочитать ``key`` из кэша или построить значение один раз.
+
+    Если значения нет, его строит только тот процесс, который первым
+    взял блокировку; остальные ждут готового значения не дольше
+    ``FEED_CACHE_LOCK_TIMEOUT`` секунд и только потом строят сами.
+    Значение, построенное при чтении с реплики, хранится не дольше
+    ``REPLICA_CACHE_TIMEOUT``.
+    """
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+    if routers.reading_replica():
+        timeout = min(timeout, settings.REPLICA_CACHE_TIMEOUT)
+    value = cache.get(key)
+    profiling.record_cache(value is not None)
+    if value is not None:
+        return value
+    lock_timeout = settings.FEED_CACHE_LOCK_TIMEOUT
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            value = build()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
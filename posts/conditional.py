@@ -0,0 +1,122 @@
+"""Условные ответы и Cache-Control для HTML-страниц лент и постов.
+
+ETag страницы — хэш того, от чего зависит её HTML: поколения ленты
+в кэше (``posts.caching``), даты изменения поста, счётчиков автора,
+пользователя и строки запроса. Поколение ленты меняется при каждом
+новом, изменённом или удалённом посте и комментарии, поэтому отдельно
+читать дату самого свежего из них не нужно. ETag читается из кэша и
+не больше чем одним запросом по индексу, поэтому на совпавший
+``If-None-Match`` страница отвечает 304, не трогая шаблоны.
+
+Last-Modified не выставляется: одной даты, которая менялась бы при
+правке и удалении постов и при изменении счётчиков, у ленты нет.
+
+Ответы анонимам можно хранить в общем кэше обратного прокси не дольше
+``ANONYMOUS_CACHE_S_MAXAGE`` секунд; браузер каждый раз сверяет
+ETag. Ответы вошедшим пользователям — только в браузере и тоже со
+сверкой. ``Vary: Cookie`` не даёт прокси отдать анониму страницу
+пользователя с сессией.
+
+Страницы, прочитанные с реплики (``routers.reading_replica``), не
+получают ни ETag, ни общего кэширования: отстающая реплика отдала бы
+старую страницу с ETag нового поколения, и клиенты получали бы на неё
+304 до следующей смены поколения.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import caching, routers
+from .models import Group, Post
+
+User = get_user_model()
+
+AUTHOR_FIELDS = ("first_name", "last_name", "stats__posts_count",
+                 "stats__followers_count", "stats__following_count")
+
+
+def _etag(request, *parts):
+    user = request.user.pk if request.user.is_authenticated else ""
+    source = "|".join(map(str, (settings.RELEASE, user,
+                                request.GET.urlencode(), *parts)))
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def index_etag(request):
+    return _etag(request, caching.feed_version(caching.ALL_POSTS))
+
+
+def group_etag(request, slug):
+    group = (Group.objects.filter(slug=slug)
+             .values_list("pk", "title", "description").first())
+    if group is None:
+        return None
+    return _etag(request,
+                 caching.feed_version(caching.group_scope(group[0])),
+                 *group)
+
+
+def profile_etag(request, username):
+    author = (User.objects.filter(username=username)
+              .values_list("pk", *AUTHOR_FIELDS).first())
+    if author is None:
+        return None
+    # Кнопка подписки, список «подписаны из ваших подписок» и
+    # рекомендации зависят от подписок пользователя.
+    scopes = [caching.author_scope(author[0])]
+    if request.user.is_authenticated:
+        scopes += [caching.follows_scope(request.user.pk),
+                   caching.SUGGESTIONS]
+    return _etag(request, caching.feed_version(*scopes), *author)
+
+
+def post_etag(request, username, post_id):
+    # ``updated`` меняется при правке поста, а поколение комментариев —
+    # при добавлении, правке и удалении комментария и при смене имени
+    # его автора.
+    try:
+        post = (Post.objects.filter(pk=post_id, author__username=username)
+                .values_list("updated", *(f"author__{name}"
+                                          for name in AUTHOR_FIELDS))
+                .get())
+    except Post.DoesNotExist:
+        return None
+    return _etag(request,
+                 caching.feed_version(caching.comments_scope(post_id)),
+                 *post)
+
+
+def _cache_headers(request, response):
+    patch_vary_headers(response, ("Cookie",))
+    # Страница с CSRF-токеном ставит cookie, её нельзя отдавать другим.
+    shared = (not request.user.is_authenticated
+              and not request.META.get("CSRF_COOKIE_USED")
+              and not routers.reading_replica()
+              and response.status_code in (200, 304))
+    if shared:
+        patch_cache_control(response, public=True,
+                            max_age=settings.ANONYMOUS_CACHE_MAX_AGE,
+                            s_maxage=settings.ANONYMOUS_CACHE_S_MAXAGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+def cached_page(etag_func):
+    """Условный ответ по ``etag_func`` и заголовки кэширования."""
+    def decorator(view):
+        conditional = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if routers.reading_replica():
+                response = view(request, *args, **kwargs)
+            else:
+                response = conditional(request, *args, **kwargs)
+            _cache_headers(request, response)
+            return response
+        return wrapper
+    return decorator
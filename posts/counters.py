@@ -0,0 +1,92 @@
+"""Денормализованные счётчики комментариев, постов и подписок."""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def _bump(queryset, field, delta, **extra):
+    if delta < 0:
+        # Счётчик уже разошёлся с данными: не уходим в минус,
+        # его поправит reconcile_counters.
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta}, **extra)
+
+
+def bump_comments(post_id, delta):
+    # Число комментариев показано на карточке поста, поэтому меняется
+    # и версия карточки в кэше.
+    _bump(Post.objects.filter(pk=post_id), "comment_count", delta,
+          updated=timezone.now())
+
+
+def bump_user(user_id, field, delta):
+    """Изменить счётчик ``field`` в ``UserStats`` одним UPDATE.
+
+    Строка счётчиков создаётся вместе с пользователем; если её нет,
+    обновление пропускается до запуска ``reconcile_counters``.
+    """
+    _bump(UserStats.objects.filter(pk=user_id), field, delta)
+
+
+def bump_users(user_ids, field, delta):
+    """То же, что ``bump_user``, для многих пользователей сразу."""
+    _bump(UserStats.objects.filter(pk__in=user_ids), field, delta)
+
+
+def followers_count(user_id):
+    return (UserStats.objects.filter(pk=user_id)
+            .values_list("followers_count", flat=True).first() or 0)
+
+
+def _actual(model, field):
+    counts = (model.objects.filter(**{field: OuterRef("pk")})
+              .order_by().values(field)
+              .annotate(total=Count("pk")).values("total"))
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile():
+    """Пересчитать все счётчики и вернуть число исправленных строк."""
+    missing = User.objects.filter(stats__isnull=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk)
+         for pk in missing.values_list("pk", flat=True)],
+        batch_size=500,
+    )
+
+    posts = list(
+        Post.objects
+        .annotate(actual=_actual(Comment, "post"))
+        .exclude(comment_count=F("actual"))
+        .only("pk")
+    )
+    now = timezone.now()
+    for post in posts:
+        post.comment_count = post.actual
+        post.updated = now
+    Post.objects.bulk_update(posts, ["comment_count", "updated"],
+                             batch_size=500)
+
+    stats = list(
+        UserStats.objects
+        .annotate(actual_posts=_actual(Post, "author"),
+                  actual_followers=_actual(Follow, "author"),
+                  actual_following=_actual(Follow, "user"))
+        .exclude(posts_count=F("actual_posts"),
+                 followers_count=F("actual_followers"),
+                 following_count=F("actual_following"))
+    )
+    for row in stats:
+        row.posts_count = row.actual_posts
+        row.followers_count = row.actual_followers
+        row.following_count = row.actual_following
+    UserStats.objects.bulk_update(
+        stats, ["posts_count", "followers_count", "following_count"],
+        batch_size=500,
+    )
+    return len(posts) + len(stats)
@@ -0,0 +1,147 @@
+"""Лента подписок: раскладка при записи и чтение при запросе.
+
+Новый пост сразу попадает в ``FeedEntry`` каждого подписчика автора,
+поэтому ``follow_index`` читает ленту одним проходом по индексу
+``(user, post)``. Для авторов с очень большим числом подписчиков
+(``FeedPullAuthor``) раскладка не делается, их посты подмешиваются
+при чтении. Посты авторов, у которых подписчиков больше
+``FEED_FANOUT_ASYNC_FROM``, раскладываются в очереди задач, чтобы
+запрос автора не ждал тысяч вставок.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+
+from . import bulk, caching, tasks
+from .counters import followers_count
+from .models import FeedEntry, FeedPullAuthor, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+ENTRY_FIELDS = ("user", "post", "author", "pub_date")
+# Порядок ленты подписок для CursorPaginator: поля записи ленты, по
+# которым идёт индекс feed_entry_user_pub_date.
+FOLLOW_ORDERING = ("-feed_pub_date", "-feed_post_id")
+
+
+def is_pull_author(author_id):
+    return FeedPullAuthor.objects.filter(author_id=author_id).exists()
+
+
+def fan_out_post(post):
+    """Положить новый пост в ленты всех подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    follower_ids = (Follow.objects.filter(author_id=post.author_id)
+                    .values_list("user_id", flat=True))
+    pub_date = _db_date(post.pub_date)
+    _bulk_insert((user_id, post.id, post.author_id, pub_date)
+                 for user_id in follower_ids.iterator())
+
+
+def schedule_fan_out(post):
+    """Разложить новый пост сразу или, если подписчиков много, в очереди."""
+    if followers_count(post.author_id) > settings.FEED_FANOUT_ASYNC_FROM:
+        tasks.enqueue(fan_out, post_id=post.id)
+    else:
+        fan_out_post(post)
+
+
+def fan_out(post_id):
+    """Задача очереди: разложить пост ``post_id`` по лентам подписчиков."""
+    post = (Post.objects.filter(pk=post_id)
+            .only("id", "author_id", "pub_date").first())
+    if post is None:
+        return
+    fan_out_post(post)
+    # Ключи фрагментов ленты подписок включают поколение всех постов.
+    caching.bump(caching.ALL_POSTS)
+
+
+def backfill(user_id, *author_ids):
+    """Заполнить ленту новым подписчиком постами авторов."""
+    backfill_pairs((user_id, author_id) for author_id in author_ids)
+
+
+def backfill_pairs(pairs):
+    """Заполнить ленты по парам ``(подписчик, автор)``.
+
+    В ленту попадают только последние ``FEED_BACKFILL_LIMIT`` постов
+    автора: подписка на плодовитого автора стоит не больше этого числа
+    вставок, а старые посты остаются на странице автора.
+    """
+    followers = defaultdict(list)
+    for user_id, author_id in pairs:
+        followers[author_id].append(user_id)
+    author_ids = list(followers)
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        for author_id in FeedPullAuthor.objects.filter(
+                author_id__in=author_ids[start:start + BATCH_SIZE]
+        ).values_list("author_id", flat=True):
+            del followers[author_id]
+    for author_id, user_ids in followers.items():
+        posts = [(post_id, _db_date(pub_date)) for post_id, pub_date in
+                 Post.objects.filter(author_id=author_id)
+                 .order_by("-pub_date")
+                 .values_list("id", "pub_date")
+                 [:settings.FEED_BACKFILL_LIMIT]]
+        _bulk_insert((user_id, post_id, author_id, pub_date)
+                     for user_id in user_ids for post_id, pub_date in posts)
+
+
+def prune(user_id, *author_ids):
+    """Убрать из ленты посты авторов, от которых отписались."""
+    FeedEntry.objects.filter(user_id=user_id,
+                             author_id__in=author_ids).delete()
+
+
+def update_pull_status(*author_ids):
+    """Перевести на чтение по запросу авторов с подписчиками сверх
+    ``FEED_FANOUT_LIMIT``."""
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        popular = (UserStats.objects
+                   .filter(pk__in=author_ids[start:start + BATCH_SIZE],
+                           followers_count__gt=settings.FEED_FANOUT_LIMIT)
+                   .values_list("pk", flat=True))
+        FeedPullAuthor.objects.bulk_create(
+            [FeedPullAuthor(author_id=author_id) for author_id in popular],
+            ignore_conflicts=True)
+
+
+def follow_feed(user):
+    """Посты авторов, на которых подписан ``user``, по ``FOLLOW_ORDERING``.
+
+    Лента читается одним проходом по индексу записей ``user``. Если
+    среди авторов есть читаемые по запросу, их посты подмешиваются, и
+    тогда строки сортируются по дате самого поста.
+    """
+    pull_author_ids = list(
+        FeedPullAuthor.objects.filter(author__following__user=user)
+        .values_list("author_id", flat=True)
+    )
+    if not pull_author_ids:
+        return (Post.objects.filter(feed_entries__user=user)
+                .annotate(feed_pub_date=F("feed_entries__pub_date"),
+                          feed_post_id=F("feed_entries__post"))
+                .order_by(*FOLLOW_ORDERING))
+    inbox = FeedEntry.objects.filter(user=user).values("post_id")
+    return (Post.objects.filter(Q(id__in=inbox)
+                                | Q(author_id__in=pull_author_ids))
+            .annotate(feed_pub_date=F("pub_date"), feed_post_id=F("id"))
+            .order_by(*FOLLOW_ORDERING))
+
+
+def _db_date(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def _bulk_insert(entries):
+    """Вставить пачками строки ``(user_id, post_id, author_id, pub_date)``."""
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            bulk.insert_rows(FeedEntry, ENTRY_FIELDS, batch)
+            batch = []
+    bulk.insert_rows(FeedEntry, ENTRY_FIELDS, batch)
@@ -0,0 +1,121 @@
+"""Граф подписок: множества авторов пользователя и массовые подписки.
+
+Множество id авторов, на которых подписан пользователь, хранится в кэше
+под ключом с поколением ``follows_scope`` (``posts.caching``). Поколение
+меняется при каждой подписке и отписке, поэтому проверка «подписан ли
+я» — поиск в множестве без запроса к базе, пока подписки пользователя
+не изменились.
+
+``follow_many`` и ``unfollow_many`` меняют много подписок несколькими
+запросами на пачку и сами делают то, что для одной подписки делают
+сигналы ``Follow``: счётчики, ленты подписок и поколение кэша.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import caching, counters, feed
+from .bulk import delete_rows
+from .models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def followee_ids(user_id):
+    """Неизменяемое множество id авторов, на которых подписан ``user_id``."""
+    version = caching.feed_version(caching.follows_scope(user_id))
+    return caching.get_or_build(
+        f"followees:{version}",
+        lambda: frozenset(Follow.objects.filter(user_id=user_id)
+                          .values_list("author_id", flat=True)),
+        settings.FOLLOWEES_CACHE_TIMEOUT)
+
+
+def is_following(user, author_id):
+    return user.is_authenticated and author_id in followee_ids(user.pk)
+
+
+def followed_by_followees(user_id, author_id, limit=3):
+    """Кто из тех, на кого подписан ``user_id``, подписан на автора.
+
+    Возвращает до ``limit`` таких пользователей по алфавиту и их общее
+    число. Небольшое множество подписок передаётся в запрос списком,
+    и база проверяет каждую пару по уникальному индексу
+    ``(user, author)``; большое — подзапросом.
+    """
+    followees = followee_ids(user_id) - {author_id}
+    if not followees:
+        return [], 0
+    if len(followees) > BATCH_SIZE:
+        followees = (Follow.objects.filter(user_id=user_id)
+                     .values("author_id"))
+    ids = list(Follow.objects.filter(author_id=author_id,
+                                     user_id__in=followees)
+               .values_list("user_id", flat=True))
+    if not ids:
+        return [], 0
+    users = list(User.objects.filter(pk__in=ids)
+                 .order_by("username")[:limit])
+    return users, len(ids)
+
+
+@transaction.atomic
+def follow_many(user_id, author_ids):
+    """Подписать ``user_id`` на авторов; вернуть число новых подписок.
+
+    Себя, несуществующих пользователей и авторов, на которых подписка
+    уже есть, пропускает.
+    """
+    author_ids = sorted(set(author_ids) - {user_id})
+    added = 0
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        new = list(User.objects
+                   .filter(pk__in=author_ids[start:start + BATCH_SIZE])
+                   .exclude(following__user_id=user_id)
+                   .values_list("pk", flat=True))
+        if not new:
+            continue
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for author_id in new],
+            ignore_conflicts=True)
+        _count(user_id, new, 1)
+        feed.update_pull_status(*new)
+        feed.backfill(user_id, *new)
+        added += len(new)
+    if added:
+        caching.bump(caching.follows_scope(user_id))
+    return added
+
+
+@transaction.atomic
+def unfollow_many(user_id, author_ids):
+    """Отписать ``user_id`` от авторов; вернуть число удалённых подписок."""
+    author_ids = sorted(set(author_ids))
+    removed = 0
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        # Строки блокируются до конца транзакции, поэтому удаляются и
+        # учитываются в счётчиках и ленте ровно они. Сигналы post_delete
+        # пришлось бы отправлять на каждую строку, а их работа здесь
+        # делается одним запросом на пачку.
+        found = dict(Follow.objects.select_for_update().filter(
+            user_id=user_id,
+            author_id__in=author_ids[start:start + BATCH_SIZE],
+        ).values_list("pk", "author_id"))
+        if not found:
+            continue
+        delete_rows(Follow, found)
+        authors = list(found.values())
+        _count(user_id, authors, -1)
+        feed.prune(user_id, *authors)
+        removed += len(authors)
+    if removed:
+        caching.bump(caching.follows_scope(user_id))
+    return removed
+
+
+def _count(user_id, author_ids, delta):
+    counters.bump_user(user_id, "following_count", delta * len(author_ids))
+    counters.bump_users(author_ids, "followers_count", delta)
@@ -0,0 +1,57 @@
+"""Отправка писем через очередь задач.
+
+``QueuedEmailBackend`` подключается как ``EMAIL_BACKEND``, поэтому
+через него идут все письма сайта, в том числе письма сброса пароля из
+``django.contrib.auth``. Письмо сохраняется в задаче ``deliver``, а
+отправляет его ``EMAIL_DELIVERY_BACKEND`` уже в обработчике очереди.
+"""
+import base64
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import tasks
+
+FIELDS = ("subject", "body", "from_email", "to", "cc", "bcc", "reply_to",
+          "extra_headers")
+
+
+def serialize(message):
+    data = {field: getattr(message, field) for field in FIELDS}
+    data["alternatives"] = getattr(message, "alternatives", [])
+    data["attachments"] = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            raise ValueError("Вложения MIMEBase очередь писем не принимает")
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        data["attachments"].append(
+            [filename, base64.b64encode(content).decode(), mimetype])
+    return data
+
+
+def deserialize(data):
+    message = EmailMultiAlternatives(
+        subject=data["subject"], body=data["body"],
+        from_email=data["from_email"], to=data["to"], cc=data["cc"],
+        bcc=data["bcc"], reply_to=data["reply_to"],
+        headers=data["extra_headers"],
+        alternatives=[tuple(item) for item in data["alternatives"]])
+    for filename, content, mimetype in data["attachments"]:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def deliver(message):
+    """Задача очереди: отправить письмо настоящим бэкендом."""
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    connection.send_messages([deserialize(message)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            tasks.enqueue(deliver, message=serialize(message))
+        return len(email_messages)
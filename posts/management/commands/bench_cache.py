@@ -0,0 +1,118 @@
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+from queue import Empty
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from posts import caching
+
+
+def _zipf_choice(rng, size, exponent=1.1):
+    weights = [1 / (rank ** exponent) for rank in range(1, size + 1)]
+    return rng.choices(range(size), weights=weights)[0]
+
+
+def _worker(cache_config, seed, requests, keys, write_ratio,
+            published, results):
+    """Один воркер: читает фрагменты лент и иногда публикует пост."""
+    rng = random.Random(seed)
+    hits = misses = stale = 0
+    with override_settings(CACHES={"default": cache_config}):
+        for _ in range(requests):
+            if rng.random() < write_ratio:
+                # Пост уже сохранён, когда начинается смена поколения.
+                started = time.time_ns()
+                caching.bump(caching.ALL_POSTS)
+                with published.get_lock():
+                    published.value = max(published.value, started)
+            latest = published.value
+            version = caching.feed_version(caching.ALL_POSTS)
+            key = f"bench:{version}:{_zipf_choice(rng, keys)}"
+            built = []
+            # Фрагмент помнит, когда он построен.
+            fragment = caching.get_or_build(
+                key, lambda: built.append(1) or str(time.time_ns()))
+            if built:
+                misses += 1
+            else:
+                hits += 1
+            # Фрагмент построен до уже законченной публикации: смена
+            # поколения до этого процесса не дошла.
+            if int(fragment) < latest:
+                stale += 1
+    results.put((hits, misses, stale))
+
+
+class Command(BaseCommand):
+    help = ("Сравнить долю попаданий и устаревших чтений кэша лент "
+            "при нескольких процессах для разных профилей CACHES")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+",
+                            default=["locmem", "file"],
+                            choices=sorted(settings.CACHE_PROFILES))
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=2000,
+                            help="Запросов на один процесс")
+        parser.add_argument("--keys", type=int, default=200,
+                            help="Число разных фрагментов (страниц)")
+        parser.add_argument("--write-ratio", type=float, default=0.001)
+        parser.add_argument("--json", action="store_true")
+
+    def run_profile(self, context, profile, options):
+        """Прогнать воркеров на одном профиле кэша и свести их счётчики."""
+        config = dict(settings.CACHE_PROFILES[profile])
+        with tempfile.TemporaryDirectory() as location:
+            if profile == "file":
+                config["LOCATION"] = location
+            with override_settings(CACHES={"default": config}):
+                cache.clear()
+                # Процессы наследуют начальное поколение при fork.
+                caching.feed_version(caching.ALL_POSTS)
+            published = context.Value("q", 0)
+            queue = context.Queue()
+            workers = [
+                context.Process(target=_worker, args=(
+                    config, seed, options["requests"], options["keys"],
+                    options["write_ratio"], published, queue,
+                ))
+                for seed in range(options["processes"])
+            ]
+            for worker in workers:
+                worker.start()
+            counts = []
+            while len(counts) < len(workers):
+                try:
+                    counts.append(queue.get(timeout=1))
+                except Empty:
+                    if any(worker.exitcode for worker in workers):
+                        raise CommandError(
+                            f"Воркер упал на профиле {profile}")
+            for worker in workers:
+                worker.join()
+        hits, misses, stale = (sum(column) for column in zip(*counts))
+        total = hits + misses
+        return {
+            "requests": total,
+            "hit_rate": round(hits / total, 4),
+            "stale_rate": round(stale / total, 4),
+        }
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("fork")
+        results = {profile: self.run_profile(context, profile, options)
+                   for profile in options["profiles"]}
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for profile, row in results.items():
+            self.stdout.write(
+                f"{profile:10} запросов: {row['requests']:7} "
+                f"попаданий: {row['hit_rate']:.1%} "
+                f"устаревших: {row['stale_rate']:.1%}")
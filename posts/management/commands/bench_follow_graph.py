@@ -0,0 +1,133 @@
+"""Задержка операций графа подписок (posts.graph) на текущих данных.
+
+Сравнивает проверку «подписан ли я» отдельным запросом ``exists()``,
+как раньше на странице автора, с поиском в закэшированном множестве
+и измеряет построение множества, «подписаны из ваших подписок» и
+массовые подписку и отписку. Граф на миллион подписок даёт, например,
+``seed_bench_data --posts 20000 --users 20000 --follows 50``.
+"""
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import caching, graph
+from posts.models import Follow
+
+from .bench_views import summarize
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Измерить проверку подписки, множества подписок и массовые "
+            "подписки на текущих данных (см. seed_bench_data)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checks", type=int, default=1000,
+                            help="Измерений для каждой одиночной операции")
+        parser.add_argument("--bulk-runs", type=int, default=20,
+                            help="Измерений массовой подписки и отписки")
+        parser.add_argument("--batch", type=int, default=100,
+                            help="Авторов в одной массовой подписке")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        readers = list(Follow.objects.order_by().values_list(
+            "user_id", flat=True).distinct())
+        if not readers:
+            raise CommandError("Подписок нет, сначала запустите "
+                               "seed_bench_data")
+        self.readers = readers
+        self.user_ids = list(User.objects.values_list("pk", flat=True))
+
+        checks = options["checks"]
+        results = {
+            "exists_query": self.measure(checks, self.exists),
+            "followees_cold": self.measure(checks, self.followees_cold),
+            "is_following": self.measure(checks, self.is_following),
+            "followed_by_followees": self.measure(
+                checks, self.followed_by_followees),
+        }
+        results.update(self.measure_bulk(options["bulk_runs"],
+                                         options["batch"]))
+        report = {
+            "data": {"edges": Follow.objects.count(),
+                     "users": len(self.user_ids),
+                     "readers": len(readers)},
+            "operations": results,
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2,
+                                         ensure_ascii=False))
+            return
+        data = report["data"]
+        self.stdout.write(f"Подписок {data['edges']}, пользователей "
+                          f"{data['users']}, подписчиков {data['readers']}")
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:22} p50 {row['p50_ms']:8.3f} мс  "
+                f"p95 {row['p95_ms']:8.3f} мс  "
+                f"p99 {row['p99_ms']:8.3f} мс  "
+                f"запросов {row['queries_p50']:3}")
+
+    def pair(self):
+        return self.rng.choice(self.readers), self.rng.choice(self.user_ids)
+
+    def exists(self):
+        user_id, author_id = self.pair()
+        return lambda: Follow.objects.filter(
+            user_id=user_id, author_id=author_id).exists()
+
+    def followees_cold(self):
+        user_id = self.rng.choice(self.readers)
+        caching.bump(caching.follows_scope(user_id))
+        return lambda: graph.followee_ids(user_id)
+
+    def is_following(self):
+        user_id, author_id = self.pair()
+        graph.followee_ids(user_id)
+        return lambda: author_id in graph.followee_ids(user_id)
+
+    def followed_by_followees(self):
+        user_id, author_id = self.pair()
+        graph.followee_ids(user_id)
+        return lambda: graph.followed_by_followees(user_id, author_id)
+
+    def measure(self, runs, prepare):
+        """``prepare`` готовит одно измерение и возвращает замеряемый вызов."""
+        latencies, queries = [], []
+        for _ in range(runs):
+            call = prepare()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                call()
+                latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+        return summarize(latencies, queries)
+
+    def measure_bulk(self, runs, batch):
+        """Подписать читателя на ``batch`` новых авторов и отписать обратно."""
+        timings = {"follow_many": ([], []), "unfollow_many": ([], [])}
+        for _ in range(runs):
+            user_id = self.rng.choice(self.readers)
+            followees = graph.followee_ids(user_id)
+            authors = {author_id for author_id in self.rng.sample(
+                self.user_ids, min(len(self.user_ids), batch * 2))
+                if author_id not in followees and author_id != user_id}
+            authors = sorted(authors)[:batch]
+            for name, operation in (("follow_many", graph.follow_many),
+                                    ("unfollow_many", graph.unfollow_many)):
+                latencies, queries = timings[name]
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    operation(user_id, authors)
+                    latencies.append(time.perf_counter() - started)
+                queries.append(len(captured))
+        return {name: summarize(*timing) for name, timing in timings.items()}
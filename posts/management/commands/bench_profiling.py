@@ -0,0 +1,95 @@
+import json
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import base as template_base
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts import profiling
+from posts.models import Post
+
+from .bench_views import percentile
+
+
+class Command(BaseCommand):
+    help = ("Оценить накладные расходы ProfilingMiddleware: одни и те же "
+            "страницы запрашиваются попеременно с ним и без него")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000,
+                            help="Запросов к каждой странице в каждом "
+                                 "варианте")
+        parser.add_argument("--sample-rate", type=float,
+                            default=settings.PROFILING_SAMPLE_RATE)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        # Пост с несколькими комментариями, а не самый обсуждаемый:
+        # нужна типичная страница, а не рендеринг тысяч комментариев.
+        post = (Post.objects.select_related("author")
+                .filter(comment_count__lte=5)
+                .order_by("-comment_count", "-pk").first())
+        if post is None:
+            raise CommandError("База пуста, сначала запустите "
+                               "seed_bench_data")
+        urls = [reverse("index"),
+                reverse("post", args=[post.author.username, post.pk])]
+        middleware = [name for name in settings.MIDDLEWARE
+                      if name != "posts.profiling.ProfilingMiddleware"]
+        results = {}
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["testserver"]):
+            for url in urls:
+                results[url] = self.compare(url, middleware, options)
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for url, row in results.items():
+            self.stdout.write(
+                f"{url:30} медиана {row['off_p50_ms']:.3f} → "
+                f"{row['on_p50_ms']:.3f} мс ({row['overhead_p50']:+.2%}), "
+                f"среднее {row['off_mean_ms']:.3f} → "
+                f"{row['on_mean_ms']:.3f} мс ({row['overhead_mean']:+.2%})")
+
+    def compare(self, url, middleware, options):
+        with override_settings(
+                MIDDLEWARE=["posts.profiling.ProfilingMiddleware",
+                            *middleware]):
+            on = Client()
+            on.get(url)
+        with override_settings(MIDDLEWARE=middleware):
+            off = Client()
+            off.get(url)
+        timings = {"on": [], "off": []}
+        restore_render = mock.patch.object(
+            template_base.Template, "render", profiling._original_render)
+        with override_settings(PROFILING_SAMPLE_RATE=options["sample_rate"]):
+            for number in range(options["requests"]):
+                # Запросы чередуются, и первым идёт то один вариант, то
+                # другой, чтобы фоновая нагрузка и прогретость кэшей
+                # процессора одинаково влияли на оба.
+                if number % 2:
+                    timings["on"].append(self.timed(on, url))
+                with restore_render:
+                    timings["off"].append(self.timed(off, url))
+                if not number % 2:
+                    timings["on"].append(self.timed(on, url))
+        row = {}
+        for name, values in timings.items():
+            row[f"{name}_p50_ms"] = round(percentile(values, 50) * 1000, 4)
+            row[f"{name}_mean_ms"] = round(sum(values) / len(values) * 1000,
+                                           4)
+        # Медиана показывает цену измерений на каждом запросе, среднее —
+        # ещё и редких запросов с cProfile.
+        for stat in ("p50", "mean"):
+            row[f"overhead_{stat}"] = round(
+                row[f"on_{stat}_ms"] / row[f"off_{stat}_ms"] - 1, 4)
+        return row
+
+    def timed(self, client, url):
+        started = time.perf_counter()
+        client.get(url)
+        return time.perf_counter() - started
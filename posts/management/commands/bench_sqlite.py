@@ -0,0 +1,140 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from posts.models import Comment, Post
+
+from .bench_views import percentile
+
+User = get_user_model()
+
+
+def _worker(alias, seed, deadline, write_ratio, post_ids, user_ids,
+            results):
+    """Смесь чтения ленты и добавления комментариев до ``deadline``."""
+    rng = random.Random(seed)
+    connection = connections[alias]
+    reconnect = not connection.settings_dict["CONN_MAX_AGE"]
+    reads, writes, errors, latencies = 0, 0, 0, []
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                post_id = rng.choice(post_ids)
+                # Как add_comment: пост читается, а комментарий и счётчик
+                # записываются в одной транзакции.
+                with transaction.atomic(using=alias):
+                    Post.objects.using(alias).get(pk=post_id)
+                    Comment.objects.using(alias).bulk_create([Comment(
+                        post_id=post_id, author_id=rng.choice(user_ids),
+                        text="Комментарий из бенчмарка")])
+                    Post.objects.using(alias).filter(pk=post_id).update(
+                        comment_count=F("comment_count") + 1)
+                writes += 1
+            else:
+                # Как index: число постов для Paginator и первая страница.
+                posts = Post.objects.using(alias).select_related(
+                    "author", "group")
+                posts.count()
+                list(posts[:settings.ITEMS_PER_PAGE])
+                reads += 1
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        if reconnect:
+            # Без CONN_MAX_AGE Django закрывает соединение после запроса.
+            connection.close()
+    connection.close()
+    results.append((reads, writes, errors, latencies))
+
+
+class Command(BaseCommand):
+    help = ("Сравнить пропускную способность профилей DATABASE_PROFILES "
+            "при одновременном чтении и записи из нескольких потоков")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+",
+                            default=["plain", "tuned"],
+                            choices=sorted(settings.DATABASE_PROFILES))
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        results = {}
+        for profile in options["profiles"]:
+            with tempfile.TemporaryDirectory() as directory:
+                results[profile] = self.run(
+                    profile, os.path.join(directory, "bench.sqlite3"),
+                    options)
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for profile, row in results.items():
+            self.stdout.write(
+                f"{profile:8} операций/с {row['ops_per_second']:9.1f}  "
+                f"чтений {row['reads']:7}  записей {row['writes']:6}  "
+                f"ошибок {row['errors']:5}  "
+                f"p50 {row['p50_ms']:7.2f} мс  p99 {row['p99_ms']:8.2f} мс")
+
+    def run(self, profile, path, options):
+        alias = f"bench_{profile}"
+        connections.databases[alias] = dict(
+            settings.DATABASE_PROFILES[profile], NAME=path)
+        connections.ensure_defaults(alias)
+        try:
+            call_command("migrate", database=alias, verbosity=0)
+            post_ids, user_ids = self.seed(alias, options["posts"])
+            connections[alias].close()
+            deadline = time.monotonic() + options["seconds"]
+            collected = []
+            threads = [
+                threading.Thread(target=_worker, args=(
+                    alias, seed, deadline, options["write_ratio"],
+                    post_ids, user_ids, collected,
+                ))
+                for seed in range(options["threads"])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            connections[alias].close()
+            del connections.databases[alias]
+        reads, writes, errors = (sum(row[i] for row in collected)
+                                 for i in range(3))
+        latencies = [value for row in collected for value in row[3]]
+        return {
+            "ops_per_second": round((reads + writes) / options["seconds"],
+                                    1),
+            "reads": reads,
+            "writes": writes,
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+
+    def seed(self, alias, count):
+        users = User.objects.using(alias)
+        users.bulk_create([User(username=f"bench-{i}", password="!")
+                           for i in range(20)])
+        user_ids = list(users.values_list("pk", flat=True))
+        Post.objects.using(alias).bulk_create([
+            Post(author_id=user_ids[i % len(user_ids)], text=f"Пост {i}")
+            for i in range(count)
+        ])
+        return (list(Post.objects.using(alias).values_list("pk", flat=True)),
+                user_ids)
@@ -0,0 +1,126 @@
+"""Время запуска рабочего процесса по ``python -X importtime``.
+
+Дочерний процесс делает то же, что воркер gunicorn до первого запроса:
+импортирует yatube.wsgi (настройка Django, промежуточные слои, прогрев
+шаблонов) и загружает схему URL. Суммарное время импорта сравнивается с
+STARTUP_IMPORT_BUDGET_MS, а список загруженных модулей — с
+STARTUP_FORBIDDEN_MODULES.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_views import percentile
+
+BOOT = ("import yatube.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n")
+# import time: <своё, мкс> | <вместе с вложенными, мкс> | <отступ><модуль>
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def parse_importtime(output):
+    """Строки ``-X importtime``: [(модуль, своё, суммарное, глубина)].
+
+    Время в микросекундах, глубина — уровень вложенности импорта.
+    """
+    modules = []
+    for line in output.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative),
+                            len(indent) // 2))
+    return modules
+
+
+def measure(settings_module):
+    """Один запуск: время в секундах и импортированные модули."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    env.setdefault("YATUBE_SECRET_KEY", "bench-startup")
+    # setuptools 60+ по умолчанию подменяет distutils, который
+    # импортирует Django 2.2, своей копией и тянет pkg_resources. Версия
+    # из requirements.txt так не делает; на серверах с новой setuptools
+    # эту переменную нужно задать в окружении воркеров.
+    env.setdefault("SETUPTOOLS_USE_DISTUTILS", "stdlib")
+    # Меряется импорт, а потоки очереди задач при запуске пошли бы
+    # в базу этого процесса.
+    env.setdefault("YATUBE_TASKS_MODE", "worker")
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if process.returncode:
+        raise CommandError(process.stderr.strip().splitlines()[-1])
+    return wall, parse_importtime(process.stderr)
+
+
+class Command(BaseCommand):
+    help = ("Измерить импорт модулей при запуске рабочего процесса "
+            "и проверить бюджет времени и запрещённые модули")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--settings-module",
+                            default="yatube.settings.prod",
+                            help="Настройки дочернего процесса")
+        parser.add_argument("--runs", type=int, default=5,
+                            help="Запусков, берётся медиана")
+        parser.add_argument("--top", type=int, default=15,
+                            help="Сколько самых долгих пакетов показать")
+        parser.add_argument("--budget", type=float,
+                            default=settings.STARTUP_IMPORT_BUDGET_MS,
+                            help="Бюджет времени импорта, мс")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        walls, totals = [], []
+        for _ in range(options["runs"]):
+            wall, modules = measure(options["settings_module"])
+            walls.append(wall)
+            totals.append(sum(cumulative
+                              for _, _, cumulative, depth in modules
+                              if depth == 0))
+
+        packages = {}
+        for name, own, _, _ in modules:
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + own
+        top = sorted(packages.items(), key=lambda item: -item[1])
+        loaded = {name.split(".")[0] for name, _, _, _ in modules}
+        results = {
+            "settings": options["settings_module"],
+            "import_ms": round(percentile(totals, 50) / 1000, 1),
+            "wall_ms": round(percentile(walls, 50) * 1000, 1),
+            "budget_ms": options["budget"],
+            "modules": len(modules),
+            "top": [{"package": package, "ms": round(own / 1000, 1)}
+                    for package, own in top[:options["top"]]],
+            "forbidden": sorted(loaded & set(
+                settings.STARTUP_FORBIDDEN_MODULES)),
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2,
+                                         ensure_ascii=False))
+        else:
+            self.stdout.write(
+                f"{results['settings']}: импорт {results['import_ms']} мс "
+                f"(бюджет {results['budget_ms']:g} мс), запуск "
+                f"{results['wall_ms']} мс, модулей {results['modules']}")
+            for row in results["top"]:
+                self.stdout.write(f"{row['ms']:8.1f} мс  {row['package']}")
+
+        if results["forbidden"]:
+            raise CommandError("при запуске импортированы: "
+                               + ", ".join(results["forbidden"]))
+        if results["import_ms"] > options["budget"]:
+            raise CommandError(
+                f"импорт занимает {results['import_ms']} мс, бюджет "
+                f"{options['budget']:g} мс")
@@ -0,0 +1,91 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from posts import caching
+from posts.models import Post
+from posts.pagination import paginate
+from posts.template_cache import warm_templates
+
+from .bench_views import percentile
+
+# Без кэша фрагментов каждая отрисовка — полная страница.
+DUMMY_CACHE = {"default": {
+    "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+}}
+
+
+def templates_setting(cached):
+    engine = dict(settings.TEMPLATES[0])
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [("django.template.loaders.cached.Loader", loaders)]
+    engine["OPTIONS"] = dict(engine["OPTIONS"], loaders=loaders)
+    return [engine]
+
+
+class Command(BaseCommand):
+    help = ("Сравнить время отрисовки главной страницы без кэша шаблонов "
+            "и с cached.Loader, прогретым при запуске")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=300,
+                            help="Отрисовок в каждом варианте")
+        parser.add_argument("--rounds", type=int, default=10,
+                            help="Варианты чередуются столько раз")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        post_list = Post.objects.select_related("author", "group")
+        if not post_list.exists():
+            raise CommandError("База пуста, сначала запустите "
+                               "seed_bench_data")
+        paginator, page = paginate(request, post_list)
+        # Посты читаются заранее: измеряется только работа шаблонов.
+        page.object_list = list(page.object_list)
+        context = {"page": page, "paginator": paginator,
+                   "feed_version": caching.feed_version(caching.ALL_POSTS)}
+
+        timings = {"uncached": [], "cached": []}
+        per_round = max(1, options["renders"] // options["rounds"])
+        with override_settings(DEBUG=False, CACHES=DUMMY_CACHE):
+            for _ in range(options["rounds"]):
+                for variant, samples in timings.items():
+                    cached = variant == "cached"
+                    # Смена TEMPLATES пересоздаёт движок шаблонов, как
+                    # запуск нового рабочего процесса.
+                    with override_settings(TEMPLATES=templates_setting(
+                            cached)):
+                        if cached:
+                            warm_templates()
+                        for _ in range(per_round):
+                            started = time.perf_counter()
+                            render_to_string("index.html", context, request)
+                            samples.append(time.perf_counter() - started)
+
+        results = {
+            variant: {
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+            }
+            for variant, samples in timings.items()
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for variant, row in results.items():
+            self.stdout.write(
+                f"{variant:9} p50 {row['p50_ms']:7.3f} мс  "
+                f"p95 {row['p95_ms']:7.3f} мс  "
+                f"среднее {row['mean_ms']:7.3f} мс")
+        change = results["cached"]["p50_ms"] / results["uncached"]["p50_ms"]
+        self.stdout.write(f"Медиана с кэшем шаблонов: {change - 1:+.1%}")
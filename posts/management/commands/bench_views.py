@@ -0,0 +1,164 @@
+import json
+import random
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+VIEWS = ("index", "group_posts", "profile", "post_view", "follow_index",
+         "add_comment")
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(latencies, queries):
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "queries_p50": percentile(queries, 50),
+        "queries_max": max(queries),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Измерить p50/p95/p99 задержки и число запросов к БД для "
+            "публичных страниц на текущих данных (см. seed_bench_data)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--views", nargs="+", default=list(VIEWS),
+                            choices=VIEWS)
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Измеряемых запросов на страницу")
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--cold", action="store_true",
+                            help="Очищать кэш перед каждым запросом")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Записать результаты в JSON")
+        parser.add_argument("--compare",
+                            help="JSON прошлого прогона для сравнения")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.prepare()
+        results = {}
+        # Без DEBUG не работает debug-toolbar и не копится
+        # connection.queries, как на боевом сервере.
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["testserver"]):
+            for view in options["views"]:
+                results[view] = self.measure(view, options)
+        report = {
+            "revision": git_revision(),
+            "data": {"posts": Post.objects.count(),
+                     "users": User.objects.count(),
+                     "groups": Group.objects.count()},
+            "settings": {
+                "cache": settings.CACHES["default"]["BACKEND"],
+                "feed_pagination": settings.FEED_PAGINATION,
+                "cold_cache": options["cold"],
+            },
+            "views": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        self.print_report(report, options["compare"])
+
+    def prepare(self):
+        """Выбрать пользователей, группы и посты для запросов."""
+        posts = list(Post.objects.order_by("-pk")
+                     .values_list("pk", "author__username")[:1000])
+        groups = list(Group.objects.values_list("slug", flat=True)[:1000])
+        if not posts or not groups:
+            raise CommandError("База пуста, сначала запустите "
+                               "seed_bench_data")
+        self.posts = posts
+        self.groups = groups
+        self.authors = sorted({username for _, username in posts})
+        # Лента подписок самого активного читателя — худший случай.
+        self.reader = (User.objects.annotate(total=Count("follower"))
+                       .order_by("-total").first())
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.pages = [1] * 6 + [2, 2, 3, 10]
+
+    def request(self, view):
+        page = {"page": self.rng.choice(self.pages)}
+        if view == "index":
+            return self.client.get(reverse("index"), page)
+        if view == "group_posts":
+            slug = self.rng.choice(self.groups)
+            return self.client.get(reverse("group", args=[slug]), page)
+        if view == "profile":
+            username = self.rng.choice(self.authors)
+            return self.client.get(reverse("profile", args=[username]), page)
+        if view == "follow_index":
+            return self.client.get(reverse("follow_index"), page)
+        post_id, username = self.rng.choice(self.posts)
+        if view == "post_view":
+            return self.client.get(reverse("post", args=[username, post_id]))
+        return self.client.post(
+            reverse("add_comment", args=[username, post_id]),
+            {"text": "Комментарий из бенчмарка"})
+
+    def measure(self, view, options):
+        latencies, queries = [], []
+        for number in range(options["warmup"] + options["requests"]):
+            if options["cold"]:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self.request(view)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{view}: ответ {response.status_code}")
+            if number >= options["warmup"]:
+                latencies.append(elapsed)
+                queries.append(len(captured))
+        return summarize(latencies, queries)
+
+    def print_report(self, report, compare):
+        previous = {}
+        if compare:
+            with open(compare) as source:
+                previous = json.load(source)["views"]
+        for view, row in report["views"].items():
+            line = (f"{view:13} p50 {row['p50_ms']:8.2f} мс  "
+                    f"p95 {row['p95_ms']:8.2f} мс  "
+                    f"p99 {row['p99_ms']:8.2f} мс  "
+                    f"запросов {row['queries_p50']:3}")
+            if view in previous:
+                before = previous[view]["p95_ms"]
+                change = (row["p95_ms"] - before) / before if before else 0
+                line += f"  p95 {change:+.1%}"
+            self.stdout.write(line)
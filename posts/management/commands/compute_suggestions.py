@@ -0,0 +1,30 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = ("Пересчитать рекомендации авторов и групп для всех "
+            "пользователей (запускать по расписанию, например раз в час)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int,
+                            default=os.cpu_count() or 1,
+                            help="Процессов в пуле; 1 — считать в этом")
+        parser.add_argument("--limit", type=int,
+                            help="Авторов и групп на пользователя, по "
+                                 "умолчанию SUGGESTIONS_PER_USER")
+        parser.add_argument("--chunk-size", type=int, default=1000,
+                            help="Пользователей в одной задаче пула")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = suggestions.compute(processes=options["processes"],
+                                    limit=options["limit"],
+                                    chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"Рекомендации посчитаны для {count} пользователей "
+            f"за {time.perf_counter() - started:.1f} с")
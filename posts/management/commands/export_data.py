@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ("Выгрузить группы, посты, комментарии или подписки в NDJSON "
+            "или CSV")
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=transfer.KINDS)
+        parser.add_argument("--output",
+                            help="Файл; по умолчанию стандартный вывод")
+        parser.add_argument("--format", choices=transfer.FORMATS,
+                            help="По умолчанию — по расширению файла")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        fmt = options["format"] or transfer.guess_format(path or "")
+        records = transfer.export_records(options["kind"],
+                                          options["chunk_size"])
+        fields = transfer.FIELDS[options["kind"]]
+        if not path:
+            transfer.write_records(records, sys.stdout, fmt, fields)
+            return
+        with open(path, "w", encoding="utf-8", newline="") as output:
+            total = transfer.write_records(records, output, fmt, fields)
+        self.stderr.write(f"Выгружено записей: {total}")
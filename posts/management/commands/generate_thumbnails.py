@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Построить миниатюры для постов с изображениями"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing", action="store_true",
+                            help="Только посты без готовых миниатюр")
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        if options["missing"]:
+            posts = posts.filter(thumbnails="")
+        done = 0
+        for post_id in posts.values_list("id", flat=True).iterator():
+            thumbnails.generate(post_id)
+            done += 1
+        self.stdout.write(f"Обработано постов: {done}")
@@ -0,0 +1,56 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ("Загрузить группы, посты, комментарии или подписки из NDJSON "
+            "или CSV, выгруженного export_data")
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=transfer.KINDS)
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=transfer.FORMATS,
+                            help="По умолчанию — по расширению файла")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--resume", action="store_true",
+                            help="Продолжить с последней загруженной пачки")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or transfer.guess_format(path)
+        checkpoint = f"{path}.checkpoint"
+        skip, state = 0, None
+        if options["resume"] and os.path.exists(checkpoint):
+            with open(checkpoint) as source:
+                state = json.load(source)
+            skip = state.pop("records")
+
+        importer = transfer.Importer(options["kind"], options["batch_size"],
+                                     state=state)
+
+        def save_checkpoint(done):
+            with open(checkpoint, "w") as output:
+                json.dump({"records": done, **importer.state}, output)
+
+        started = time.perf_counter()
+        try:
+            with open(path, encoding="utf-8", newline="") as source:
+                total = importer.run(transfer.read_records(source, fmt),
+                                     skip=skip, on_batch=save_checkpoint)
+        except transfer.TransferError as error:
+            raise CommandError(
+                f"{error}. Исправьте файл и запустите с --resume")
+        elapsed = time.perf_counter() - started
+        importer.finish()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        loaded = total - skip
+        self.stdout.write(
+            f"Загружено записей: {loaded} (пропущено {skip}), "
+            f"{loaded / elapsed if elapsed else 0:.0f} записей/с, "
+            f"создано пользователей: {importer.users.created}")
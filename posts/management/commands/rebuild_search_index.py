@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Построить индекс поиска по постам и комментариям заново"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = search.rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"Проиндексировано документов: {total} "
+            f"(индекс: {search.get_index().name})")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ("Пересчитать оценки обсуждаемых постов и групп по событиям "
+            "за TRENDING_WINDOW (запускать по расписанию, например раз "
+            "в час)")
+
+    def handle(self, *args, **options):
+        posts, groups = trending.recompute()
+        self.stdout.write(f"Пересчитано постов: {posts}, групп: {groups}")
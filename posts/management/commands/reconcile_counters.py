@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Пересчитать счётчики комментариев, постов и подписок"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = reconcile()
+        self.stdout.write(f"Исправлено строк: {fixed}")
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import replication
+
+
+class Command(BaseCommand):
+    help = ("Копировать основную базу SQLite в реплики DATABASE_REPLICAS "
+            "с заданной задержкой (локальная замена репликации)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=1,
+                            help="Секунд между копированиями")
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("DATABASE_REPLICAS пуст, задайте "
+                               "YATUBE_DB_REPLICAS")
+        while True:
+            replication.sync()
+            self.stdout.write(
+                f"Реплики обновлены: {', '.join(settings.DATABASE_REPLICAS)}")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
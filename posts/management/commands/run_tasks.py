@@ -0,0 +1,63 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import tasks
+
+
+class Command(BaseCommand):
+    help = "Выполнять фоновые задачи из очереди posts.tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int,
+                            default=settings.TASKS_CONCURRENCY,
+                            help="Сколько задач выполнять одновременно")
+        parser.add_argument("--poll-interval", type=float,
+                            default=settings.TASKS_POLL_INTERVAL,
+                            help="Пауза между проверками пустой очереди, с")
+        parser.add_argument("--burst", action="store_true",
+                            help="Выполнить готовые задачи и выйти")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if not options["burst"]:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: stop.set())
+        requeued = tasks.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Возвращено в очередь задач: {requeued}")
+
+        done = []
+        workers = [
+            threading.Thread(target=self.work, name=f"tasks-{number}",
+                             args=(stop, options, done))
+            for number in range(1, options["concurrency"])
+        ]
+        for worker in workers:
+            worker.start()
+        # Первый обработчик работает в основном потоке.
+        self.work(stop, options, done)
+        for worker in workers:
+            worker.join()
+        self.stdout.write(f"Выполнено задач: {len(done)}")
+
+    def work(self, stop, options, done):
+        checked = time.monotonic()
+        try:
+            while not stop.is_set():
+                if tasks.run_one():
+                    done.append(1)
+                    continue
+                if options["burst"]:
+                    return
+                stop.wait(options["poll_interval"])
+                if time.monotonic() - checked > settings.TASKS_LOCK_TIMEOUT:
+                    tasks.requeue_stale()
+                    checked = time.monotonic()
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
@@ -0,0 +1,202 @@
+import itertools
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import counters, feed, search
+from posts.models import Comment, Follow, Group, Post
+from posts.transfer import explicit_dates
+
+User = get_user_model()
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+WORDS = (
+    "кошка собака город река море лес дом окно утро вечер ночь солнце "
+    "дождь снег ветер дорога поезд книга письмо музыка песня фильм друг "
+    "работа отпуск кофе чай завтрак обед ужин погода новости проект код "
+    "python django сервер база запрос страница лента подписка автор пост "
+    "комментарий фотография выставка концерт прогулка парк мост площадь "
+    "красивый большой новый старый быстрый тихий тёплый холодный светлый "
+    "гулять читать писать слушать смотреть думать строить искать ждать"
+).split()
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса закона Ципфа для ``random.choices``."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    help = ("Заполнить базу синтетическими пользователями, группами, "
+            "постами, комментариями и подписками для бенчмарков")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES),
+                            help="Число постов: 10k, 100k или 1m")
+        parser.add_argument("--posts", type=int)
+        parser.add_argument("--users", type=int,
+                            help="По умолчанию — один на 20 постов")
+        parser.add_argument("--groups", type=int,
+                            help="По умолчанию — одна на 2000 постов")
+        parser.add_argument("--comments", type=int,
+                            help="По умолчанию — два на пост")
+        parser.add_argument("--follows", type=int,
+                            help="Подписок в среднем на пользователя, "
+                                 "по умолчанию 10")
+        parser.add_argument("--exponent", type=float, default=1.1,
+                            help="Показатель закона Ципфа для популярности "
+                                 "авторов и постов")
+        parser.add_argument("--prefix", default="bench",
+                            help="Префикс имён пользователей и групп")
+        parser.add_argument("--fanout-limit", type=int,
+                            default=settings.FEED_FANOUT_LIMIT,
+                            help="Авторы с большим числом подписчиков "
+                                 "читаются в ленту по запросу; на 1m "
+                                 "стоит уменьшить, иначе FeedEntry "
+                                 "вырастет до сотен миллионов строк")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        posts = options["posts"] or SCALES.get(options["scale"])
+        if not posts:
+            raise CommandError("Укажите --scale или --posts")
+        users = options["users"] or max(10, posts // 20)
+        groups = options["groups"] or max(5, posts // 2000)
+        comments = (options["comments"] if options["comments"] is not None
+                    else posts * 2)
+        follows = (options["follows"] if options["follows"] is not None
+                   else 10)
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Данные с префиксом {prefix!r} уже есть, выберите другой")
+
+        self.verbosity = options["verbosity"]
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.exponent = options["exponent"]
+        self.now = timezone.now()
+
+        with transaction.atomic(), explicit_dates(Post, Comment):
+            user_ids = self.create_users(prefix, users)
+            group_ids = self.create_groups(prefix, groups)
+            post_ids = self.create_posts(user_ids, group_ids, posts)
+            self.create_comments(user_ids, post_ids, comments)
+            follow_pairs = self.create_follows(user_ids, follows)
+            self.log("Пересчёт счётчиков")
+            counters.reconcile()
+            self.log("Раскладка лент подписок")
+            with override_settings(
+                    FEED_FANOUT_LIMIT=options["fanout_limit"]):
+                feed.update_pull_status(
+                    *{author for _, author in follow_pairs})
+            feed.backfill_pairs(follow_pairs)
+            self.log("Построение индекса поиска")
+            search.rebuild()
+        self.stdout.write(
+            f"Создано: пользователей {users}, групп {groups}, "
+            f"постов {posts}, комментариев {comments}, "
+            f"подписок {len(follow_pairs)}")
+
+    def log(self, message):
+        if self.verbosity > 1:
+            self.stderr.write(message)
+
+    def bulk(self, model, objects):
+        # Размер пачки одного INSERT Django подбирает под ограничения БД.
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def text(self, low, high):
+        return " ".join(self.rng.choices(WORDS,
+                                         k=self.rng.randint(low, high)))
+
+    def created_ids(self, queryset, count):
+        # SQLite не возвращает первичные ключи из bulk_create.
+        return list(queryset.order_by("-pk")
+                    .values_list("pk", flat=True)[:count])[::-1]
+
+    def create_users(self, prefix, count):
+        self.log(f"Пользователи: {count}")
+        self.bulk(User, [User(username=f"{prefix}-{i}", password="!")
+                         for i in range(count)])
+        return self.created_ids(
+            User.objects.filter(username__startswith=f"{prefix}-"), count)
+
+    def create_groups(self, prefix, count):
+        self.log(f"Группы: {count}")
+        self.bulk(Group, [Group(title=f"Группа {prefix} {i}",
+                                slug=f"{prefix}-{i}",
+                                description=self.text(5, 20))
+                          for i in range(count)])
+        return self.created_ids(
+            Group.objects.filter(slug__startswith=f"{prefix}-"), count)
+
+    def create_posts(self, user_ids, group_ids, count):
+        self.log(f"Посты: {count}")
+        # Немногие авторы пишут большую часть постов, остальные — длинный
+        # хвост; даты равномерно покрывают последний год.
+        author_weights = zipf_weights(len(user_ids), self.exponent)
+        group_weights = zipf_weights(len(group_ids), self.exponent)
+        step = timedelta(days=365) / count
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            authors = self.rng.choices(user_ids, cum_weights=author_weights,
+                                       k=size)
+            groups = self.rng.choices(group_ids, cum_weights=group_weights,
+                                      k=size)
+            batch = []
+            for offset, (author_id, group_id) in enumerate(
+                    zip(authors, groups)):
+                date = self.now - step * (count - start - offset)
+                batch.append(Post(
+                    author_id=author_id,
+                    group_id=group_id if self.rng.random() < 0.7 else None,
+                    text=self.text(5, 80),
+                    pub_date=date, updated=date,
+                ))
+            self.bulk(Post, batch)
+        return self.created_ids(Post.objects.all(), count)
+
+    def create_comments(self, user_ids, post_ids, count):
+        self.log(f"Комментарии: {count}")
+        # Популярны в основном свежие посты.
+        post_weights = zipf_weights(len(post_ids), self.exponent)
+        newest_first = post_ids[::-1]
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            targets = self.rng.choices(newest_first,
+                                       cum_weights=post_weights, k=size)
+            self.bulk(Comment, [
+                Comment(post_id=post_id,
+                        author_id=self.rng.choice(user_ids),
+                        text=self.text(1, 30), created=self.now)
+                for post_id in targets
+            ])
+
+    def create_follows(self, user_ids, average):
+        self.log(f"Подписки: в среднем {average} на пользователя")
+        # Число подписчиков автора распределено по Ципфу.
+        author_weights = zipf_weights(len(user_ids), self.exponent)
+        pairs = set()
+        for user_id in user_ids:
+            wanted = min(len(user_ids) - 1,
+                         int(self.rng.expovariate(1 / average))
+                         if average else 0)
+            authors = self.rng.choices(user_ids, cum_weights=author_weights,
+                                       k=wanted)
+            pairs.update((user_id, author_id) for author_id in authors
+                         if author_id != user_id)
+        self.bulk(Follow, [Follow(user_id=user_id, author_id=author_id)
+                           for user_id, author_id in sorted(pairs)])
+        # Ограничения Follow могут отбросить часть пар.
+        return list(Follow.objects.filter(user_id__gte=user_ids[0])
+                    .values_list("user_id", "author_id"))
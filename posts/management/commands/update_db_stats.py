@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = ("Обновить статистику SQLite (ANALYZE), по которой оцениваются "
+            "размеры лент и выбираются индексы")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Команда нужна только для SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            cursor.execute("SELECT tbl, idx, stat FROM sqlite_stat1")
+            rows = cursor.fetchall()
+        # Оценки в кэше (posts.pagination.sqlite_stat) читаются заново.
+        cache.delete_many(
+            [f"sqlite-stat:{table}:{index or ''}" for table, index, _ in rows]
+            + [f"sqlite-stat:{table}:" for table, _, _ in rows])
+        self.stdout.write(f"Обновлена статистика индексов: {len(rows)}")
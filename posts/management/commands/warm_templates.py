@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.template_cache import warm_templates
+
+
+class Command(BaseCommand):
+    help = ("Скомпилировать все шаблоны, как при запуске рабочего "
+            "процесса, и показать время компиляции каждого")
+
+    def handle(self, *args, **options):
+        timings = sorted(warm_templates(), key=lambda row: row[1],
+                         reverse=True)
+        for name, elapsed in timings:
+            self.stdout.write(f"{elapsed * 1000:8.2f} мс  {name}")
+        total = sum(elapsed for _, elapsed in timings)
+        self.stdout.write(f"{total * 1000:8.2f} мс  всего шаблонов: "
+                          f"{len(timings)}")
@@ -0,0 +1,87 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:19
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    # То же, что feed.update_pull_status и feed.backfill_pairs для всех
+    # существующих подписок, на исторических моделях.
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    FeedPullAuthor = apps.get_model('posts', 'FeedPullAuthor')
+    db_alias = schema_editor.connection.alias
+
+    popular = (Follow.objects.using(db_alias).order_by().values('author')
+               .annotate(total=Count('pk'))
+               .filter(total__gt=settings.FEED_FANOUT_LIMIT)
+               .values_list('author', flat=True))
+    pull_author_ids = set(popular)
+    FeedPullAuthor.objects.using(db_alias).bulk_create(
+        [FeedPullAuthor(author_id=author_id) for author_id in pull_author_ids],
+        batch_size=500)
+
+    followers = defaultdict(list)
+    follows = Follow.objects.using(db_alias).order_by().values_list('author', 'user')
+    for author_id, user_id in follows.iterator():
+        if author_id not in pull_author_ids:
+            followers[author_id].append(user_id)
+    for author_id, user_ids in followers.items():
+        post_ids = list(Post.objects.using(db_alias).filter(author_id=author_id)
+                        .order_by('-pub_date')
+                        .values_list('id', flat=True)[:settings.FEED_BACKFILL_LIMIT])
+        # bulk_create собирает список целиком, поэтому подписчики — пачками.
+        for start in range(0, len(user_ids), 50):
+            FeedEntry.objects.using(db_alias).bulk_create(
+                [FeedEntry(user_id=user_id, post_id=post_id, author_id=author_id)
+                 for user_id in user_ids[start:start + 50] for post_id in post_ids],
+                batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_auto_20210220_1341'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedPullAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feed_pull', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Автор с лентой по запросу',
+                'verbose_name_plural': 'Авторы с лентой по запросу',
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор поста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Читатель')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_entry_user_author'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
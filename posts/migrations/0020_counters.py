@@ -0,0 +1,60 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    db_alias = schema_editor.connection.alias
+
+    for row in Comment.objects.using(db_alias).order_by().values('post').annotate(total=Count('pk')):
+        Post.objects.using(db_alias).filter(pk=row['post']).update(comment_count=row['total'])
+
+    stats = {pk: UserStats(user_id=pk)
+             for pk in User.objects.using(db_alias).values_list('pk', flat=True)}
+    counts = [
+        (Post, 'author', 'posts_count'),
+        (Follow, 'author', 'followers_count'),
+        (Follow, 'user', 'following_count'),
+    ]
+    for model, field, counter in counts:
+        for row in model.objects.using(db_alias).order_by().values(field).annotate(total=Count('pk')):
+            setattr(stats[row[field]], counter, row['total'])
+    UserStats.objects.using(db_alias).bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0019_feed_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
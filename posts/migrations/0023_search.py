@@ -0,0 +1,111 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:29
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    # Без FTS5 поиск работает по таблице SearchTerm.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search '
+                'USING fts5(body, post_id UNINDEXED)')
+    except OperationalError:
+        # SQLite собран без модуля fts5.
+        pass
+
+
+def fill_index(apps, schema_editor):
+    # Посты и комментарии, сохранённые до этой миграции, иначе не найдутся
+    # до ручного rebuild_search_index. Повторяет search.rebuild() на
+    # исторических моделях и соединении миграции; от приложения берётся
+    # только чистая функция tokenize.
+    from posts.search import tokenize
+
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    connection = schema_editor.connection
+    db_alias = connection.alias
+    use_fts5 = (
+        settings.SEARCH_BACKEND != 'table'
+        and 'posts_search' in connection.introspection.table_names()
+    )
+
+    def write(rows):
+        if use_fts5:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO posts_search (rowid, body, post_id) '
+                    'VALUES (%s, %s, %s)',
+                    [(doc, ' '.join(tokenize(text)), post_id)
+                     for doc, post_id, text in rows])
+        else:
+            SearchTerm.objects.using(db_alias).bulk_create(
+                [SearchTerm(term=term, doc=doc, post_id=post_id,
+                            frequency=min(frequency, 32767))
+                 for doc, post_id, text in rows
+                 for term, frequency in Counter(tokenize(text)).items()],
+                batch_size=500)
+
+    # Идентификатор документа: pk * 2 для поста, pk * 2 + 1 для
+    # комментария, как в search.doc_id.
+    sources = [
+        (0, Post.objects.using(db_alias).order_by()
+         .values_list('pk', 'pk', 'text')),
+        (1, Comment.objects.using(db_alias).order_by()
+         .values_list('pk', 'post_id', 'text')),
+    ]
+    for kind, rows in sources:
+        batch = []
+        for pk, post_id, text in rows.iterator(chunk_size=2000):
+            batch.append((pk * 2 + kind, post_id, text))
+            if len(batch) >= 2000:
+                write(batch)
+                batch = []
+        write(batch)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('doc', models.BigIntegerField(verbose_name='Документ')),
+                ('frequency', models.PositiveSmallIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Терм поиска',
+                'verbose_name_plural': 'Термы поиска',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term'], name='search_term'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['doc'], name='search_term_doc'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.6 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_task_queue'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='follow',
+            name='unique_following',
+        ),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='follow_user_author',
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.6 on 2026-10-18 06:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0026_follow_unique_pair'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSuggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='suggestions', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('authors', models.TextField(default='[]', help_text='[[id, username], ...]', verbose_name='Авторы')),
+                ('groups', models.TextField(default='[]', help_text='[[slug, название], ...]', verbose_name='Группы')),
+                ('computed', models.DateTimeField(verbose_name='Посчитаны')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации пользователю',
+                'verbose_name_plural': 'Рекомендации пользователям',
+            },
+        ),
+    ]
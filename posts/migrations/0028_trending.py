@@ -0,0 +1,31 @@
+# Generated by Django 2.2.6 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_user_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='trend',
+            field=models.FloatField(default=0, editable=False, verbose_name='Обсуждаемость'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trend',
+            field=models.FloatField(default=0, editable=False, verbose_name='Обсуждаемость'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['trend'], name='group_trend'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['trend'], name='post_trend'),
+        ),
+    ]
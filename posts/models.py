@@ -1,3 +1,5 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -11,10 +13,14 @@ class Group(models.Model):
                             unique=True, help_text="Указать адрес для страницы")
     description = models.TextField("Описание группы",
                                    help_text="Дать описание группе")
+    trend = models.FloatField("Обсуждаемость", default=0, editable=False)
 
     class Meta:
         verbose_name = "Группа"
         verbose_name_plural = "Группы"
+        indexes = [
+            models.Index(fields=["trend"], name="group_trend"),
+        ]
 
     def __str__(self):
         return self.title
@@ -37,15 +43,43 @@ class Post(models.Model):
     image = models.ImageField(upload_to="posts/",
                               verbose_name="Изображение",
                               blank=True, null=True)
+    comment_count = models.PositiveIntegerField("Количество комментариев",
+                                                default=0, editable=False)
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+    thumbnails = models.TextField("Миниатюры", blank=True, default="",
+                                  editable=False)
+    # Логарифм оценки с затуханием, приведённый к началу эпохи
+    # (см. posts.trending).
+    trend = models.FloatField("Обсуждаемость", default=0, editable=False)
 
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        # Ленты группы и автора: фильтр по группе или автору и сортировка
+        # по дате без отдельной сортировки во временном B-дереве.
+        indexes = [
+            models.Index(fields=["group", "-pub_date"],
+                         name="post_group_pub_date"),
+            models.Index(fields=["author", "-pub_date"],
+                         name="post_author_pub_date"),
+            models.Index(fields=["trend"], name="post_trend"),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def card_image(self):
+        """Готовые миниатюры для карточки: ``[[url, mime], ...]``.
+
+        Последний элемент — запасной формат для ``<img>``. Пока миниатюры
+        строятся, список пуст.
+        """
+        if not self.thumbnails:
+            return []
+        return json.loads(self.thumbnails).get("card", [])
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -59,6 +93,12 @@ class Comment(models.Model):
     created = models.DateTimeField("Дата комментария",
                                    auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "created"],
+                         name="comment_post_created"),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE,
@@ -69,6 +109,150 @@ class Follow(models.Model):
                                verbose_name="Автор")
 
     class Meta:
+        # Уникальный индекс (user, author) нужен и для выборки подписок
+        # пользователя, и для проверки одной пары.
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"],
+                                    name="unique_follow"),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись в заранее собранной ленте подписок пользователя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="feed_entries",
+                             verbose_name="Читатель")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="feed_entries",
+                             verbose_name="Пост")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+",
+                               verbose_name="Автор поста")
+    # Копия Post.pub_date: лента читателя идёт по одному индексу
+    # (user, -pub_date, -post), без сортировки после соединения с Post.
+    pub_date = models.DateTimeField("Дата публикации поста")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
         constraints = [
-            models.UniqueConstraint(fields=["author"], name="unique_following")
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="unique_feed_entry")
+        ]
+        indexes = [
+            models.Index(fields=["user", "author"],
+                         name="feed_entry_user_author"),
+            models.Index(fields=["user", "-pub_date", "-post"],
+                         name="feed_entry_user_pub_date"),
+        ]
+
+
+class FeedPullAuthor(models.Model):
+    """Автор, чьи посты не раскладываются по лентам, а читаются по запросу.
+
+    Автор попадает сюда, когда число его подписчиков превышает
+    ``settings.FEED_FANOUT_LIMIT``, и больше не выходит.
+    """
+    author = models.OneToOneField(User, on_delete=models.CASCADE,
+                                  related_name="feed_pull",
+                                  verbose_name="Автор")
+
+    class Meta:
+        verbose_name = "Автор с лентой по запросу"
+        verbose_name_plural = "Авторы с лентой по запросу"
+
+
+class UserStats(models.Model):
+    """Счётчики постов и подписок пользователя.
+
+    Обновляются вместе с изменениями в ``Post`` и ``Follow``; расхождения
+    исправляет команда ``reconcile_counters``.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="stats",
+                                verbose_name="Пользователь")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
+
+
+class UserSuggestions(models.Model):
+    """Рекомендованные пользователю авторы и группы (см. posts.suggestions).
+
+    Списки хранятся в JSON вместе с именами и адресами, чтобы страница
+    показала их, прочитав одну строку по первичному ключу.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="suggestions",
+                                verbose_name="Пользователь")
+    authors = models.TextField("Авторы", default="[]",
+                               help_text="[[id, username], ...]")
+    groups = models.TextField("Группы", default="[]",
+                              help_text="[[slug, название], ...]")
+    computed = models.DateTimeField("Посчитаны")
+
+    class Meta:
+        verbose_name = "Рекомендации пользователю"
+        verbose_name_plural = "Рекомендации пользователям"
+
+
+class SearchTerm(models.Model):
+    """Строка инвертированного индекса поиска без FTS5 (см. posts.search)."""
+    term = models.CharField("Основа слова", max_length=64)
+    doc = models.BigIntegerField("Документ")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="+",
+                             verbose_name="Пост")
+    frequency = models.PositiveSmallIntegerField("Число вхождений")
+
+    class Meta:
+        verbose_name = "Терм поиска"
+        verbose_name_plural = "Термы поиска"
+        indexes = [
+            models.Index(fields=["term"], name="search_term"),
+            models.Index(fields=["doc"], name="search_term_doc"),
+        ]
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди ``posts.tasks``.
+
+    Выполненные задачи удаляются, в таблице остаются ждущие, занятые
+    обработчиком и окончательно упавшие.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = [
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Ошибка"),
+    ]
+
+    name = models.CharField("Функция", max_length=200)
+    payload = models.TextField("Аргументы", default="{}")
+    status = models.CharField("Состояние", max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    run_after = models.DateTimeField("Не раньше")
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    locked_by = models.CharField("Обработчик", max_length=100, blank=True)
+    locked_at = models.DateTimeField("Взята", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created = models.DateTimeField("Поставлена", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+        indexes = [
+            models.Index(fields=["status", "run_after"],
+                         name="task_status_run_after"),
         ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
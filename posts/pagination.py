@@ -0,0 +1,349 @@
+import base64
+import binascii
+import json
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.shortcuts import redirect
+
+FORWARD = "n"
+BACKWARD = "p"
+
+
+class CursorPage:
+    """Одна страница ленты, выбранная по ключу, а не по смещению."""
+
+    def __init__(self, object_list, paginator, cursor,
+                 has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<CursorPage {self.cursor or 'first'}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(FORWARD, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        if not self.object_list:
+            return self.paginator.encode_cursor(BACKWARD, None)
+        return self.paginator.encode_cursor(BACKWARD, self.object_list[0])
+
+
+class CursorPaginator:
+    """Постраничная навигация по ключу сортировки (seek-метод).
+
+    Вместо ``COUNT(*)`` и ``OFFSET`` каждая страница выбирается условием
+    «строго после/до последней показанной записи» по ``ordering``, поэтому
+    время ответа не зависит от глубины страницы. Поля ``ordering`` должны
+    быть обычными (не связанными) полями модели или аннотациями запроса,
+    последнее из них — уникальным.
+    """
+
+    cursor_based = True
+
+    def __init__(self, object_list, per_page, ordering=("-pub_date", "-id")):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(key.lstrip("-") for key in self.ordering)
+
+    def encode_cursor(self, direction, obj):
+        values = None
+        if obj is not None:
+            values = [self._dump(getattr(obj, name)) for name in self.fields]
+        payload = json.dumps([direction, values], separators=(",", ":"))
+        token = base64.urlsafe_b64encode(payload.encode())
+        return token.decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Вернуть ``(direction, values)``; битый курсор — первая страница."""
+        if not cursor:
+            return FORWARD, None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (FORWARD, BACKWARD):
+                raise ValueError(direction)
+            if values is not None:
+                if len(values) != len(self.fields):
+                    raise ValueError(values)
+                values = [self._field(name).to_python(value)
+                          for name, value in zip(self.fields, values)]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            return FORWARD, None
+        return direction, values
+
+    def get_page(self, cursor):
+        direction, values = self.decode_cursor(cursor)
+        forward = direction == FORWARD
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        ordering = self.ordering if forward else self._reversed_ordering()
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return CursorPage(rows, self, cursor if values else None,
+                              has_next=has_more,
+                              has_previous=values is not None)
+        if values is not None and not has_more:
+            # Дошли назад до начала ленты: показываем настоящую первую
+            # страницу, чтобы она не оказалась короче остальных.
+            return self.get_page(None)
+        rows.reverse()
+        return CursorPage(rows, self, cursor,
+                          has_next=values is not None,
+                          has_previous=has_more)
+
+    def forward_rows(self, cursor):
+        """Запрос строк страницы после ``cursor`` и ещё одной сверх неё.
+
+        В отличие от ``get_page`` строки не загружаются в список, их можно
+        читать через ``iterator()``; лишняя строка означает, что есть
+        следующая страница. Курсор назад открывает первую страницу.
+        """
+        direction, values = self.decode_cursor(cursor)
+        queryset = self.object_list
+        if values is not None and direction == FORWARD:
+            queryset = queryset.filter(self._seek(values, True))
+        return queryset.order_by(*self.ordering)[:self.per_page + 1]
+
+    def cursor_for_page(self, number):
+        """Курсор, открывающий страницу ``number`` обычного Paginator.
+
+        Выполняет один запрос с OFFSET и нужен только для старых ссылок
+        вида ``?page=N``. Для номера за пределами ленты возвращается
+        курсор последней страницы.
+        """
+        if number <= 1:
+            return None
+        offset = (number - 1) * self.per_page - 1
+        columns = [name for name in self.fields
+                   if name not in self.object_list.query.annotations]
+        rows = list(self.object_list.select_related(None)
+                    .order_by(*self.ordering)
+                    .only(*columns or ["pk"])[offset:offset + 1])
+        if not rows:
+            return self.encode_cursor(BACKWARD, None)
+        return self.encode_cursor(FORWARD, rows[0])
+
+    def _seek(self, values, forward):
+        condition = Q()
+        equal = {}
+        for key, name, value in zip(self.ordering, self.fields, values):
+            descending = key.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(key[1:] if key.startswith("-") else f"-{key}"
+                     for key in self.ordering)
+
+    def _field(self, name):
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(name)
+
+    @staticmethod
+    def _dump(value):
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+class ProbedFeed:
+    """Строки одной страницы ленты и её размер без ``COUNT(*)``.
+
+    Подставляется в обычные ``Paginator`` и ``Page`` вместо queryset.
+    Страница читается одним запросом с одной строкой сверх
+    ``per_page``: если она нашлась, следующая страница есть, и размер
+    ленты берётся из ``estimate()`` (счётчик или статистика SQLite), но
+    не меньше уже увиденного. Если не нашлась, размер известен точно.
+    Запрос выполняется только при первом обращении к строкам или числу
+    страниц, поэтому закэшированный фрагмент ленты обходится без него.
+    """
+
+    def __init__(self, queryset, per_page, number, estimate=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.number = number
+        self.estimate = estimate
+        self.page = None
+        self._probe = None
+
+    @property
+    def ordered(self):
+        return self.queryset.ordered
+
+    def _fetch(self):
+        offset = (self.number - 1) * self.per_page
+        return list(self.queryset[offset:offset + self.per_page + 1])
+
+    def rows(self):
+        if self._probe is None:
+            self._probe = self._fetch()
+            if not self._probe and self.number > 1:
+                # Ссылка за конец ленты: как Paginator.get_page,
+                # показываем последнюю страницу.
+                total = self.queryset.count()
+                self.number = max(1, math.ceil(total / self.per_page))
+                if self.page is not None:
+                    self.page.number = self.number
+                self._probe = self._fetch()
+        return self._probe[:self.per_page]
+
+    def count(self):
+        seen = (self.number - 1) * self.per_page + len(self.rows())
+        if len(self._probe) <= self.per_page:
+            return seen
+        estimate = self.estimate() if self.estimate else None
+        return max(estimate or 0, seen + 1)
+
+    def __len__(self):
+        return len(self.rows())
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __getitem__(self, index):
+        return self.rows()[index]
+
+
+def sqlite_stat(table, index=None):
+    """Числа ``sqlite_stat1`` для таблицы или её индекса или ``None``.
+
+    Первое число — строк в таблице, следующие — в среднем строк на одно
+    значение первых столбцов индекса. Статистику собирает ``ANALYZE``
+    (команда ``update_db_stats``); прочитанное хранится в кэше
+    ``FEED_STAT_TIMEOUT`` секунд.
+    """
+    key = f"sqlite-stat:{table}:{index or ''}"
+    stat = cache.get(key)
+    if stat is None:
+        stat = []
+        if connection.vendor == "sqlite":
+            sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s"
+            params = [table]
+            if index:
+                sql += " AND idx = %s"
+                params.append(index)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql + " LIMIT 1", params)
+                    row = cursor.fetchone()
+            except DatabaseError:
+                # Таблицы sqlite_stat1 нет, пока не выполнен ANALYZE.
+                row = None
+            if row:
+                stat = [int(value) for value in row[0].split()
+                        if value.isdigit()]
+        cache.set(key, stat, settings.FEED_STAT_TIMEOUT)
+    return stat or None
+
+
+def estimate_rows(model, index=None):
+    """Оценка числа строк ``model`` по статистике SQLite.
+
+    С ``index`` — среднее число строк на одно значение первого столбца
+    индекса, например постов в одной группе.
+    """
+    stat = sqlite_stat(model._meta.db_table, index)
+    if stat is None or len(stat) < (2 if index else 1):
+        return None
+    return stat[1] if index else stat[0]
+
+
+def paginate(request, object_list, estimate=None, ordering=None):
+    """Вернуть ``(paginator, page)`` в режиме из ``settings.FEED_PAGINATION``.
+
+    В режиме ``"offset"`` с ``FEED_COUNT = "estimated"`` число постов
+    не считается ``COUNT(*)``, а берётся из ``estimate()`` и проверки
+    следующей страницы (``ProbedFeed``). ``ordering`` — ключ
+    ``CursorPaginator``, если он отличается от обычного.
+    """
+    if settings.FEED_PAGINATION == "keyset":
+        paginator = _cursor_paginator(object_list, ordering)
+        return paginator, paginator.get_page(request.GET.get("cursor"))
+    if settings.FEED_COUNT != "estimated":
+        paginator = Paginator(object_list, settings.ITEMS_PER_PAGE)
+        return paginator, paginator.get_page(request.GET.get("page"))
+    try:
+        number = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        number = 1
+    feed = ProbedFeed(object_list, settings.ITEMS_PER_PAGE, number, estimate)
+    paginator = Paginator(feed, settings.ITEMS_PER_PAGE)
+    feed.page = Page(feed, number, paginator)
+    return paginator, feed.page
+
+
+def page_window(page, size):
+    """Номера страниц вокруг текущей, первая и последняя.
+
+    Пропуски обозначены ``None``: ``[1, None, 7, 8, 9, 10, 11, None, 40]``.
+    """
+    last = page.paginator.num_pages
+    first_shown = max(1, page.number - size)
+    last_shown = min(last, page.number + size)
+    numbers = list(range(first_shown, last_shown + 1))
+    if first_shown > 1:
+        numbers[:0] = [1] if first_shown == 2 else [1, None]
+    if last_shown < last:
+        numbers += [last] if last_shown == last - 1 else [None, last]
+    return numbers
+
+
+def _cursor_paginator(object_list, ordering=None):
+    if ordering is None:
+        return CursorPaginator(object_list, settings.ITEMS_PER_PAGE)
+    return CursorPaginator(object_list, settings.ITEMS_PER_PAGE, ordering)
+
+
+def legacy_page_redirect(request, object_list, ordering=None):
+    """Перенаправить старую ссылку ``?page=N`` на курсор в режиме keyset."""
+    if settings.FEED_PAGINATION != "keyset" or "page" not in request.GET:
+        return None
+    try:
+        number = int(request.GET["page"])
+    except ValueError:
+        number = 1
+    paginator = _cursor_paginator(object_list, ordering)
+    cursor = paginator.cursor_for_page(number)
+    if cursor is None:
+        return redirect(request.path)
+    return redirect(f"{request.path}?cursor={cursor}")
@@ -0,0 +1,319 @@
+"""Лёгкое профилирование запросов в рабочем окружении.
+
+``ProfilingMiddleware`` измеряет для каждой страницы (имени URL) полное
+время ответа, число и время SQL-запросов, время рендеринга шаблонов и
+попадания в кэш фрагментов, складывая их в гистограммы процесса. Для
+доли запросов ``PROFILING_SAMPLE_RATE`` дополнительно снимается профиль
+cProfile. Сводка доступна персоналу на ``/profiling/``, а в формате
+Prometheus — на ``/profiling/metrics/``.
+"""
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import base as template_base
+
+_local = threading.local()
+_lock = threading.Lock()
+_metrics = {}
+_profiles = {}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Верхняя граница корзины, в которую попал квантиль ``q``."""
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class ViewMetrics:
+    def __init__(self):
+        buckets = settings.PROFILING_BUCKETS
+        self.duration = Histogram(buckets)
+        self.sql_duration = Histogram(buckets)
+        self.template_duration = Histogram(buckets)
+        self.sql_queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.errors = 0
+        self.sampled = 0
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_time", "template_time", "template_depth",
+                 "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current():
+    return getattr(_local, "stats", None)
+
+
+def record_cache(hit):
+    """Отметить попадание или промах кэша в текущем запросе."""
+    stats = current()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_time += time.perf_counter() - started
+
+
+_original_render = template_base.Template.render
+
+
+def _timed_render(self, context):
+    stats = current()
+    if stats is None:
+        return _original_render(self, context)
+    # Вложенные шаблоны ({% include %}) уже входят во время внешнего.
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+def _install_template_timer():
+    template_base.Template.render = _timed_render
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        _install_template_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        profiler = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        wrapped = _start(stats, profiler)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stop(wrapped, profiler)
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        if response.streaming:
+            # Тело потокового ответа строится уже после возврата из
+            # middleware: метрики пишутся, когда поток закончится.
+            response.streaming_content = _measured_stream(
+                response.streaming_content, view, started, stats,
+                response.status_code, profiler)
+        else:
+            _record(view, time.perf_counter() - started, stats,
+                    response.status_code, profiler)
+        return response
+
+
+def _start(stats, profiler):
+    _local.stats = stats
+    # То же, что connection.execute_wrapper(), но без менеджеров
+    # контекста: middleware работает на каждом запросе.
+    wrapped = connections.all()
+    for connection in wrapped:
+        connection.execute_wrappers.append(_sql_wrapper)
+    if profiler is not None:
+        profiler.enable()
+    return wrapped
+
+
+def _stop(wrapped, profiler):
+    if profiler is not None:
+        profiler.disable()
+    for connection in wrapped:
+        connection.execute_wrappers.remove(_sql_wrapper)
+    _local.stats = None
+
+
+def _measured_stream(content, view, started, stats, status, profiler):
+    """Отдать ``content``, считая запросы и время каждой его части.
+
+    Между частями поток ждёт клиента, и в это время в потоке сервера
+    может идти другой запрос, поэтому учёт включается только на время
+    ``next()``.
+    """
+    iterator = iter(content)
+    try:
+        while True:
+            wrapped = _start(stats, profiler)
+            try:
+                chunk = next(iterator, None)
+            finally:
+                _stop(wrapped, profiler)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        _record(view, time.perf_counter() - started, stats, status, profiler)
+
+
+def _record(view, duration, stats, status, profiler):
+    with _lock:
+        metrics = _metrics.get(view)
+        if metrics is None:
+            metrics = _metrics[view] = ViewMetrics()
+        metrics.duration.observe(duration)
+        metrics.sql_duration.observe(stats.sql_time)
+        metrics.template_duration.observe(stats.template_time)
+        metrics.sql_queries += stats.sql_count
+        metrics.cache_hits += stats.cache_hits
+        metrics.cache_misses += stats.cache_misses
+        if status >= 500:
+            metrics.errors += 1
+        if profiler is not None:
+            # Сводить профили в pstats дорого, это делается только при
+            # просмотре отчёта; хранятся последние PROFILING_KEEP штук.
+            metrics.sampled += 1
+            if view not in _profiles:
+                _profiles[view] = deque(maxlen=settings.PROFILING_KEEP)
+            _profiles[view].append(profiler)
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+        _profiles.clear()
+
+
+def snapshot():
+    """Сводка по страницам для ``/profiling/``."""
+    with _lock:
+        rows = []
+        for view, metrics in sorted(_metrics.items()):
+            requests = metrics.duration.count
+            lookups = metrics.cache_hits + metrics.cache_misses
+            rows.append({
+                "view": view,
+                "requests": requests,
+                "errors": metrics.errors,
+                "mean_ms": metrics.duration.sum / requests * 1000,
+                "p50_ms": metrics.duration.quantile(0.5) * 1000,
+                "p95_ms": metrics.duration.quantile(0.95) * 1000,
+                "p99_ms": metrics.duration.quantile(0.99) * 1000,
+                "sql_queries": metrics.sql_queries / requests,
+                "sql_ms": metrics.sql_duration.sum / requests * 1000,
+                "template_ms": (metrics.template_duration.sum / requests
+                                * 1000),
+                "cache_hit_rate": (metrics.cache_hits / lookups
+                                   if lookups else None),
+                "sampled": metrics.sampled,
+            })
+        return rows
+
+
+def profile_report(view, limit=25):
+    """Самые дорогие функции по собранным профилям страницы ``view``."""
+    with _lock:
+        profilers = list(_profiles.get(view, ()))
+    if not profilers:
+        return ""
+    output = io.StringIO()
+    stats = pstats.Stats(*profilers, stream=output)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _histogram_lines(name, view, histogram):
+    for bound, total in histogram.cumulative():
+        yield f"{name}_bucket{{{_labels(view=view, le=bound)}}} {total}"
+    yield (f"{name}_bucket{{{_labels(view=view, le='+Inf')}}} "
+           f"{histogram.count}")
+    yield f"{name}_sum{{{_labels(view=view)}}} {histogram.sum}"
+    yield f"{name}_count{{{_labels(view=view)}}} {histogram.count}"
+
+
+HISTOGRAMS = (
+    ("yatube_request_duration_seconds", "duration",
+     "Время ответа страницы"),
+    ("yatube_sql_duration_seconds", "sql_duration",
+     "Время SQL-запросов за один ответ"),
+    ("yatube_template_duration_seconds", "template_duration",
+     "Время рендеринга шаблонов за один ответ"),
+)
+COUNTERS = (
+    ("yatube_sql_queries_total", "sql_queries", "Число SQL-запросов"),
+    ("yatube_cache_hits_total", "cache_hits", "Попадания в кэш фрагментов"),
+    ("yatube_cache_misses_total", "cache_misses", "Промахи кэша фрагментов"),
+    ("yatube_request_errors_total", "errors", "Ответы с кодом 5xx"),
+)
+
+
+def prometheus():
+    """Метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    with _lock:
+        views = sorted(_metrics.items())
+        for name, attribute, help_text in HISTOGRAMS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for view, metrics in views:
+                lines.extend(_histogram_lines(name, view,
+                                              getattr(metrics, attribute)))
+        for name, attribute, help_text in COUNTERS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for view, metrics in views:
+                lines.append(f"{name}{{{_labels(view=view)}}} "
+                             f"{getattr(metrics, attribute)}")
+    return "\n".join(lines) + "\n"
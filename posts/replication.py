@@ -0,0 +1,26 @@
+"""Замена репликации для локальной проверки ``ReplicaRouter``.
+
+Реплики — отдельные файлы SQLite, которые целиком перезаписываются
+копией основной базы через backup API. Между копированиями реплика
+отстаёт от основной базы, как настоящая асинхронная реплика.
+"""
+import sqlite3
+
+from django.conf import settings
+from django.db import connections
+
+from .routers import PRIMARY
+
+
+def sync(aliases=None):
+    """Скопировать основную базу в реплики ``aliases`` (по умолчанию все)."""
+    if aliases is None:
+        aliases = settings.DATABASE_REPLICAS
+    primary = connections[PRIMARY]
+    primary.ensure_connection()
+    for alias in aliases:
+        replica = sqlite3.connect(connections[alias].settings_dict["NAME"])
+        try:
+            primary.connection.backup(replica)
+        finally:
+            replica.close()
@@ -0,0 +1,87 @@
+"""Чтение с реплик базы данных.
+
+``ReplicaRouter`` отправляет запросы на чтение в одну из баз
+``settings.DATABASE_REPLICAS``, а запись — в основную базу ``default``.
+Читать с реплики разрешается только внутри GET/HEAD-запроса, который
+пометил ``ReplicaMiddleware``: фоновые задачи, команды и сигналы
+по умолчанию читают с основной базы.
+
+После POST пользователь ещё ``REPLICA_STICKY_SECONDS`` секунд читает
+с основной базы (метка хранится в сессии), поэтому свои изменения он
+видит сразу, даже если реплика отстаёт.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = "default"
+STICKY_SESSION_KEY = "_primary_until"
+# Сессии читаются только с основной базы: по ним решается, можно ли
+# читать с реплики.
+PRIMARY_APPS = {"sessions"}
+
+_local = threading.local()
+
+
+def reading_replica():
+    """Читает ли текущий запрос с реплики."""
+    return (getattr(_local, "replica_ok", False)
+            and bool(settings.DATABASE_REPLICAS))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reading_replica():
+            return None
+        if model._meta.app_label in PRIMARY_APPS:
+            return PRIMARY
+        # Внутри транзакции читаем то, что в ней же и записали.
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # Объекты, прочитанные с реплики, сохраняются в основную базу;
+        # в остальном — обычный выбор Django (база объекта или default).
+        instance = hints.get("instance")
+        if instance is not None and (instance._state.db
+                                     in settings.DATABASE_REPLICAS):
+            return PRIMARY
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с данными от основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Разрешить чтение с реплик безопасным запросам вне окна после POST."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        safe = request.method in ("GET", "HEAD")
+        sticky_until = request.session.get(STICKY_SESSION_KEY, 0)
+        _local.replica_ok = safe and sticky_until < time.time()
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.replica_ok = False
+        if not safe:
+            request.session[STICKY_SESSION_KEY] = (
+                time.time() + settings.REPLICA_STICKY_SECONDS)
+        return response
@@ -0,0 +1,236 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Документ индекса — текст поста или одного комментария, приведённый к
+основам слов русским стеммером. Идентификатор документа кодирует его
+вид: ``pk * 2`` для поста и ``pk * 2 + 1`` для комментария. Индекс
+хранится в виртуальной таблице SQLite FTS5 ``posts_search``, а если
+FTS5 недоступен — в таблице ``SearchTerm``, которую ранжирует Python.
+Оба варианта обновляются сигналами при сохранении и удалении постов и
+комментариев; ``rebuild_search_index`` строит индекс заново.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Comment, Post, SearchTerm
+from .stemmer import stem
+
+FTS_TABLE = "posts_search"
+POST, COMMENT = 0, 1
+# Совпадение в тексте поста весит больше, чем в комментарии.
+KIND_WEIGHTS = {POST: 2.0, COMMENT: 1.0}
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [stem(word)[:64] for word in WORD.findall(text.lower())]
+
+
+def doc_id(kind, pk):
+    return pk * 2 + kind
+
+
+class Fts5Index:
+    name = "fts5"
+
+    def update(self, doc, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [doc])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, body, post_id) "
+                f"VALUES (%s, %s, %s)",
+                [doc, " ".join(tokenize(text)), post_id])
+
+    def bulk_update(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, body, post_id) "
+                f"VALUES (%s, %s, %s)",
+                [(doc, " ".join(tokenize(text)), post_id)
+                 for doc, post_id, text in rows])
+
+    def remove(self, doc):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [doc])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def _match(self, terms):
+        return " ".join(f'"{term}"' for term in terms)
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(DISTINCT post_id) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s", [self._match(terms)])
+            return cursor.fetchone()[0]
+
+    def search(self, terms, offset, limit):
+        # Скрытый столбец rank равен bm25(): чем меньше, тем лучше
+        # совпадение. Саму bm25() внутри агрегата FTS5 вызвать не даёт.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT post_id, MIN(score) AS best FROM ("
+                f"SELECT post_id, rank * CASE rowid % 2 "
+                f"WHEN {POST} THEN {KIND_WEIGHTS[POST]} "
+                f"ELSE {KIND_WEIGHTS[COMMENT]} END AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s) "
+                f"GROUP BY post_id ORDER BY best, post_id DESC "
+                f"LIMIT %s OFFSET %s",
+                [self._match(terms), limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TableIndex:
+    name = "table"
+
+    def update(self, doc, post_id, text):
+        self.remove(doc)
+        self.bulk_update([(doc, post_id, text)])
+
+    def bulk_update(self, rows):
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(term=term, doc=doc, post_id=post_id,
+                        frequency=min(frequency, 32767))
+             for doc, post_id, text in rows
+             for term, frequency in Counter(tokenize(text)).items()],
+            batch_size=500,
+        )
+
+    def remove(self, doc):
+        SearchTerm.objects.filter(doc=doc).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def _ranked(self, terms):
+        rows = (SearchTerm.objects.filter(term__in=set(terms))
+                .values_list("term", "doc", "post_id", "frequency"))
+        docs = defaultdict(dict)
+        posts = {}
+        for term, doc, post_id, frequency in rows.iterator():
+            docs[doc][term] = frequency
+            posts[doc] = post_id
+        total = Post.objects.count() + Comment.objects.count()
+        document_frequency = Counter(term for found in docs.values()
+                                     for term in found)
+        scores = defaultdict(float)
+        for doc, found in docs.items():
+            if len(found) < len(set(terms)):
+                continue
+            score = KIND_WEIGHTS[doc % 2] * sum(
+                (1 + math.log(frequency))
+                * math.log(1 + total / document_frequency[term])
+                for term, frequency in found.items()
+            )
+            post_id = posts[doc]
+            scores[post_id] = max(scores[post_id], score)
+        return sorted(scores, key=lambda post_id: (-scores[post_id],
+                                                   -post_id))
+
+    def count(self, terms):
+        return len(self._ranked(terms))
+
+    def search(self, terms, offset, limit):
+        return self._ranked(terms)[offset:offset + limit]
+
+
+_fts5_ready = None
+
+
+def get_index():
+    global _fts5_ready
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        if _fts5_ready is None:
+            _fts5_ready = (
+                connection.vendor == "sqlite"
+                and FTS_TABLE in connection.introspection.table_names()
+            )
+        backend = "fts5" if _fts5_ready else "table"
+    return Fts5Index() if backend == "fts5" else TableIndex()
+
+
+def index_post(post):
+    get_index().update(doc_id(POST, post.pk), post.pk, post.text)
+
+
+def index_comment(comment):
+    get_index().update(doc_id(COMMENT, comment.pk), comment.post_id,
+                       comment.text)
+
+
+def remove_post(post_id):
+    get_index().remove(doc_id(POST, post_id))
+
+
+def remove_comment(comment_id):
+    get_index().remove(doc_id(COMMENT, comment_id))
+
+
+def rebuild(chunk_size=2000):
+    """Построить индекс заново; возвращает число документов."""
+    index = get_index()
+    index.clear()
+    total = 0
+    sources = [
+        (POST, Post.objects.order_by().values_list("pk", "pk", "text")),
+        (COMMENT, Comment.objects.order_by()
+         .values_list("pk", "post_id", "text")),
+    ]
+    for kind, rows in sources:
+        batch = []
+        for pk, post_id, text in rows.iterator(chunk_size=chunk_size):
+            batch.append((doc_id(kind, pk), post_id, text))
+            if len(batch) >= chunk_size:
+                index.bulk_update(batch)
+                total += len(batch)
+                batch = []
+        index.bulk_update(batch)
+        total += len(batch)
+    return total
+
+
+def search_post_ids(query, offset=0, limit=None):
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if limit is None:
+        limit = settings.SEARCH_MAX_RESULTS
+    return get_index().search(terms, offset, limit)
+
+
+class SearchResults:
+    """Найденные посты по убыванию релевантности, пригодные для Paginator."""
+
+    def __init__(self, query):
+        self.terms = tokenize(query)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = (min(get_index().count(self.terms),
+                               settings.SEARCH_MAX_RESULTS)
+                           if self.terms else 0)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = min(index.stop, self.count())
+        if not self.terms or stop <= start:
+            return []
+        post_ids = get_index().search(self.terms, start, stop - start)
+        posts = Post.objects.select_related("author", "group").in_bulk(
+            post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
@@ -0,0 +1,207 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, counters, feed, search, thumbnails, trending
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "posts_count", 1)
+        feed.schedule_fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follow_feed(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.user_id, "following_count", 1)
+        counters.bump_user(instance.author_id, "followers_count", 1)
+        feed.backfill(instance.user_id, instance.author_id)
+        feed.update_pull_status(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_follow_feed(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, "following_count", -1)
+    counters.bump_user(instance.author_id, "followers_count", -1)
+    feed.prune(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_post(sender, instance, **kwargs):
+    saved = None
+    if not instance._state.adding:
+        saved = (Post.objects.filter(pk=instance.pk)
+                 .values_list("group_id", "image").first())
+    instance._saved_group_id, saved_image = saved or (None, "")
+    instance._saved_image = saved_image or ""
+    instance._image_changed = (
+        (instance.image.name or "") != instance._saved_image)
+    if instance._image_changed:
+        instance.thumbnails = ""
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if not instance._image_changed:
+        return
+    if instance._saved_image:
+        thumbnails.discard(instance.pk, instance._saved_image)
+    if instance.image:
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def discard_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        thumbnails.discard(instance.pk, instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    scopes = caching.post_scopes(instance.author_id, instance.group_id)
+    saved_group_id = getattr(instance, "_saved_group_id", None)
+    if saved_group_id not in (None, instance.group_id):
+        scopes.append(caching.group_scope(saved_group_id))
+    caching.bump(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    cache.delete(caching.card_key(instance))
+
+
+def _card_fields_changed(instance, fields, update_fields):
+    """Изменились ли показанные на карточках постов поля ``fields``."""
+    if instance._state.adding:
+        return False
+    # Например, вход пользователя сохраняет только last_login.
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return False
+    saved = (type(instance)._default_manager.filter(pk=instance.pk)
+             .values_list(*fields).first())
+    return saved not in (None, tuple(getattr(instance, name)
+                                     for name in fields))
+
+
+@receiver(pre_save, sender=Group)
+def remember_saved_group(sender, instance, update_fields=None, **kwargs):
+    instance._card_changed = _card_fields_changed(
+        instance, ("slug", "title"), update_fields)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_saved_user(sender, instance, update_fields=None, **kwargs):
+    instance._card_changed = _card_fields_changed(
+        instance, ("username",), update_fields)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    # Ключ карточки меняется с post.updated: переименование группы
+    # или автора бывает редко и сдвигает его всем их постам.
+    if getattr(instance, "_card_changed", False):
+        posts = Post.objects.filter(group=instance)
+        # Карточки видны и на страницах авторов этих постов.
+        author_ids = set(posts.order_by().values_list("author_id",
+                                                      flat=True))
+        posts.update(updated=timezone.now())
+        caching.bump(caching.ALL_POSTS, caching.group_scope(instance.pk),
+                     *map(caching.author_scope, author_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_author_cards(sender, instance, **kwargs):
+    if getattr(instance, "_card_changed", False):
+        posts = Post.objects.filter(author=instance)
+        group_ids = set(posts.exclude(group=None).order_by()
+                        .values_list("group_id", flat=True))
+        posts.update(updated=timezone.now())
+        # Имя автора видно и под его комментариями на страницах постов.
+        commented = set(Comment.objects.filter(author=instance).order_by()
+                        .values_list("post_id", flat=True))
+        caching.bump(caching.ALL_POSTS, caching.author_scope(instance.pk),
+                     *map(caching.group_scope, group_ids),
+                     *map(caching.comments_scope, commented))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, **kwargs):
+    # Карточка поста показывает число комментариев.
+    post = (Post.objects.filter(pk=instance.post_id)
+            .values_list("author_id", "group_id").first())
+    scopes = [caching.comments_scope(instance.post_id)]
+    if post is not None:
+        scopes += caching.post_scopes(*post)
+    caching.bump(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    caching.bump(caching.follows_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def trend_new_post(sender, instance, created, **kwargs):
+    if created:
+        trending.record_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def trend_new_comment(sender, instance, created, **kwargs):
+    if created:
+        trending.record_comment(instance)
+
+
+@receiver(post_delete, sender=Post)
+def forget_trending_post(sender, instance, **kwargs):
+    trending.forget_post(instance.pk)
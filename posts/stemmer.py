@@ -0,0 +1,111 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Реализация алгоритма https://snowballstem.org/algorithms/russian/stemmer.html
+без внешних зависимостей. Слова не на кириллице возвращаются как есть.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (("в", "вши", "вшись"),
+                     ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+ADJECTIVE = ("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой",
+             "ем", "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых",
+             "ую", "юю", "ая", "яя", "ою", "ею")
+PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+REFLEXIVE = ("ся", "сь")
+VERB = (("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но",
+         "ет", "ют", "ны", "ть", "ешь", "нно"),
+        ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей",
+         "уй", "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят",
+         "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"))
+NOUN = ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии",
+        "и", "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам",
+        "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия",
+        "ья", "я")
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+CYRILLIC = re.compile("[а-я]")
+
+
+def _after_vowel(word, start):
+    """Позиция после первой пары «гласная, согласная» правее ``start``."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, region, groups):
+    """Отрезать самое длинное окончание из ``groups`` внутри ``region``.
+
+    ``groups`` — пара (окончания после «а»/«я», прочие окончания) или
+    просто кортеж окончаний. Возвращает ``None``, если отрезать нечего.
+    """
+    if isinstance(groups[0], tuple):
+        after_a, plain = groups
+    else:
+        after_a, plain = (), groups
+    candidates = sorted(after_a + plain, key=len, reverse=True)
+    for ending in candidates:
+        if not word.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if len(stem) < region:
+            return None
+        if ending in after_a and ending not in plain:
+            if len(stem) - 1 < region or stem[-1] not in "ая":
+                return None
+        return stem
+    return None
+
+
+def _step1(word, rv):
+    """Отрезать окончание деепричастия, прилагательного, глагола или
+    существительного."""
+    stemmed = _strip(word, rv, PERFECTIVE_GERUND)
+    if stemmed is not None:
+        return stemmed
+    word = _strip(word, rv, REFLEXIVE) or word
+    stemmed = _strip(word, rv, ADJECTIVE)
+    if stemmed is not None:
+        return _strip(stemmed, rv, PARTICIPLE) or stemmed
+    stemmed = _strip(word, rv, VERB)
+    if stemmed is None:
+        stemmed = _strip(word, rv, NOUN)
+    return word if stemmed is None else stemmed
+
+
+def _step4(word, rv):
+    """Убрать двойное «н», превосходную степень или мягкий знак."""
+    if word.endswith("нн") and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith("нн") and len(word) - 1 >= rv:
+            word = word[:-1]
+        return word
+    if word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+# Частые слова повторяются постоянно, а стемминг на Python дорогой.
+@lru_cache(maxsize=65536)
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    if not CYRILLIC.search(word):
+        return word
+    rv = next((i + 1 for i, char in enumerate(word) if char in VOWELS),
+              len(word))
+    r2 = _after_vowel(word, _after_vowel(word, 0))
+    word = _step1(word, rv)
+    # Шаг 2.
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+    # Шаг 3.
+    word = _strip(word, r2, DERIVATIONAL) or word
+    return _step4(word, rv)
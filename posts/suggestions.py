@@ -0,0 +1,243 @@
+"""Рекомендации авторов и групп, посчитанные заранее.
+
+Команда ``compute_suggestions`` пересчитывает их сразу для всех
+пользователей по двум статистикам:
+
+* совместные подписки — авторы, на которых подписаны авторы из подписок
+  пользователя. Вклад посредника делится на корень из числа его
+  подписок, чтобы подписанные на всех не перевешивали остальных;
+* совместные публикации — группы, в которых пишут авторы из подписок
+  и сам пользователь, и самые активные авторы этих групп.
+
+Граф подписок и доли постов авторов по группам держатся в памяти как
+разреженные строки (словари и кортежи id), и рекомендации пользователя —
+произведение его строки на эти матрицы. Пачки пользователей считаются
+в пуле процессов, которые получают данные при fork. Результат —
+одна строка ``UserSuggestions`` на пользователя; страница читает её
+по первичному ключу (``for_user``).
+"""
+import heapq
+import json
+import math
+import multiprocessing
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import caching, graph
+from .models import Follow, Group, Post, UserStats, UserSuggestions
+
+User = get_user_model()
+
+# Сколько самых активных авторов группы рекомендуется по её оценке.
+GROUP_AUTHORS = 20
+# Сколько групп с лучшей оценкой дают авторов для рекомендаций.
+TOP_GROUPS = 5
+# Вес совместных публикаций относительно совместных подписок.
+CO_POSTING_WEIGHT = 0.5
+# Собственные посты пользователя в группе весят как подписка на автора,
+# пишущего только в ней.
+OWN_POSTS_WEIGHT = 1.0
+BATCH_SIZE = 500
+
+# Данные для процессов пула: заполняются перед fork.
+_stats = None
+
+
+class Stats:
+    """Разреженные матрицы, по которым считаются рекомендации."""
+
+    def __init__(self, following, posting, group_authors,
+                 popular_authors, popular_groups):
+        # id пользователя -> кортеж id авторов, на которых он подписан.
+        self.following = following
+        # id автора -> {id группы: доля его постов в этой группе}.
+        self.posting = posting
+        # id группы -> [(id автора, доля группы в его постах), ...].
+        self.group_authors = group_authors
+        # Для пользователей без подписок и постов.
+        self.popular_authors = popular_authors
+        self.popular_groups = popular_groups
+
+
+def load(limit):
+    """Прочитать подписки и публикации одним проходом по каждой таблице."""
+    following = defaultdict(list)
+    follows = Follow.objects.order_by().values_list("user_id", "author_id")
+    for user_id, author_id in follows.iterator():
+        following[user_id].append(author_id)
+
+    posts = (Post.objects.filter(group__isnull=False).order_by()
+             .values_list("author_id", "group_id").annotate(total=Count("id")))
+    counts = defaultdict(dict)
+    group_posts = Counter()
+    for author_id, group_id, total in posts.iterator():
+        counts[author_id][group_id] = total
+        group_posts[group_id] += total
+    posting = {}
+    group_authors = defaultdict(list)
+    for author_id, groups in counts.items():
+        author_total = sum(groups.values())
+        posting[author_id] = {group_id: total / author_total
+                              for group_id, total in groups.items()}
+        for group_id, total in groups.items():
+            group_authors[group_id].append((author_id, total))
+    for group_id, authors in group_authors.items():
+        authors.sort(key=lambda item: (-item[1], item[0]))
+        group_authors[group_id] = [
+            (author_id, total / group_posts[group_id])
+            for author_id, total in authors[:GROUP_AUTHORS]]
+
+    popular_authors = list(
+        UserStats.objects.filter(followers_count__gt=0)
+        .order_by("-followers_count", "pk")
+        .values_list("pk", flat=True)[:limit + 1])
+    popular_groups = [group_id for group_id, _ in sorted(
+        group_posts.items(), key=lambda item: (-item[1], item[0]))][:limit]
+    return Stats({user_id: tuple(ids) for user_id, ids in following.items()},
+                 posting, dict(group_authors), popular_authors,
+                 popular_groups)
+
+
+def suggest(stats, user_id, limit):
+    """Рекомендованные ``user_id`` авторы и группы: два списка id."""
+    followees = stats.following.get(user_id, ())
+    own_groups = stats.posting.get(user_id, {})
+    groups = _score_groups(stats, followees, own_groups)
+    authors = _score_authors(stats, followees, groups)
+
+    excluded = set(followees)
+    excluded.add(user_id)
+    author_ids = [author_id
+                  for author_id in _top(authors, limit + len(excluded))
+                  if author_id not in excluded][:limit]
+    group_ids = [group_id
+                 for group_id in _top(groups, limit + len(own_groups))
+                 if group_id not in own_groups][:limit]
+    if not author_ids:
+        author_ids = [author_id for author_id in stats.popular_authors
+                      if author_id not in excluded][:limit]
+    if not group_ids:
+        group_ids = [group_id for group_id in stats.popular_groups
+                     if group_id not in own_groups][:limit]
+    return author_ids, group_ids
+
+
+def _score_groups(stats, followees, own_groups):
+    """Группы, где пишут авторы из подписок и сам пользователь."""
+    groups = defaultdict(float)
+    for author_id in followees:
+        for group_id, share in stats.posting.get(author_id, {}).items():
+            groups[group_id] += share
+    for group_id, share in own_groups.items():
+        groups[group_id] += OWN_POSTS_WEIGHT * share
+    return groups
+
+
+def _score_authors(stats, followees, groups):
+    """Подписки подписок и активные авторы лучших групп ``groups``."""
+    authors = defaultdict(float)
+    for author_id in followees:
+        second = stats.following.get(author_id)
+        if second:
+            weight = 1 / math.sqrt(len(second))
+            for candidate in second:
+                authors[candidate] += weight
+    for group_id in _top(groups, TOP_GROUPS):
+        score = groups[group_id]
+        for candidate, share in stats.group_authors.get(group_id, ()):
+            authors[candidate] += CO_POSTING_WEIGHT * score * share
+    return authors
+
+
+def _top(scores, count):
+    """``count`` ключей с наибольшей оценкой; равные — в порядке появления."""
+    return heapq.nlargest(count, scores, key=scores.__getitem__)
+
+
+def _suggest_chunk(args):
+    user_ids, limit = args
+    return [(user_id, *suggest(_stats, user_id, limit))
+            for user_id in user_ids]
+
+
+def compute(processes=1, limit=None, chunk_size=1000):
+    """Пересчитать рекомендации всех пользователей; вернуть их число."""
+    global _stats
+    limit = limit or settings.SUGGESTIONS_PER_USER
+    _stats = load(limit)
+    user_ids = list(User.objects.order_by("pk").values_list("pk", flat=True))
+    chunks = [(user_ids[start:start + chunk_size], limit)
+              for start in range(0, len(user_ids), chunk_size)]
+    try:
+        if processes > 1:
+            # Процессы получают _stats при fork и не трогают базу.
+            with multiprocessing.get_context("fork").Pool(processes) as pool:
+                results = [row for rows in pool.imap(_suggest_chunk, chunks)
+                           for row in rows]
+        else:
+            results = [row for chunk in chunks
+                       for row in _suggest_chunk(chunk)]
+    finally:
+        _stats = None
+    save(results)
+    return len(results)
+
+
+@transaction.atomic
+def save(results):
+    """Заменить все строки ``UserSuggestions`` результатами ``compute``."""
+    author_ids = sorted({author_id for _, authors, _ in results
+                         for author_id in authors})
+    usernames = {}
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        usernames.update(User.objects.filter(
+            pk__in=author_ids[start:start + BATCH_SIZE])
+            .values_list("pk", "username"))
+    groups = {pk: [slug, title] for pk, slug, title
+              in Group.objects.values_list("pk", "slug", "title")}
+    # Пользователи, удалённые во время расчёта, пропускаются.
+    existing = set(User.objects.values_list("pk", flat=True))
+    now = timezone.now()
+    UserSuggestions.objects.all().delete()
+    UserSuggestions.objects.bulk_create(
+        (UserSuggestions(
+            user_id=user_id,
+            authors=json.dumps([[author_id, usernames[author_id]]
+                                for author_id in authors
+                                if author_id in usernames],
+                               ensure_ascii=False),
+            groups=json.dumps([groups[group_id] for group_id in group_ids
+                               if group_id in groups],
+                              ensure_ascii=False),
+            computed=now)
+         for user_id, authors, group_ids in results
+         if user_id in existing),
+        batch_size=BATCH_SIZE)
+    caching.bump(caching.SUGGESTIONS)
+
+
+def for_user(user, exclude=None):
+    """Рекомендации для страницы: ``(авторы, группы)`` списками словарей.
+
+    Одна строка по первичному ключу; авторы, на которых пользователь
+    подписался после расчёта, и ``exclude`` отбрасываются.
+    """
+    if not user.is_authenticated:
+        return [], []
+    row = (UserSuggestions.objects.filter(pk=user.pk)
+           .values_list("authors", "groups").first())
+    if row is None:
+        return [], []
+    followees = graph.followee_ids(user.pk)
+    shown = settings.SUGGESTIONS_SHOWN
+    authors = [{"id": author_id, "username": username}
+               for author_id, username in json.loads(row[0])
+               if author_id not in followees and author_id != exclude]
+    groups = [{"slug": slug, "title": title}
+              for slug, title in json.loads(row[1])]
+    return authors[:shown], groups[:shown]
@@ -0,0 +1,240 @@
+"""Очередь фоновых задач в базе данных, без отдельного брокера.
+
+Задача — вызов функции по её полному имени с аргументами, которые
+можно записать в JSON. ``enqueue`` записывает строку ``Task`` в той же
+транзакции, что и изменения, ради которых задача ставится, поэтому
+задача не потеряется и не выполнится раньше, чем они сохранятся.
+
+Режим выполнения задаёт ``settings.TASKS_MODE``:
+
+* ``"sync"`` — задача выполняется сразу внутри ``enqueue``;
+* ``"thread"`` — после коммита просыпаются ``TASKS_CONCURRENCY``
+  потоков этого же процесса и выполняют задачи, пока очередь не
+  опустеет; при запуске процесса (``start_threads`` из ``wsgi.py``)
+  они же подбирают задачи, оставшиеся от прошлого запуска;
+* ``"worker"`` — задачи выполняет отдельный процесс
+  ``manage.py run_tasks``.
+
+Упавшая задача повторяется через ``TASKS_RETRY_DELAY`` секунд, каждый
+следующий раз вдвое позже, но не позже ``TASKS_RETRY_MAX_DELAY``.
+После ``TASKS_MAX_ATTEMPTS`` попыток она остаётся в таблице с
+состоянием ``failed``. Пока задача выполняется, обработчик продлевает
+её блокировку. Задачу, блокировку которой не продлевали
+``TASKS_LOCK_TIMEOUT`` секунд (процесс упал), возвращает в очередь
+``requeue_stale``: его вызывают ``run_tasks`` и потоки режима
+``"thread"``, пока ждут задач.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Сколько ближайших задач просматривается при попытке взять одну:
+# остальные могли уже забрать другие обработчики.
+CLAIM_CANDIDATES = 10
+
+_lock = threading.Lock()
+_threads = []
+# Будит потоки режима "thread", ждущие повторов, когда появилась задача.
+_wakeup = threading.Event()
+
+
+def task_name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue(func, **kwargs):
+    """Поставить вызов ``func(**kwargs)`` в очередь."""
+    if settings.TASKS_MODE == "sync":
+        func(**kwargs)
+        return None
+    task = Task.objects.create(name=task_name(func),
+                               payload=json.dumps(kwargs),
+                               run_after=timezone.now())
+    if settings.TASKS_MODE == "thread":
+        transaction.on_commit(_wake_threads)
+    return task
+
+
+def worker_name():
+    return (f"{socket.gethostname()}:{os.getpid()}:"
+            f"{threading.current_thread().name}")
+
+
+def claim(name=None):
+    """Взять ближайшую задачу, которой пора выполняться, или ``None``."""
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(status=Task.QUEUED, run_after__lte=now)
+        .order_by("run_after").values_list("pk", flat=True)
+        [:CLAIM_CANDIDATES])
+    for pk in candidates:
+        taken = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=name or worker_name(),
+            locked_at=now, attempts=F("attempts") + 1)
+        if taken:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+@contextmanager
+def _lease(task):
+    """Продлевать блокировку ``task``, пока выполняется блок ``with``.
+
+    Иначе задачу, которая работает дольше ``TASKS_LOCK_TIMEOUT``,
+    ``requeue_stale`` вернул бы в очередь и её выполнил бы второй
+    обработчик.
+    """
+    done = threading.Event()
+
+    def renew():
+        try:
+            while not done.wait(settings.TASKS_LOCK_TIMEOUT / 3):
+                Task.objects.filter(
+                    pk=task.pk, status=Task.RUNNING,
+                    locked_by=task.locked_by,
+                ).update(locked_at=timezone.now())
+        except Exception:
+            logger.exception("Не удалось продлить блокировку задачи %s",
+                             task)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renew, daemon=True,
+                              name=f"lease-{task.pk}")
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def execute(task):
+    """Выполнить взятую задачу и удалить её или назначить повтор."""
+    try:
+        with _lease(task):
+            import_string(task.name)(**json.loads(task.payload))
+    except Exception:
+        error = traceback.format_exc()
+        if task.attempts >= settings.TASKS_MAX_ATTEMPTS:
+            logger.error("Задача %s не выполнена за %s попыток:\n%s",
+                         task, task.attempts, error)
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.FAILED, last_error=error)
+            return False
+        delay = min(settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1),
+                    settings.TASKS_RETRY_MAX_DELAY)
+        logger.warning("Задача %s упала, повтор через %s с:\n%s",
+                       task, delay, error)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.QUEUED, last_error=error, locked_by="",
+            locked_at=None,
+            run_after=timezone.now() + timedelta(seconds=delay))
+        return False
+    Task.objects.filter(pk=task.pk).delete()
+    return True
+
+
+def run_one(name=None):
+    """Выполнить одну задачу; ``False``, если выполнять нечего."""
+    task = claim(name)
+    if task is None:
+        return False
+    execute(task)
+    return True
+
+
+def requeue_stale():
+    """Вернуть в очередь задачи упавших обработчиков."""
+    stale = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Task.objects.filter(status=Task.RUNNING,
+                               locked_at__lt=stale).update(
+        status=Task.QUEUED, locked_by="", locked_at=None,
+        run_after=timezone.now())
+
+
+def start_threads():
+    """Вернуть в очередь задачи упавшего процесса и запустить потоки.
+
+    Вызывается при запуске процесса в режиме ``"thread"``: иначе
+    задачи, оставшиеся после перезапуска, ждали бы следующего
+    ``enqueue``.
+    """
+    requeue_stale()
+    _wake_threads()
+
+
+def _wake_threads():
+    with _lock:
+        _wakeup.set()
+        _threads[:] = [thread for thread in _threads if thread.is_alive()]
+        while len(_threads) < settings.TASKS_CONCURRENCY:
+            thread = threading.Thread(target=_drain, daemon=True,
+                                      name=f"tasks-{len(_threads) + 1}")
+            _threads.append(thread)
+            thread.start()
+
+
+def _idle_timeout():
+    """Сколько секунд ждать, пока появится работа; ``None`` — её нет.
+
+    Работа — ближайший повтор или истечение блокировки задачи, которую
+    выполняет другой обработчик: если он упал, её вернёт
+    ``requeue_stale``.
+    """
+    pending = Task.objects.aggregate(
+        run_after=Min("run_after", filter=Q(status=Task.QUEUED)),
+        locked_at=Min("locked_at", filter=Q(status=Task.RUNNING)))
+    moments = []
+    if pending["run_after"] is not None:
+        moments.append(pending["run_after"])
+    if pending["locked_at"] is not None:
+        moments.append(pending["locked_at"] + timedelta(
+            seconds=settings.TASKS_LOCK_TIMEOUT))
+    if not moments:
+        return None
+    return max((min(moments) - timezone.now()).total_seconds(), 0)
+
+
+def _drain():
+    """Выполнять задачи, пока в очереди есть хоть одна, потом выйти."""
+    try:
+        while True:
+            if run_one():
+                continue
+            requeue_stale()
+            # Проверка и выход — под той же блокировкой, что и запуск
+            # потоков: задача, поставленная после проверки, разбудит
+            # новый поток.
+            with _lock:
+                timeout = _idle_timeout()
+                if timeout is None:
+                    _threads.remove(threading.current_thread())
+                    return
+                _wakeup.clear()
+            # Остались повторы, время которых ещё не пришло, или задачи
+            # других обработчиков: до их срока очередь не опрашивается,
+            # раньше поток разбудит только новая задача.
+            _wakeup.wait(timeout)
+    except Exception:
+        logger.exception("Поток очереди задач остановлен")
+        with _lock:
+            if threading.current_thread() in _threads:
+                _threads.remove(threading.current_thread())
+    finally:
+        connection.close()
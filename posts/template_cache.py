@@ -0,0 +1,43 @@
+"""Компиляция шаблонов при запуске рабочего процесса.
+
+С ``cached.Loader`` каждый шаблон разбирается один раз на процесс, но
+этот раз приходится на первый запрос к странице. ``warm_templates()``
+разбирает все шаблоны из каталогов ``DIRS`` заранее; ``wsgi.py``
+вызывает его при запуске, если включён ``settings.TEMPLATE_WARMUP``.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    """Имена всех ``.html``-шаблонов каталога для ``get_template``."""
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.endswith(".html"):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, "/")
+
+
+def warm_templates():
+    """Скомпилировать шаблоны; вернуть ``[(имя, секунды)]``."""
+    timings = []
+    for backend in engines.all():
+        for directory in getattr(backend, "dirs", ()):
+            for name in template_names(directory):
+                started = time.perf_counter()
+                try:
+                    backend.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception("Шаблон %s не компилируется", name)
+                    continue
+                elapsed = time.perf_counter() - started
+                timings.append((name, elapsed))
+                logger.debug("Шаблон %s: %.2f мс", name, elapsed * 1000)
+    logger.info("Скомпилировано шаблонов: %d за %.1f мс", len(timings),
+                sum(elapsed for _, elapsed in timings) * 1000)
+    return timings
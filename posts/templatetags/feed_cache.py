@@ -0,0 +1,99 @@
+import re
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import profiling
+from posts.caching import card_key, get_or_build
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+
+        def build():
+            with context.push({DEFER_ACTIONS: True}):
+                return self.nodelist.render(context)
+
+        body = get_or_build(key, build)
+        request = context.get("request")
+        return mark_safe(DEFERRED_ACTIONS.sub(
+            lambda match: _render_actions(match, request), body))
+
+
+@register.tag("feedcache")
+def do_feedcache(parser, token):
+    """Кэшировать фрагмент ленты без ограничения по времени.
+
+    Использование::
+
+        {% feedcache index_page feed_version page.number %}
+            ...
+        {% endfeedcache %}
+
+    В ``vary_on`` должна входить версия ленты из ``posts.caching``:
+    фрагмент устаревает при смене её поколения. Фрагмент общий для всех
+    зрителей: ссылки карточек ``post_card`` внутри него подставляются
+    после чтения из кэша.
+    """
+    nodelist = parser.parse(("endfeedcache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 1 argument.")
+    return FeedCacheNode(nodelist, tokens[1],
+                         [parser.compile_filter(t) for t in tokens[2:]])
+
+
+ACTIONS_MARKER = "<!-- post-card-actions -->"
+# Внутри feedcache вместо ссылок остаётся метка с тем, что нужно для
+# их рендера: id поста, id и имя автора.
+DEFER_ACTIONS = "feedcache_defer_actions"
+DEFERRED_ACTIONS = re.compile(r"<!-- post-card-actions:(\d+):(\d+):(\S+) -->")
+
+
+def _render_actions(match, request):
+    post_id, author_id, username = match.groups()
+    post = {"id": int(post_id),
+            "author": {"pk": int(author_id), "username": username}}
+    return render_to_string("includes/post_card_actions.html",
+                            {"post": post}, request=request)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Карточка поста из кэша с подставленными ссылками для зрителя.
+
+    Общая для всех часть карточки кэшируется по ``id`` и ``updated``
+    поста; ссылки «Добавить комментарий» и «Редактировать» зависят от
+    страницы и пользователя и рендерятся на каждый запрос, а внутри
+    ``feedcache`` — после чтения фрагмента из кэша.
+    """
+    key = card_key(post)
+    body = cache.get(key)
+    profiling.record_cache(body is not None)
+    if body is None:
+        body = render_to_string("includes/post_card_body.html",
+                                {"post": post})
+        cache.set(key, body, settings.FEED_CACHE_TIMEOUT)
+    if context.get(DEFER_ACTIONS):
+        deferred = (f"<!-- post-card-actions:{post.pk}:{post.author_id}:"
+                    f"{post.author.username} -->")
+        return mark_safe(body.replace(ACTIONS_MARKER, deferred))
+    actions = render_to_string("includes/post_card_actions.html",
+                               {"post": post},
+                               request=context.get("request"))
+    return mark_safe(body.replace(ACTIONS_MARKER, actions))
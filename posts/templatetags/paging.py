@@ -0,0 +1,12 @@
+from django import template
+from django.conf import settings
+
+from posts.pagination import page_window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_numbers(page):
+    """Номера страниц для навигации: окно вокруг текущей и края ленты."""
+    return page_window(page, settings.FEED_PAGE_WINDOW)
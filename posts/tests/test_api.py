@@ -0,0 +1,87 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user('Dike')
+        self.group = Group.objects.create(title='Кошки', slug='cats')
+        self.posts = [
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Пост {i}')
+            for i in range(5)
+        ]
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return response, json.loads(b''.join(response.streaming_content))
+
+    def test_cursor_pages_cover_feed(self):
+        url = reverse('api_index')
+        ids = []
+        response, data = self.get(url, limit=2)
+        while True:
+            ids += [item['id'] for item in data['results']]
+            if data['next'] is None:
+                break
+            self.assertIn('limit=2', data['next'])
+            data = json.loads(b''.join(
+                self.client.get(data['next']).streaming_content))
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_fields_selection(self):
+        response, data = self.get(reverse('api_group', args=['cats']),
+                                  fields='id,author,group')
+        self.assertEqual(data['results'][0], {
+            'id': self.posts[-1].pk, 'author': 'Dike', 'group': 'cats'})
+
+    def test_unknown_field_and_bad_limit(self):
+        url = reverse('api_index')
+        self.assertEqual(
+            self.client.get(url, {'fields': 'id,password'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 0}).status_code, 400)
+
+    def test_profile_feed(self):
+        other = User.objects.create_user('Mike')
+        Post.objects.create(author=other, text='Чужой пост')
+        response, data = self.get(reverse('api_profile', args=['Mike']),
+                                  fields='text')
+        self.assertEqual(data, {'results': [{'text': 'Чужой пост'}],
+                                'next': None})
+        response = self.client.get(reverse('api_profile', args=['Nobody']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified_until_feed_changes(self):
+        url = reverse('api_group', args=['cats'])
+        response, _ = self.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        with run_on_commit():
+            Comment.objects.create(post=self.posts[0], author=self.author,
+                                   text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api_index'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class SeedBenchDataTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_bench_data', stdout=StringIO(), **options)
+
+    def test_creates_requested_amounts(self):
+        self.seed(posts=300, users=30, groups=3, comments=200, follows=3)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(UserStats.objects.count(), 30)
+
+    def test_authors_have_long_tail(self):
+        self.seed(posts=1000, users=50, groups=2, comments=0, follows=0)
+        counts = sorted(UserStats.objects.values_list('posts_count',
+                                                      flat=True))
+        self.assertEqual(sum(counts), 1000)
+        # Самый активный автор пишет больше, чем половина авторов вместе.
+        self.assertGreater(counts[-1], sum(counts[:25]))
+
+    def test_dates_are_spread(self):
+        self.seed(posts=100, users=10, groups=1, comments=0, follows=0)
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertEqual(len(set(dates)), 100)
+
+    def test_counters_and_search_are_consistent(self):
+        self.seed(posts=100, users=10, groups=1, comments=50, follows=2)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Исправлено строк: 0', out.getvalue())
+
+    def test_refuses_existing_prefix(self):
+        self.seed(posts=10, users=10, groups=1, comments=0, follows=0)
+        with self.assertRaises(CommandError):
+            self.seed(posts=10)
+
+
+class BenchViewsTests(TestCase):
+    def test_writes_json_report(self):
+        call_command('seed_bench_data', posts=200, users=20, groups=2,
+                     comments=50, follows=3, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            out = StringIO()
+            call_command('bench_views', requests=5, warmup=1, output=path,
+                         stdout=out)
+            with open(path) as report:
+                results = json.load(report)
+            call_command('bench_views', requests=5, warmup=0,
+                         views=['index'], compare=path, stdout=out)
+        self.assertEqual(results['data']['posts'], 200)
+        for view in ('index', 'group_posts', 'profile', 'post_view',
+                     'follow_index', 'add_comment'):
+            row = results['views'][view]
+            self.assertEqual(row['requests'], 5)
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['queries_max'], 0)
+        self.assertIn('p95', out.getvalue())
+
+    def test_empty_database(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_views', stdout=StringIO())
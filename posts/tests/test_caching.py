@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Comment, Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class FeedCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('Dike')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.other_group = Group.objects.create(title='Другая', slug='other',
+                                                description='Описание')
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Старый текст')
+        self.guest_client = Client()
+        self.urls = [
+            reverse('index'),
+            reverse('group', kwargs={'slug': 'group'}),
+            reverse('profile', kwargs={'username': 'Dike'}),
+        ]
+
+    def assert_all_contain(self, text):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), text)
+
+    def test_edit_invalidates_feeds(self):
+        self.assert_all_contain('Старый текст')
+        self.post.text = 'Новый текст'
+        with run_on_commit():
+            self.post.save()
+        self.assert_all_contain('Новый текст')
+
+    def test_comment_invalidates_feeds(self):
+        self.assert_all_contain('Старый текст')
+        with run_on_commit():
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text='Комментарий')
+        self.assert_all_contain('Комментариев: 1')
+
+    def test_moving_post_invalidates_old_group(self):
+        url = reverse('group', kwargs={'slug': 'group'})
+        self.assertContains(self.guest_client.get(url), 'Старый текст')
+        self.post.group = self.other_group
+        with run_on_commit():
+            self.post.save()
+        self.assertNotContains(self.guest_client.get(url), 'Старый текст')
+
+    def test_renaming_group_invalidates_cards(self):
+        self.assert_all_contain('#Группа')
+        self.group.title = 'Новая группа'
+        with run_on_commit():
+            self.group.save()
+        self.assert_all_contain('#Новая группа')
+
+    def test_renaming_author_invalidates_cards(self):
+        self.assert_all_contain('@Dike')
+        self.author.username = 'Mike'
+        with run_on_commit():
+            self.author.save()
+        self.urls[2] = reverse('profile', kwargs={'username': 'Mike'})
+        self.assert_all_contain('@Mike')
+
+    def test_generation_changes_after_commit(self):
+        version = caching.feed_version(caching.ALL_POSTS)
+        with run_on_commit():
+            caching.bump(caching.ALL_POSTS)
+            self.assertEqual(caching.feed_version(caching.ALL_POSTS), version)
+        self.assertNotEqual(caching.feed_version(caching.ALL_POSTS), version)
+
+    def test_feed_version_differs_between_scopes(self):
+        self.assertNotEqual(
+            caching.feed_version(caching.group_scope(self.group.id)),
+            caching.feed_version(caching.group_scope(self.other_group.id)))
+
+
+@override_settings(FEED_CACHE_LOCK_TIMEOUT=2)
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_only_one_builder(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return 'fragment'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    caching.get_or_build('fragment-key', build)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['fragment'] * 5)
+        self.assertEqual(len(builds), 1)
+
+
+class PostCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('Dike')
+        self.reader = User.objects.create_user('Mike')
+        self.post = Post.objects.create(author=self.author, text='Текст')
+        self.url = reverse('post', kwargs={'username': 'Dike',
+                                           'post_id': self.post.id})
+        self.edit_url = reverse('post_edit', kwargs={'username': 'Dike',
+                                                     'post_id': self.post.id})
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_card_is_cached_per_post_version(self):
+        self.client_for(self.reader).get(self.url)
+        self.assertIsNotNone(cache.get(caching.card_key(self.post)))
+        Post.objects.filter(pk=self.post.pk).update(text='Тайком')
+        self.assertNotContains(self.client_for(self.reader).get(self.url),
+                               'Тайком')
+
+    def test_edit_link_is_rendered_per_viewer(self):
+        self.assertNotContains(self.client_for(self.reader).get(self.url),
+                               self.edit_url)
+        self.assertContains(self.client_for(self.author).get(self.url),
+                            self.edit_url)
+        self.assertNotContains(self.client_for(self.reader).get(self.url),
+                               self.edit_url)
+
+    def test_feed_fragment_is_shared_between_viewers(self):
+        url = reverse('index')
+        self.assertContains(self.client_for(self.author).get(url),
+                            self.edit_url)
+        self.assertNotContains(self.client_for(self.reader).get(url),
+                               self.edit_url)
+        response = Client().get(url)
+        self.assertNotContains(response, self.edit_url)
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertNotContains(response, 'Избранные авторы')
+
+    def test_comment_changes_card_version(self):
+        self.client_for(self.reader).get(self.url)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.assertContains(self.client_for(self.reader).get(self.url),
+                            'Комментариев: 1')
+
+
+# Процессы бенчмарка наследуют соединение при fork: внутри транзакции
+# TestCase смены поколений ждали бы коммита.
+class CacheBenchmarkTests(TransactionTestCase):
+    def test_shared_profile_sees_every_bump(self):
+        out = StringIO()
+        call_command('bench_cache', profiles=['locmem', 'file'],
+                     processes=2, requests=100, keys=10,
+                     write_ratio=0.05, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(results['file']['requests'], 200)
+        self.assertEqual(results['file']['stale_rate'], 0)
+        self.assertLessEqual(results['file']['stale_rate'],
+                             results['locmem']['stale_rate'])
@@ -0,0 +1,67 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+FRAGMENT = re.compile(r'data-fragment="([^"]+)"')
+NAMES = re.compile(r'name="comment_(\d+)"')
+
+
+@override_settings(COMMENTS_PER_PAGE=20)
+class CommentPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('Dike')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        readers = [User.objects.create_user(f'reader{i}') for i in range(3)]
+        # bulk_create ставит почти одинаковое время, порядок решает id.
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=readers[i % 3], text=f'№{i}')
+            for i in range(45))
+        self.ids = list(self.post.comments.order_by('created', 'id')
+                        .values_list('id', flat=True))
+        self.client = Client()
+        self.url = reverse('post', kwargs={'username': 'Dike',
+                                           'post_id': self.post.id})
+
+    def shown(self, html):
+        return [int(pk) for pk in NAMES.findall(html)]
+
+    def test_post_page_shows_first_batch(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        html = response.content.decode()
+        self.assertEqual(self.shown(html), self.ids[:20])
+        self.assertEqual(len(FRAGMENT.findall(html)), 1)
+
+    def test_fragments_cover_all_comments(self):
+        html = self.client.get(self.url).content.decode()
+        shown = self.shown(html)
+        fragments = FRAGMENT.findall(html)
+        while fragments:
+            response = self.client.get(fragments[0].replace('&amp;', '&'))
+            self.assertTrue(response.streaming)
+            html = b''.join(response.streaming_content).decode()
+            self.assertNotIn('<html', html)
+            shown += self.shown(html)
+            fragments = FRAGMENT.findall(html)
+        self.assertEqual(shown, self.ids)
+
+    def test_link_without_script_opens_next_batch(self):
+        html = self.client.get(self.url).content.decode()
+        link = re.search(r'href="([^"]*\?comments=[^"]+)"', html).group(1)
+        html = self.client.get(link).content.decode()
+        self.assertEqual(self.shown(html), self.ids[20:40])
+
+    def test_fragment_of_missing_post(self):
+        response = self.client.get(reverse(
+            'post_comments', kwargs={'username': 'Mike',
+                                     'post_id': self.post.id}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('Dike')
+        self.reader = User.objects.create_user('Mike')
+        self.group = Group.objects.create(title='Кошки', slug='cats')
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Пост')
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.urls = [
+            reverse('index'),
+            reverse('group', kwargs={'slug': 'cats'}),
+            reverse('profile', kwargs={'username': 'Dike'}),
+            reverse('post', kwargs={'username': 'Dike',
+                                    'post_id': self.post.id}),
+        ]
+
+    def assertNotModified(self, url, etag, client=None):
+        response = (client or self.guest_client).get(
+            url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.templates)
+        return response
+
+    def assertModified(self, url, etag):
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unchanged_pages_are_not_rendered(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.assertNotModified(url, etag)
+                self.assertIn('s-maxage=30', response['Cache-Control'])
+
+    def test_new_post_changes_feeds(self):
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in self.urls[:3]}
+        with run_on_commit():
+            Post.objects.create(author=self.author, group=self.group,
+                                text='Новый пост')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertModified(url, etag)
+
+    def test_comment_changes_post_page(self):
+        url = self.urls[3]
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.assertModified(url, etag)
+
+    def test_commenter_rename_changes_post_page(self):
+        url = self.urls[3]
+        with run_on_commit():
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text='Комментарий')
+        etag = self.guest_client.get(url)['ETag']
+        self.reader.username = 'Mike2'
+        with run_on_commit():
+            self.reader.save()
+        self.assertModified(url, etag)
+
+    def test_follow_changes_profile(self):
+        url = self.urls[2]
+        etag = self.guest_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertModified(url, etag)
+
+    def test_page_number_is_part_of_etag(self):
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, {'page': 2},
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_pages_are_public(self):
+        response = self.guest_client.get(self.urls[0])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_user_pages_are_private(self):
+        url = self.urls[3]
+        response = self.authorized_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertNotEqual(response['ETag'],
+                            self.guest_client.get(url)['ETag'])
+        self.assertNotModified(url, response['ETag'],
+                               client=self.authorized_client)
+
+    def test_missing_group(self):
+        response = self.guest_client.get(
+            reverse('group', kwargs={'slug': 'dogs'}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('Dike')
+        self.user = User.objects.create_user('Mike')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_new_post_and_comment_update_counters(self):
+        self.author_client.post(reverse('new_post'), {'text': 'Пост'})
+        post = Post.objects.get(text='Пост')
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.authorized_client.post(
+            reverse('add_comment', kwargs={'username': 'Dike',
+                                           'post_id': post.id}),
+            {'text': 'Комментарий'})
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        Comment.objects.get().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.authorized_client.get(
+            reverse('profile_follow', kwargs={'username': 'Dike'}))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.authorized_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'Dike'}))
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_profile_renders_counters(self):
+        Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(author=self.author, user=self.user)
+        response = self.authorized_client.get(
+            reverse('profile', kwargs={'username': 'Dike'}))
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+
+    def test_profile_without_counters_row(self):
+        # Больше страницы: число постов берётся из оценки.
+        Post.objects.bulk_create(
+            [Post(author=self.author, text='Пост') for _ in range(11)])
+        UserStats.objects.filter(user=self.author).delete()
+        response = self.authorized_client.get(
+            reverse('profile', kwargs={'username': 'Dike'}))
+        self.assertEqual(response.context['paginator'].count, 11)
+
+    def test_reconcile_counters_fixes_drift(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        Follow.objects.create(author=self.author, user=self.user)
+        Post.objects.update(comment_count=7)
+        UserStats.objects.update(posts_count=5, followers_count=0)
+        UserStats.objects.filter(user=self.user).delete()
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.assertIn('Исправлено строк: 3', out.getvalue())
@@ -0,0 +1,31 @@
+import json
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+
+class TunedSqliteTests(TestCase):
+    @skipUnless(settings.DATABASE_PROFILE == 'tuned', 'профиль не tuned')
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            # 1 — NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_bench_sqlite_compares_profiles(self):
+        out = StringIO()
+        call_command('bench_sqlite', threads=4, seconds=0.5, posts=50,
+                     json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results), {'plain', 'tuned'})
+        tuned = results['tuned']
+        self.assertGreater(tuned['reads'], 0)
+        self.assertGreater(tuned['writes'], 0)
+        # WAL и BEGIN IMMEDIATE убирают «database is locked».
+        self.assertEqual(tuned['errors'], 0)
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import FeedEntry, FeedPullAuthor, Follow, Post
+
+User = get_user_model()
+LATEST = '0029_feedentry_pub_date'
+
+
+class FollowFeedInboxTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('Dike')
+        self.user = User.objects.create_user('Mike')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def feed_posts(self):
+        response = self.authorized_client.get(reverse('follow_index'))
+        return list(response.context['page'].object_list)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(author=self.author, user=self.user)
+        self.author_client.post(reverse('new_post'), {'text': 'Новый пост'})
+        post = Post.objects.get(text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists())
+        self.assertEqual(self.feed_posts(), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        self.authorized_client.get(
+            reverse('profile_follow', kwargs={'username': 'Dike'}))
+        self.assertEqual(self.feed_posts(), [post])
+        self.authorized_client.get(
+            reverse('profile_unfollow', kwargs={'username': 'Dike'}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed_posts(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pull_author_is_read_on_request(self):
+        old_post = Post.objects.create(author=self.author, text='Старый пост')
+        Follow.objects.create(author=self.author, user=self.user)
+        self.assertTrue(
+            FeedPullAuthor.objects.filter(author=self.author).exists())
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(self.feed_posts(), [new_post, old_post])
+
+    @override_settings(FEED_BACKFILL_LIMIT=2)
+    def test_follow_backfills_only_recent_posts(self):
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(3)]
+        Follow.objects.create(author=self.author, user=self.user)
+        self.assertEqual(self.feed_posts(), [posts[2], posts[1]])
+
+
+class FeedMigrationTests(TransactionTestCase):
+    """Заполнение лент миграциями 0019 и 0029 на исторических моделях."""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('posts', target)])
+        return executor.loader.project_state(('posts', target)).apps
+
+    def follow_before_feeds(self):
+        self.addCleanup(self.migrate, LATEST)
+        old_apps = self.migrate('0018_auto_20210220_1341')
+        User = old_apps.get_model('auth', 'User')
+        Post = old_apps.get_model('posts', 'Post')
+        Follow = old_apps.get_model('posts', 'Follow')
+        author = User.objects.create(username='Dike')
+        user = User.objects.create(username='Mike')
+        post = Post.objects.create(author=author, text='Старый пост')
+        # До 0026 у автора может быть только один подписчик.
+        Follow.objects.create(author=author, user=user)
+        return user, post
+
+    def test_migrations_fill_feeds_of_existing_follows(self):
+        user, post = self.follow_before_feeds()
+        new_apps = self.migrate(LATEST)
+        FeedEntry = new_apps.get_model('posts', 'FeedEntry')
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post', 'pub_date')),
+            [(user.pk, post.pk, post.pub_date)])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_migration_marks_popular_authors(self):
+        user, post = self.follow_before_feeds()
+        new_apps = self.migrate(LATEST)
+        FeedEntry = new_apps.get_model('posts', 'FeedEntry')
+        FeedPullAuthor = new_apps.get_model('posts', 'FeedPullAuthor')
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(
+            list(FeedPullAuthor.objects.values_list('author', flat=True)),
+            [post.author_id])
@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import graph
+from posts.models import FeedEntry, Follow, Post, UserStats
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user('Mike')
+        self.authors = [User.objects.create_user(f'author{i}')
+                        for i in range(5)]
+        self.author_ids = [author.pk for author in self.authors]
+
+    def stats(self, user):
+        return UserStats.objects.get(pk=user.pk)
+
+    def test_one_author_has_many_followers(self):
+        author = self.authors[0]
+        Follow.objects.create(user=self.reader, author=author)
+        Follow.objects.create(user=self.authors[1], author=author)
+        self.assertEqual(Follow.objects.filter(author=author).count(), 2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=author)
+
+    def test_followee_set_is_cached_until_follows_change(self):
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertEqual(graph.followee_ids(self.reader.pk),
+                         {self.author_ids[0]})
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.reader,
+                                               self.author_ids[0]))
+            self.assertFalse(graph.is_following(self.reader,
+                                                self.author_ids[1]))
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.authors[1])
+        self.assertTrue(graph.is_following(self.reader, self.author_ids[1]))
+        with run_on_commit():
+            Follow.objects.filter(user=self.reader,
+                                  author=self.authors[0]).delete()
+        self.assertEqual(graph.followee_ids(self.reader.pk),
+                         {self.author_ids[1]})
+
+    def test_follow_many_matches_single_follows(self):
+        post = Post.objects.create(author=self.authors[0], text='Пост')
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        graph.followee_ids(self.reader.pk)
+        with run_on_commit():
+            added = graph.follow_many(
+                self.reader.pk, self.author_ids + [self.reader.pk, 10 ** 6])
+        self.assertEqual(added, 4)
+        self.assertEqual(graph.followee_ids(self.reader.pk),
+                         set(self.author_ids))
+        self.assertEqual(self.stats(self.reader).following_count, 5)
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 1)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader,
+                                                 post=post).exists())
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Исправлено строк: 0', out.getvalue())
+
+    def test_unfollow_many(self):
+        post = Post.objects.create(author=self.authors[0], text='Пост')
+        graph.follow_many(self.reader.pk, self.author_ids)
+        removed = graph.unfollow_many(self.reader.pk,
+                                      self.author_ids[:3] + [10 ** 6])
+        self.assertEqual(removed, 3)
+        self.assertEqual(graph.followee_ids(self.reader.pk),
+                         set(self.author_ids[3:]))
+        self.assertEqual(self.stats(self.reader).following_count, 2)
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 0)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Исправлено строк: 0', out.getvalue())
+
+    def test_followed_by_followees(self):
+        target = User.objects.create_user('Dike')
+        graph.follow_many(self.reader.pk, self.author_ids)
+        for author in self.authors[:4]:
+            Follow.objects.create(user=author, author=target)
+        users, total = graph.followed_by_followees(self.reader.pk,
+                                                   target.pk, limit=2)
+        self.assertEqual(total, 4)
+        self.assertEqual(users, self.authors[:2])
+        self.assertEqual(
+            graph.followed_by_followees(target.pk, self.reader.pk), ([], 0))
+
+    def test_profile_shows_followees_who_follow_author(self):
+        target = User.objects.create_user('Dike')
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        Follow.objects.create(user=self.authors[0], author=target)
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('profile', kwargs={'username': 'Dike'})
+        response = client.get(url)
+        self.assertFalse(response.context['following'])
+        self.assertEqual(response.context['followed_by'], [self.authors[0]])
+        self.assertContains(response, 'Подписаны из ваших подписок')
+        # Новая подписка читателя меняет ETag страницы автора.
+        etag = response['ETag']
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.authors[1])
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchFollowGraphTests(TestCase):
+    def test_reports_operations(self):
+        call_command('seed_bench_data', posts=100, users=30, groups=1,
+                     comments=0, follows=5, stdout=StringIO())
+        out = StringIO()
+        call_command('bench_follow_graph', checks=5, bulk_runs=2, batch=5,
+                     stdout=out)
+        for name in ('exists_query', 'followees_cold', 'is_following',
+                     'followed_by_followees', 'follow_many',
+                     'unfollow_many'):
+            self.assertIn(name, out.getvalue())
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Исправлено строк: 0', out.getvalue())
@@ -0,0 +1,80 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import views
+from posts.models import Comment, Follow, Group, Post
+from posts.pagination import FORWARD
+
+User = get_user_model()
+
+# «SCAN posts_post» без «USING ... INDEX» — полный проход по таблице.
+FULL_SCAN = re.compile(r"\bSCAN (TABLE )?\w+$")
+TEMP_SORT = "USE TEMP B-TREE"
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц лент идут по индексам, без сортировки на лету."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('Dike')
+        self.user = User.objects.create_user('Mike')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Пост')
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def plans(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in captured:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'django_session' in sql:
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def assertIndexed(self, url):
+        for sql, plan in self.plans(url).items():
+            for step in plan:
+                self.assertIsNone(FULL_SCAN.search(step),
+                                  f'{step}\n{sql}')
+                self.assertNotIn(TEMP_SORT, step, sql)
+
+    def test_index(self):
+        self.assertIndexed(reverse('index'))
+
+    def test_group_posts(self):
+        self.assertIndexed(reverse('group', kwargs={'slug': 'group'}))
+
+    def test_profile(self):
+        self.assertIndexed(reverse('profile', kwargs={'username': 'Dike'}))
+
+    def test_post_view(self):
+        self.assertIndexed(reverse(
+            'post', kwargs={'username': 'Dike', 'post_id': self.post.id}))
+
+    def test_post_comments(self):
+        url = reverse('post_comments', kwargs={'username': 'Dike',
+                                               'post_id': self.post.id})
+        comment = self.post.comments.get()
+        cursor = views.comment_paginator(self.post).encode_cursor(
+            FORWARD, comment)
+        self.assertIndexed(f'{url}?cursor={cursor}')
+
+    def test_follow_index(self):
+        self.assertIndexed(reverse('follow_index'))
@@ -0,0 +1,189 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.pagination import CursorPage, CursorPaginator, page_window
+
+User = get_user_model()
+
+
+@override_settings(FEED_PAGINATION='keyset')
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Vsem privet',
+            slug='test-slug',
+            description='Gruppa chtoby govorit privet',
+        )
+        cls.user = User.objects.create_user('Dike', 'admin@test.com', 'pass')
+        same_time = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+        for i in range(25):
+            post = Post.objects.create(
+                author=cls.user,
+                text=f'Текст{i}',
+                group=cls.group,
+            )
+            # Пять постов с одинаковой датой проверяют разбор ничьих по id.
+            if i < 5:
+                post.pub_date = same_time
+            else:
+                post.pub_date = same_time + datetime.timedelta(minutes=i)
+            post.save()
+
+    def setUp(self):
+        cache.clear()
+        self.follower = User.objects.create_user('Mary')
+        Follow.objects.create(author=self.user, user=self.follower)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+
+    def walk(self, url):
+        texts = []
+        cursor = None
+        while True:
+            query = f'?cursor={cursor}' if cursor else ''
+            response = self.authorized_client.get(url + query)
+            page = response.context['page']
+            self.assertIsInstance(page, CursorPage)
+            texts.extend(post.text for post in page)
+            if not page.has_next():
+                return texts
+            cursor = page.next_cursor
+
+    def test_cursor_walk_matches_offset_order(self):
+        expected = [post.text
+                    for post in Post.objects.order_by('-pub_date', '-id')]
+        urls = [
+            reverse('index'),
+            reverse('group', kwargs={'slug': 'test-slug'}),
+            reverse('profile', kwargs={'username': self.user.username}),
+            reverse('follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url), expected)
+
+    def test_previous_cursor_returns_to_same_page(self):
+        first = self.authorized_client.get(reverse('index')).context['page']
+        second = self.authorized_client.get(
+            reverse('index'), {'cursor': first.next_cursor}).context['page']
+        back = self.authorized_client.get(
+            reverse('index'),
+            {'cursor': second.previous_cursor}).context['page']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_no_count_query(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(None)
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next())
+
+    def test_legacy_page_redirects_to_cursor(self):
+        expected = list(Post.objects.order_by('-pub_date', '-id')[10:20])
+        for url in (reverse('index'), reverse('follow_index')):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url + '?page=2')
+                self.assertEqual(response.status_code, 302)
+                page = self.authorized_client.get(response.url)
+                self.assertEqual(list(page.context['page']), expected)
+
+    def test_legacy_first_and_out_of_range_pages(self):
+        response = self.authorized_client.get(reverse('index') + '?page=1')
+        self.assertRedirects(response, reverse('index'))
+        response = self.authorized_client.get(reverse('index') + '?page=100')
+        page = self.authorized_client.get(response.url).context['page']
+        self.assertEqual([post.text for post in page],
+                         [f'Текст{i}' for i in range(9, -1, -1)])
+        self.assertFalse(page.has_next())
+
+    def test_broken_cursor_shows_first_page(self):
+        response = self.authorized_client.get(reverse('index') + '?cursor=%%%')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous())
+
+
+@override_settings(FEED_PAGINATION='offset', FEED_COUNT='estimated',
+                   FEED_PAGE_WINDOW=1)
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Dike')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(25):
+            Post.objects.create(author=self.user, group=self.group,
+                                text=f'Текст{i}')
+        self.client = Client()
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        for query in captured:
+            self.assertNotIn('COUNT(', query['sql'])
+        return response.context['page']
+
+    def test_pages_without_count(self):
+        page = self.get(reverse('index'))
+        self.assertIs(type(page), Page)
+        self.assertIs(type(page.paginator), Paginator)
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next())
+        # Без статистики известно только, что есть следующая страница.
+        self.assertEqual(page.paginator.num_pages, 2)
+
+        page = self.get(reverse('index'), page=3)
+        self.assertEqual([post.text for post in page],
+                         [f'Текст{i}' for i in range(4, -1, -1)])
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.paginator.count, 25)
+
+    def test_counter_and_statistics_estimates(self):
+        page = self.get(reverse('profile', kwargs={'username': 'Dike'}))
+        self.assertEqual(page.paginator.num_pages, 3)
+
+        call_command('update_db_stats', stdout=StringIO())
+        page = self.get(reverse('index'))
+        self.assertEqual(page.paginator.count, 25)
+
+    def test_group_count_is_not_averaged(self):
+        other = Group.objects.create(title='Другая', slug='other')
+        for i in range(11):
+            Post.objects.create(author=self.user, group=other,
+                                text=f'Другой{i}')
+        call_command('update_db_stats', stdout=StringIO())
+        # В среднем в группе 18 постов, но в этой — 11: известно только,
+        # что есть вторая страница.
+        page = self.get(reverse('group', kwargs={'slug': 'other'}))
+        self.assertEqual(page.paginator.count, 11)
+
+    def test_out_of_range_page_shows_last(self):
+        response = self.client.get(reverse('index'), {'page': 100})
+        page = response.context['page']
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+        response = self.client.get(reverse('index'), {'page': 'x'})
+        self.assertEqual(response.context['page'].number, 1)
+
+    def test_window_of_page_numbers(self):
+        page = Paginator(range(400), 10).page(20)
+        self.assertEqual(page_window(page, 3),
+                         [1, None, 17, 18, 19, 20, 21, 22, 23, None, 40])
+        self.assertEqual(page_window(Paginator(range(30), 10).page(1), 3),
+                         [1, 2, 3])
+        call_command('update_db_stats', stdout=StringIO())
+        response = self.client.get(reverse('index'), {'page': 2})
+        self.assertContains(response, '?page=1"')
+        self.assertContains(response, '?page=3"')
+        self.assertContains(response, 'page-item active')
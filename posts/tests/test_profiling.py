@@ -0,0 +1,105 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import profiling
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiling.reset()
+        self.author = User.objects.create_user('Dike')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def row(self, view):
+        return next(row for row in profiling.snapshot()
+                    if row['view'] == view)
+
+    def test_records_sql_templates_and_cache(self):
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        row = self.row('index')
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['sql_queries'], 0)
+        self.assertGreater(row['sql_ms'], 0)
+        self.assertGreater(row['template_ms'], 0)
+        # Первый запрос строит фрагмент ленты и карточку поста (два
+        # промаха), второй берёт готовый фрагмент из кэша.
+        self.assertAlmostEqual(row['cache_hit_rate'], 1 / 3)
+
+    def test_streaming_response_recorded_when_stream_ends(self):
+        response = self.client.get(reverse('post_comments', kwargs={
+            'username': 'Dike', 'post_id': self.post.pk}))
+        views = [row['view'] for row in profiling.snapshot()]
+        self.assertNotIn('post_comments', views)
+        b''.join(response.streaming_content)
+        row = self.row('post_comments')
+        self.assertEqual(row['requests'], 1)
+        # Пост ищет представление, комментарии читает уже поток.
+        self.assertEqual(row['sql_queries'], 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_profile_in_dashboard(self):
+        self.client.get(reverse('index'))
+        self.assertEqual(self.row('index')['sampled'], 1)
+        response = self.admin_client.get(reverse('profiling'),
+                                         {'view': 'index'})
+        self.assertContains(response, 'cumulative')
+        self.assertContains(response, 'views.py')
+
+    def test_dashboard_is_staff_only(self):
+        response = self.client.get(reverse('profiling'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.client.get(reverse('profiling_metrics')).status_code, 403)
+        self.assertEqual(
+            self.admin_client.get(reverse('profiling')).status_code, 200)
+
+    def test_prometheus_dump(self):
+        self.client.get(reverse('index'))
+        response = self.admin_client.get(reverse('profiling_metrics'))
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 1', text)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="index",le="+Inf"} 1', text)
+        self.assertIn('yatube_sql_queries_total{view="index"}', text)
+
+    @override_settings(PROFILING_METRICS_TOKEN='secret')
+    def test_prometheus_token(self):
+        response = self.client.get(reverse('profiling_metrics'),
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('profiling_metrics'),
+                                   HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+
+class ProfilingBenchmarkTests(TestCase):
+    def test_reports_overhead(self):
+        post = Post.objects.create(
+            author=User.objects.create_user('Dike'), text='Пост')
+        out = StringIO()
+        call_command('bench_profiling', requests=5, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(
+            set(results),
+            {reverse('index'), reverse('post', args=['Dike', post.pk])})
+        for row in results.values():
+            self.assertIn('overhead_p50', row)
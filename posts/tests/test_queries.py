@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryBudgetTests(TestCase):
+    """Число запросов на страницу ленты не зависит от числа постов на ней."""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user('Reader')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.guest_client = Client()
+
+    def fill(self, count):
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        for i in range(count):
+            author = User.objects.create_user(f'author{i}')
+            Follow.objects.create(author=author, user=self.reader)
+            post = Post.objects.create(author=author, group=group,
+                                       text=f'Пост {i}')
+            Comment.objects.create(post=post, author=self.reader,
+                                   text='Комментарий')
+        return post
+
+    def assert_budget(self, client, url, budget):
+        cache.clear()
+        with self.assertNumQueries(budget):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_budgets(self):
+        post = self.fill(10)
+        author = post.author.username
+        # Группа, автор и пост читаются ещё раз для ETag (posts.conditional).
+        # COUNT(*) для числа страниц нет (FEED_COUNT = "estimated").
+        cases = [
+            (self.guest_client, reverse('index'), 1),
+            (self.authorized_client, reverse('index'), 3),
+            (self.guest_client, reverse('group', kwargs={'slug': 'group'}), 3),
+            (self.guest_client,
+             reverse('profile', kwargs={'username': author}), 3),
+            # Сессия, читатель, множество его подписок (при повторе
+            # берётся из кэша), «подписаны из ваших подписок»
+            # и строка рекомендаций.
+            (self.authorized_client,
+             reverse('profile', kwargs={'username': author}), 8),
+            (self.guest_client,
+             reverse('post', kwargs={'username': author,
+                                     'post_id': post.id}), 3),
+            (self.authorized_client, reverse('follow_index'), 5),
+        ]
+        for client, url, budget in cases:
+            with self.subTest(url=url):
+                self.assert_budget(client, url, budget)
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import replication, routers
+from posts.models import Post
+
+User = get_user_model()
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.directory, 'replica.sqlite3'))
+        connections.ensure_defaults(REPLICA)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('Dike')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        replication.sync()
+
+    def test_guest_reads_from_lagging_replica(self):
+        Post.objects.create(author=self.author, text='Ещё не на реплике')
+        self.assertNotContains(self.client.get(reverse('index')),
+                               'Ещё не на реплике')
+        replication.sync()
+        cache.clear()
+        self.assertContains(self.client.get(reverse('index')),
+                            'Ещё не на реплике')
+
+    def test_replica_pages_are_not_conditional(self):
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertIn('ETag', self.client.get(reverse('index')))
+
+    def test_replica_api_responses_are_not_conditional(self):
+        response = self.client.get(reverse('api_index'))
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_author_sees_own_post_after_redirect(self):
+        response = self.author_client.post(reverse('new_post'),
+                                           {'text': 'Свежий пост'},
+                                           follow=True)
+        # Запись ушла в основную базу, а чтение после POST — тоже туда.
+        self.assertContains(response, 'Свежий пост')
+        self.assertFalse(
+            Post.objects.using(REPLICA).filter(text='Свежий пост').exists())
+        cache.clear()
+        self.assertNotContains(self.client.get(reverse('index')),
+                               'Свежий пост')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        self.author_client.post(reverse('new_post'), {'text': 'Свежий пост'})
+        cache.clear()
+        self.assertNotContains(self.author_client.get(reverse('index')),
+                               'Свежий пост')
+
+    def test_reads_outside_requests_use_primary(self):
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(routers.reading_replica())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Post.objects.using(REPLICA).count(), 0)
+
+    def test_replicate_command(self):
+        Post.objects.create(author=self.author, text='Пост')
+        call_command('replicate_sqlite', once=True, stdout=StringIO())
+        self.assertEqual(Post.objects.using(REPLICA).count(), 1)
@@ -0,0 +1,161 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, SearchTerm
+from posts.stemmer import stem
+
+User = get_user_model()
+
+LATEST = '0029_feedentry_pub_date'
+
+
+class StemmerTests(TestCase):
+    def test_russian_words(self):
+        cases = {
+            'кошки': 'кошк',
+            'кошками': 'кошк',
+            'бегущий': 'бегущ',
+            'красивейший': 'красив',
+            'ёлки': 'елк',
+            'python': 'python',
+        }
+        for word, expected in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_tokenize_ignores_punctuation_and_case(self):
+        self.assertEqual(search.tokenize('Кошки, КОШКАМИ!'),
+                         ['кошк', 'кошк'])
+
+
+class SearchIndexMixin:
+    def setUp(self):
+        self.author = User.objects.create_user('Dike')
+        self.reader = User.objects.create_user('Mike')
+        self.in_text = Post.objects.create(
+            author=self.author, text='Рыжие кошки гуляют по крыше')
+        self.in_comment = Post.objects.create(
+            author=self.author, text='Заметки о погоде')
+        Comment.objects.create(post=self.in_comment, author=self.reader,
+                               text='У меня живёт кошка')
+        self.other = Post.objects.create(author=self.author,
+                                         text='Собаки лают')
+
+    def found(self, query):
+        return list(search.SearchResults(query)[:10])
+
+    def test_post_text_ranks_above_comment(self):
+        self.assertEqual(self.found('кошками'),
+                         [self.in_text, self.in_comment])
+
+    def test_all_terms_required(self):
+        self.assertEqual(self.found('рыжая кошка'), [self.in_text])
+        self.assertEqual(self.found('рыжая собака'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.other.text = 'Собаки и кошки дружат'
+        self.other.save()
+        self.assertIn(self.other, self.found('кошка'))
+        self.assertEqual(self.found('лают'), [])
+        Comment.objects.get().delete()
+        self.assertEqual(self.found('кошка'), [self.other, self.in_text])
+        self.in_text.delete()
+        self.assertEqual(self.found('кошка'), [self.other])
+
+    def test_rebuild_command(self):
+        search.get_index().clear()
+        self.assertEqual(self.found('кошка'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('4', out.getvalue())
+        self.assertEqual(self.found('кошка'),
+                         [self.in_text, self.in_comment])
+
+    def test_search_page_is_paginated(self):
+        for i in range(12):
+            Post.objects.create(author=self.author, text=f'Кот номер {i}')
+        client = Client()
+        response = client.get(reverse('search'), {'q': 'кот'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&amp;page=2')
+        response = client.get(reverse('search'), {'q': 'кот', 'page': 2})
+        self.assertEqual(len(response.context['page']), 2)
+
+    def test_empty_query(self):
+        response = Client().get(reverse('search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 0)
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class Fts5SearchTests(SearchIndexMixin, TestCase):
+    def test_uses_fts5_table(self):
+        self.assertEqual(search.get_index().name, 'fts5')
+        self.assertFalse(SearchTerm.objects.exists())
+
+
+@override_settings(SEARCH_BACKEND='table')
+class TableSearchTests(SearchIndexMixin, TestCase):
+    def test_uses_term_table(self):
+        self.assertEqual(search.get_index().name, 'table')
+        self.assertTrue(SearchTerm.objects.filter(term='кошк').exists())
+
+
+class AdminSearchTests(TestCase):
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        post = Post.objects.create(author=admin, text='Кошки на крыше')
+        Post.objects.create(author=admin, text='Собаки во дворе')
+        client = Client()
+        client.force_login(admin)
+        response = client.get('/admin/posts/post/', {'q': 'кошка'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
+
+
+class SearchMigrationTests(TransactionTestCase):
+    """Заполнение индекса миграцией 0023 на исторических моделях."""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('posts', target)])
+        return executor.loader.project_state(('posts', target)).apps
+
+    def posts_before_search(self):
+        self.addCleanup(self.migrate, LATEST)
+        old_apps = self.migrate('0022_post_thumbnails')
+        User = old_apps.get_model('auth', 'User')
+        Post = old_apps.get_model('posts', 'Post')
+        Comment = old_apps.get_model('posts', 'Comment')
+        author = User.objects.create(username='Dike')
+        post = Post.objects.create(author=author, text='Старая кошка')
+        comment = Comment.objects.create(post=post, author=author,
+                                         text='Собаки')
+        self.migrate('0023_search')
+        return post, comment
+
+    def test_migration_fills_fts5_table(self):
+        post, comment = self.posts_before_search()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid, post_id FROM posts_search '
+                           'ORDER BY rowid')
+            rows = cursor.fetchall()
+        self.assertEqual(rows, [(post.pk * 2, post.pk),
+                                (comment.pk * 2 + 1, post.pk)])
+
+    @override_settings(SEARCH_BACKEND='table')
+    def test_migration_fills_term_table(self):
+        post, comment = self.posts_before_search()
+        self.assertEqual(
+            set(SearchTerm.objects.values_list('term', 'doc')),
+            {(stem('старая'), post.pk * 2), (stem('кошка'), post.pk * 2),
+             (stem('собаки'), comment.pk * 2 + 1)})
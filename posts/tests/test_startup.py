@@ -0,0 +1,38 @@
+import json
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from posts.management.commands.bench_startup import parse_importtime
+
+
+class StartupTests(SimpleTestCase):
+    def test_production_boot_fits_budget(self):
+        out = StringIO()
+        call_command('bench_startup', runs=1, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(results['settings'], 'yatube.settings.prod')
+        self.assertEqual(results['forbidden'], [])
+        self.assertLessEqual(results['import_ms'],
+                             settings.STARTUP_IMPORT_BUDGET_MS)
+        self.assertIn('django', {row['package'] for row in results['top']})
+
+    def test_dev_apps_are_reported(self):
+        with self.assertRaisesMessage(CommandError, 'debug_toolbar'):
+            call_command('bench_startup', runs=1, budget=10 ** 6,
+                         settings_module='yatube.settings.dev',
+                         stdout=StringIO())
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   posts.stemmer\n'
+            'import time:       300 |        420 | posts\n'
+        )
+        self.assertEqual(parse_importtime(output), [
+            ('posts.stemmer', 120, 120, 1),
+            ('posts', 300, 420, 0),
+        ])
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import Follow, Group, Post, UserSuggestions
+
+User = get_user_model()
+
+
+class SuggestionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user('Mike')
+        self.friend = User.objects.create_user('Dike')
+        self.friend_of_friend = User.objects.create_user('Like')
+        self.writer = User.objects.create_user('Pike')
+        self.cats = Group.objects.create(title='Кошки', slug='cats')
+        self.dogs = Group.objects.create(title='Собаки', slug='dogs')
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.friend_of_friend)
+        Post.objects.create(author=self.friend, group=self.cats, text='Кот')
+        for _ in range(3):
+            Post.objects.create(author=self.writer, group=self.cats,
+                                text='Ещё кот')
+        Post.objects.create(author=self.reader, group=self.dogs, text='Пёс')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def compute(self, **options):
+        options.setdefault('processes', 1)
+        out = StringIO()
+        call_command('compute_suggestions', stdout=out, **options)
+        return out.getvalue()
+
+    def suggested(self, user):
+        row = UserSuggestions.objects.get(pk=user.pk)
+        return row.authors, row.groups
+
+    def test_co_follow_and_co_posting(self):
+        self.assertIn('для 4 пользователей', self.compute())
+        stats = suggestions.load(10)
+        author_ids, group_ids = suggestions.suggest(stats, self.reader.pk, 10)
+        # Сначала автор из подписок друга, потом активный автор группы,
+        # где пишет друг; на друга читатель уже подписан.
+        self.assertEqual(author_ids,
+                         [self.friend_of_friend.pk, self.writer.pk])
+        # В своей группе читатель уже пишет.
+        self.assertEqual(group_ids, [self.cats.pk])
+        self.assertEqual(self.suggested(self.reader), (
+            f'[[{self.friend_of_friend.pk}, "Like"], '
+            f'[{self.writer.pk}, "Pike"]]',
+            '[["cats", "Кошки"]]'))
+
+    def test_users_without_signals_get_popular_authors(self):
+        newcomer = User.objects.create_user('Nike')
+        self.compute()
+        self.assertEqual(self.suggested(newcomer), (
+            f'[[{self.friend.pk}, "Dike"], '
+            f'[{self.friend_of_friend.pk}, "Like"]]',
+            '[["cats", "Кошки"], ["dogs", "Собаки"]]'))
+
+    def test_process_pool_gives_same_result(self):
+        self.compute()
+        single = list(UserSuggestions.objects.order_by('pk')
+                      .values_list('authors', 'groups'))
+        self.compute(processes=2, chunk_size=1)
+        self.assertEqual(list(UserSuggestions.objects.order_by('pk')
+                              .values_list('authors', 'groups')), single)
+
+    def test_pages_read_suggestions_with_one_query(self):
+        self.compute()
+        response = self.client.get(reverse('follow_index'))
+        self.assertEqual(
+            [author['username']
+             for author in response.context['suggested_authors']],
+            ['Like', 'Pike'])
+        self.assertContains(response, 'Кого почитать')
+        self.assertContains(response, reverse('group', args=['cats']))
+
+        response = self.client.get(
+            reverse('profile', kwargs={'username': 'Like'}))
+        self.assertEqual(
+            [author['username']
+             for author in response.context['suggested_authors']],
+            ['Pike'])
+        user = response.context['user']
+        with self.assertNumQueries(1):
+            suggestions.for_user(user)
+
+    def test_followed_authors_are_hidden_before_recompute(self):
+        self.compute()
+        Follow.objects.create(user=self.reader, author=self.writer)
+        authors, _ = suggestions.for_user(self.reader)
+        self.assertEqual([author['username'] for author in authors],
+                         ['Like'])
@@ -0,0 +1,207 @@
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import tasks
+from posts.models import FeedEntry, Follow, Post, Task
+
+User = get_user_model()
+
+calls = []
+
+
+def remember(value):
+    calls.append(value)
+
+
+def explode():
+    raise RuntimeError('не вышло')
+
+
+def outlive_lock():
+    # Дольше TASKS_LOCK_TIMEOUT: без продления блокировки задачу вернул
+    # бы в очередь requeue_stale.
+    time.sleep(0.5)
+    calls.append(tasks.requeue_stale())
+
+
+QUEUED_EMAIL = {
+    'EMAIL_BACKEND': 'posts.mail.QueuedEmailBackend',
+    'EMAIL_DELIVERY_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+}
+
+
+def run_tasks():
+    out = StringIO()
+    call_command('run_tasks', burst=True, concurrency=1, stdout=out)
+    return out.getvalue()
+
+
+@override_settings(TASKS_MODE='worker', TASKS_RETRY_DELAY=10,
+                   TASKS_MAX_ATTEMPTS=2)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_runs_and_deletes_tasks(self):
+        tasks.enqueue(remember, value=1)
+        tasks.enqueue(remember, value=2)
+        self.assertEqual(calls, [])
+        self.assertIn('Выполнено задач: 2', run_tasks())
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff_then_fail(self):
+        task = tasks.enqueue(explode)
+        started = timezone.now()
+        run_tasks()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.QUEUED, 1))
+        self.assertIn('RuntimeError', task.last_error)
+        self.assertGreaterEqual(task.run_after,
+                                started + timedelta(seconds=10))
+        # Время повтора ещё не пришло.
+        self.assertIn('Выполнено задач: 0', run_tasks())
+
+        Task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+        run_tasks()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        self.assertIn('Выполнено задач: 0', run_tasks())
+
+    def test_stale_tasks_are_requeued(self):
+        task = tasks.enqueue(remember, value=3)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.RUNNING, locked_by='упавший',
+            locked_at=timezone.now() - timedelta(hours=1))
+        self.assertIn('Возвращено в очередь задач: 1', run_tasks())
+        self.assertEqual(calls, [3])
+
+    @override_settings(TASKS_MODE='sync')
+    def test_sync_mode_runs_inline(self):
+        self.assertIsNone(tasks.enqueue(remember, value=4))
+        self.assertEqual(calls, [4])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(FEED_FANOUT_ASYNC_FROM=0)
+    def test_large_fan_out_is_queued(self):
+        author = User.objects.create_user('Dike')
+        reader = User.objects.create_user('Mike')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(author=author, text='Пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        run_tasks()
+        self.assertTrue(FeedEntry.objects.filter(user=reader,
+                                                 post=post).exists())
+
+
+@override_settings(TASKS_MODE='worker', **QUEUED_EMAIL)
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_signup_mail_is_queued(self):
+        response = self.client.post(reverse('signup'), {
+            'username': 'dike', 'email': 'dike@example.com',
+            'password1': 'Zx8-secret-pass', 'password2': 'Zx8-secret-pass',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Task.objects.get().name, 'posts.mail.deliver')
+
+        run_tasks()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['dike@example.com'])
+        self.assertIn('dike', mail.outbox[0].body)
+
+    def test_password_reset_mail_is_queued(self):
+        User.objects.create_user('dike', 'dike@example.com', 'password')
+        self.client.post(reverse('password_reset'),
+                         {'email': 'dike@example.com'})
+        self.assertEqual(mail.outbox, [])
+        run_tasks()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
+
+
+# Тестовая база SQLite в памяти с общим кэшем блокирует таблицы
+# целиком и не ждёт освобождения, поэтому поток один, а тест, пока он
+# работает, базу не трогает.
+@override_settings(TASKS_MODE='thread', TASKS_CONCURRENCY=1)
+class ThreadModeTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def join_threads(self):
+        for thread in list(tasks._threads):
+            thread.join(timeout=10)
+        self.assertFalse(any(thread.is_alive()
+                             for thread in threading.enumerate()
+                             if thread.name.startswith('tasks-')))
+
+    def stale_task(self, value):
+        with override_settings(TASKS_MODE='worker'):
+            task = tasks.enqueue(remember, value=value)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.RUNNING, locked_by='упавший',
+            locked_at=timezone.now() - timedelta(hours=1))
+
+    def test_threads_run_tasks_after_commit(self):
+        with transaction.atomic():
+            for value in range(5):
+                tasks.enqueue(remember, value=value)
+            self.assertEqual(calls, [])
+        self.join_threads()
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Task.objects.exists())
+
+    def test_threads_requeue_stale_tasks(self):
+        self.stale_task(1)
+        with override_settings(TASKS_MODE='worker'):
+            tasks.enqueue(remember, value=2)
+        tasks._wake_threads()
+        self.join_threads()
+        self.assertEqual(calls, [2, 1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_start_threads_picks_up_left_tasks(self):
+        self.stale_task(1)
+        with override_settings(TASKS_MODE='worker'):
+            tasks.enqueue(remember, value=2)
+        tasks.start_threads()
+        self.join_threads()
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_LOCK_TIMEOUT=0.3)
+    def test_running_task_keeps_its_lock(self):
+        tasks.enqueue(outlive_lock)
+        tasks._wake_threads()
+        self.join_threads()
+        self.assertEqual(calls, [0])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_RETRY_DELAY=0.5, TASKS_MAX_ATTEMPTS=2,
+                       TASKS_POLL_INTERVAL=0.01)
+    def test_threads_sleep_until_retry(self):
+        with override_settings(TASKS_MODE='worker'):
+            task = tasks.enqueue(explode)
+        with mock.patch.object(tasks, 'claim', wraps=tasks.claim) as claim:
+            tasks._wake_threads()
+            self.join_threads()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        # Две попытки и по одной пустой проверке после каждой, без
+        # опроса очереди во время паузы перед повтором.
+        self.assertLessEqual(claim.call_count, 4)
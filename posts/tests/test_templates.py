@@ -0,0 +1,52 @@
+import json
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.template import engines
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from posts.management.commands.bench_templates import templates_setting
+from posts.models import Post
+from posts.template_cache import template_names, warm_templates
+
+User = get_user_model()
+
+
+class TemplateWarmupTests(TestCase):
+    def test_all_templates_are_compiled(self):
+        expected = set(template_names(settings.TEMPLATES_DIR))
+        self.assertIn('base.html', expected)
+        self.assertIn('includes/post_card.html', expected)
+        compiled = {name for name, _ in warm_templates()}
+        self.assertEqual(compiled, expected)
+
+    def test_warmup_fills_cached_loader(self):
+        with override_settings(TEMPLATES=templates_setting(cached=True)):
+            warm_templates()
+            loader = engines['django'].engine.template_loaders[0]
+            cached = {key.split('-')[0]
+                      for key in loader.get_template_cache}
+            self.assertIn('index.html', cached)
+            self.assertIn('includes/post_card.html', cached)
+            self.assertTrue(os.path.exists(
+                loader.get_template_cache['index.html'].origin.name))
+
+    def test_command_reports_compile_times(self):
+        out = StringIO()
+        call_command('warm_templates', stdout=out)
+        self.assertIn('base.html', out.getvalue())
+        self.assertIn('всего шаблонов', out.getvalue())
+
+    def test_bench_compares_loaders(self):
+        Post.objects.create(author=User.objects.create_user('Dike'),
+                            text='Пост')
+        out = StringIO()
+        call_command('bench_templates', renders=4, rounds=2, json=True,
+                     stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results), {'uncached', 'cached'})
+        self.assertIn('p50_ms', results['cached'])
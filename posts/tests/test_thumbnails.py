@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Dike')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, name='small.gif'):
+        return SimpleUploadedFile(name=name, content=SMALL_GIF,
+                                  content_type='image/gif')
+
+    def thumbnail_files(self, post):
+        """Файлы миниатюр поста, которые есть в хранилище."""
+        folder = os.path.join(settings.MEDIA_ROOT, 'thumbs', str(post.pk))
+        return set(os.listdir(folder)) if os.path.isdir(folder) else set()
+
+    def card_files(self, post):
+        return {os.path.basename(url) for url, mime in post.card_image}
+
+    def create_post(self):
+        uploaded = self.upload()
+        self.authorized_client.post(reverse('new_post'),
+                                    {'text': 'Пост', 'image': uploaded})
+        return Post.objects.get(text='Пост')
+
+    @override_settings(THUMBNAIL_ASYNC=False,
+                       THUMBNAIL_FORMATS=['webp', 'jpeg'])
+    def test_thumbnails_are_pregenerated(self):
+        post = self.create_post()
+        sources = post.card_image
+        self.assertEqual([mime for url, mime in sources],
+                         ['image/webp', 'image/jpeg'])
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, '<source srcset="%s"' % sources[0][0])
+        self.assertContains(response, '<img class="card-img" src="%s"'
+                            % sources[1][0])
+
+    @override_settings(THUMBNAIL_ASYNC=False,
+                       THUMBNAIL_FORMATS=['webp', 'jpeg'])
+    def test_new_image_resets_thumbnails(self):
+        post = self.create_post()
+        post.image = ''
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.card_image, [])
+
+    @override_settings(THUMBNAIL_ASYNC=False,
+                       THUMBNAIL_FORMATS=['webp', 'jpeg'])
+    def test_old_thumbnails_are_deleted(self):
+        post = self.create_post()
+        old_files = self.card_files(post)
+        self.assertEqual(len(old_files), 2)
+        self.assertLessEqual(old_files, self.thumbnail_files(post))
+        post.image = self.upload('other.gif')
+        with run_on_commit():
+            post.save()
+        post.refresh_from_db()
+        new_files = self.card_files(post)
+        self.assertLessEqual(new_files, self.thumbnail_files(post))
+        self.assertFalse(old_files & self.thumbnail_files(post))
+        with run_on_commit():
+            post.delete()
+        self.assertFalse(new_files & self.thumbnail_files(post))
+
+    @override_settings(THUMBNAIL_ASYNC=True, TASKS_MODE='worker')
+    def test_request_does_not_wait_for_thumbnails(self):
+        post = self.create_post()
+        self.assertEqual(post.card_image, [])
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, '<img class="card-img" src="%s"'
+                            % post.image.url)
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_missing_image_is_skipped(self):
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            post = Post.objects.create(author=self.user, text='Пост',
+                                       image='posts/missing.gif')
+        post.refresh_from_db()
+        self.assertEqual(post.card_image, [])
@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import Comment, FeedEntry, Follow, Group, Post
+from posts.search import search_post_ids
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.author = User.objects.create_user('Dike')
+        self.reader = User.objects.create_user('Mike')
+        self.group = Group.objects.create(title='Кошки', slug='cats',
+                                          description='Про кошек')
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Пушистая кошка')
+        self.comment = Comment.objects.create(post=self.post,
+                                              author=self.reader,
+                                              text='Какая собака')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def export(self, kind, extension):
+        path = self.path(f'{kind}.{extension}')
+        call_command('export_data', kind, output=path, stderr=StringIO())
+        return path
+
+    def import_(self, kind, path, **options):
+        call_command('import_data', kind, path, stdout=StringIO(), **options)
+
+    def roundtrip(self, extension):
+        paths = {kind: self.export(kind, extension)
+                 for kind in ('groups', 'posts', 'comments', 'follows')}
+        pub_date = self.post.pub_date
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        for kind, path in paths.items():
+            self.import_(kind, path)
+
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.author.username, 'Dike')
+        self.assertEqual(post.group.slug, 'cats')
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.comment_count, 1)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.author.username, 'Mike')
+        self.assertEqual(comment.post, post)
+        reader = User.objects.get(username='Mike')
+        self.assertTrue(Follow.objects.filter(user=reader,
+                                              author=post.author).exists())
+        self.assertTrue(FeedEntry.objects.filter(user=reader,
+                                                 post=post).exists())
+        self.assertEqual(search_post_ids('кошка'), [post.pk])
+        self.assertEqual(search_post_ids('собака'), [post.pk])
+
+    def test_ndjson_roundtrip(self):
+        self.roundtrip('ndjson')
+
+    def test_csv_roundtrip(self):
+        self.roundtrip('csv')
+
+    def test_import_is_idempotent(self):
+        path = self.export('posts', 'ndjson')
+        self.import_('posts', path)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_resume_after_failure(self):
+        records = [{'id': 100 + i, 'author': f'user-{i}', 'group': 'cats',
+                    'text': f'Пост {i}',
+                    'pub_date': '2020-01-01T00:00:00+00:00'}
+                   for i in range(5)]
+        records[3]['group'] = 'dogs'
+        path = self.path('posts.ndjson')
+        with open(path, 'w') as output:
+            output.writelines(json.dumps(record) + '\n'
+                              for record in records)
+
+        with self.assertRaises(CommandError):
+            self.import_('posts', path, batch_size=2)
+        self.assertEqual(Post.objects.filter(pk__gte=100).count(), 2)
+        with open(f'{path}.checkpoint') as source:
+            self.assertEqual(json.load(source), {
+                'records': 2, 'first_post': 100, 'last_post': 101})
+
+        Group.objects.create(title='Собаки', slug='dogs')
+        out = StringIO()
+        call_command('import_data', 'posts', path, batch_size=2,
+                     resume=True, stdout=out)
+        self.assertIn('пропущено 2', out.getvalue())
+        self.assertEqual(Post.objects.filter(pk__gte=100).count(), 5)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_resumed_follows_fill_feeds(self):
+        fan = User.objects.create_user('Fan')
+        path = self.path('follows.ndjson')
+        records = [{'user': 'Fan', 'author': 'Dike'}, {'user': 'Fan'}]
+        with open(path, 'w') as output:
+            output.writelines(json.dumps(record) + '\n'
+                              for record in records)
+        with self.assertRaises(CommandError):
+            self.import_('follows', path, batch_size=1)
+        with open(f'{path}.checkpoint') as source:
+            after = Follow.objects.get(user=fan).pk - 1
+            self.assertEqual(json.load(source),
+                             {'records': 1, 'follows_after': after})
+
+        records[1]['author'] = 'Mike'
+        with open(path, 'w') as output:
+            output.writelines(json.dumps(record) + '\n'
+                              for record in records)
+        self.import_('follows', path, batch_size=1, resume=True)
+        # Ленту по паре из первой пачки заполнил finish() продолжения.
+        self.assertTrue(FeedEntry.objects.filter(user=fan,
+                                                 post=self.post).exists())
+        self.assertEqual(Follow.objects.filter(user=fan).count(), 2)
+
+    def test_comment_for_missing_post(self):
+        path = self.path('comments.ndjson')
+        with open(path, 'w') as output:
+            output.write(json.dumps({
+                'id': 100, 'post': 999, 'author': 'Mike', 'text': 'Привет',
+                'created': '2020-01-01T00:00:00+00:00'}) + '\n')
+        with self.assertRaises(CommandError):
+            self.import_('comments', path)
+        self.assertFalse(Comment.objects.filter(pk=100).exists())
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_HALF_LIFE=3600, TRENDING_SIZE=3)
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        trending._boards.clear()
+        self.author = User.objects.create_user('Dike')
+        self.cats = Group.objects.create(title='Кошки', slug='cats')
+        self.dogs = Group.objects.create(title='Собаки', slug='dogs')
+        self.client = Client()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.author,
+                                   text='Комментарий')
+
+    def trend(self, obj):
+        obj.refresh_from_db()
+        return obj.trend
+
+    def test_comments_outweigh_newer_post(self):
+        old = Post.objects.create(author=self.author, group=self.cats,
+                                  text='Старый')
+        new = Post.objects.create(author=self.author, group=self.dogs,
+                                  text='Новый')
+        self.assertGreater(self.trend(new), self.trend(old))
+        self.comment(old, 2)
+        self.assertGreater(self.trend(old), self.trend(new))
+        self.assertGreater(self.trend(self.cats), self.trend(self.dogs))
+        self.assertAlmostEqual(trending.score(self.trend(old)), 3, places=2)
+
+    def test_score_halves_every_half_life(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        later = timezone.now() + timedelta(hours=1)
+        self.assertAlmostEqual(trending.score(self.trend(post), later), 0.5,
+                               places=2)
+
+    def test_recompute_matches_incremental_scores(self):
+        post = Post.objects.create(author=self.author, group=self.cats,
+                                   text='Пост')
+        self.comment(post, 3)
+        incremental = self.trend(post), self.trend(self.cats)
+        # Удалённый комментарий уберёт только пересчёт.
+        Comment.objects.filter(post=post).first().delete()
+        out = StringIO()
+        call_command('recompute_trending', stdout=out)
+        self.assertIn('Пересчитано постов: 1, групп: 1', out.getvalue())
+        self.assertAlmostEqual(trending.score(self.trend(post)), 3, places=2)
+        self.assertLess(self.trend(post), incremental[0])
+        self.assertAlmostEqual(self.trend(self.cats), self.trend(post))
+
+    def test_old_events_fall_out_of_window(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        fresh = Post.objects.create(author=self.author, text='Свежий')
+        self.assertEqual(trending.recompute(), (1, 0))
+        self.assertEqual(trending.top_posts()[0], fresh.pk)
+
+    def test_board_keeps_only_top_k(self):
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(4)]
+        self.assertEqual(trending.top_posts(),
+                         [post.pk for post in reversed(posts[1:])])
+        # Комментарий в этом процессе сразу попадает в кучу.
+        self.comment(posts[0], 2)
+        self.assertEqual(trending.top_posts()[0], posts[0].pk)
+        self.assertEqual(len(trending.top_posts()), 3)
+        posts[0].delete()
+        self.assertNotIn(posts[0].pk, trending.top_posts())
+
+    def test_trending_page(self):
+        quiet = Post.objects.create(author=self.author, group=self.dogs,
+                                    text='Тихий')
+        busy = Post.objects.create(author=self.author, group=self.cats,
+                                   text='Обсуждаемый')
+        self.comment(busy, 3)
+        trending.top_posts()
+        trending.top_groups()
+        # Кучи уже прочитаны: поколение из кэша, посты и группы по id.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('trending'))
+        self.assertEqual(response.context['posts'], [busy, quiet])
+        self.assertEqual(response.context['groups'], [self.cats, self.dogs])
+        self.assertContains(response, 'Обсуждаемый')
@@ -12,6 +12,7 @@ from django.urls import reverse
 
 from posts.forms import PostForm
 from posts.models import Follow, Group, Post
+from posts.tests.utils import run_on_commit
 
 User = get_user_model()
 
@@ -225,20 +226,30 @@ class PostPagesTests(TestCase):
         self.assertIsNotNone(post.image.url)
 
     def test_cache_on_homepage(self):
+        cache.clear()
         new_post_text = 'Text for cached post'
         response = self.authorized_client.get(reverse('index'))
         self.assertNotContains(response, new_post_text)
-        Post.objects.create(
-            author=self.user,
-            text=new_post_text,
-            group=PostPagesTests.group,
-        )
+        Post.objects.filter(pk=PostPagesTests.post.pk).update(text=new_post_text)
         response = self.authorized_client.get(reverse('index'))
         self.assertNotContains(response, new_post_text)
         cache.clear()
         response = self.authorized_client.get(reverse('index'))
         self.assertContains(response, new_post_text)
 
+    def test_new_post_invalidates_homepage_cache(self):
+        new_post_text = 'Text for new post'
+        response = self.authorized_client.get(reverse('index'))
+        self.assertNotContains(response, new_post_text)
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user,
+                text=new_post_text,
+                group=PostPagesTests.group,
+            )
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, new_post_text)
+
     def test_post_creation_if_user_follow(self):
         post = Post.objects.create(
             author=self.user,
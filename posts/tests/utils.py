@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def run_on_commit():
+    """Выполнить колбэки ``transaction.on_commit``, добавленные в блоке.
+
+    ``TestCase`` не фиксирует транзакцию, поэтому без этого, например,
+    поколения кэша не меняются. Аналог
+    ``captureOnCommitCallbacks(execute=True)`` из Django 3.2.
+    """
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        while len(connection.run_on_commit) > start:
+            _, callback = connection.run_on_commit.pop(start)
+            callback()
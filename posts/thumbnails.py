@@ -0,0 +1,126 @@
+"""Заранее подготовленные миниатюры изображений постов.
+
+Миниатюры всех размеров из ``settings.POST_THUMBNAILS`` и всех форматов
+из ``settings.THUMBNAIL_FORMATS`` строятся в очереди задач
+(``posts.tasks``) после сохранения поста с новым изображением. Пути
+к готовым файлам хранятся в ``Post.thumbnails``, поэтому шаблон только
+читает готовые адреса и не обращается к Pillow. Имена файлов содержат
+хэш имени изображения; когда изображение поста меняется или пост
+удаляется, миниатюры прежнего изображения удаляет ``discard``.
+"""
+import hashlib
+import json
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, tasks
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+def schedule(post_id):
+    """Поставить построение миниатюр поста в очередь задач."""
+    if not settings.THUMBNAIL_ASYNC:
+        generate(post_id)
+        return
+    tasks.enqueue(generate, post_id=post_id)
+
+
+def discard(post_id, image_name):
+    """Удалить миниатюры изображения ``image_name`` после коммита."""
+    if not settings.THUMBNAIL_ASYNC:
+        transaction.on_commit(lambda: remove(post_id, image_name))
+        return
+    tasks.enqueue(remove, post_id=post_id, image_name=image_name)
+
+
+def remove(post_id, image_name):
+    """Удалить файлы миниатюр поста, построенные из ``image_name``."""
+    folder = _folder(post_id)
+    marker = f"-{_digest(image_name)}."
+    try:
+        _, files = default_storage.listdir(folder)
+    except FileNotFoundError:
+        return
+    for name in files:
+        if marker in name:
+            default_storage.delete(f"{folder}/{name}")
+
+
+def supported_formats():
+    # features.check() на формате, которого эта версия Pillow не знает
+    # (AVIF до 11.3), предупреждает UserWarning, а check_module()
+    # бросает ValueError, поэтому сначала — есть ли такой модуль вообще.
+    from PIL import features
+
+    return [fmt for fmt in settings.THUMBNAIL_FORMATS
+            if fmt in ("jpeg", "png")
+            or (fmt in features.modules and features.check_module(fmt))]
+
+
+def _folder(post_id):
+    return f"thumbs/{post_id}"
+
+
+def _digest(image_name):
+    return hashlib.md5(image_name.encode()).hexdigest()[:8]
+
+
+def generate(post_id):
+    """Построить все миниатюры поста и сохранить их пути в ``thumbnails``."""
+    from PIL import Image, ImageOps
+
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    try:
+        with post.image.open("rb") as source:
+            original = Image.open(source)
+            original.load()
+    except (OSError, SuspiciousFileOperation):
+        # Повтор не поможет: карточка покажет исходное изображение.
+        logger.warning("Изображение поста %s не читается", post.pk,
+                       exc_info=True)
+        return
+    digest = _digest(post.image.name)
+    formats = supported_formats()
+    thumbnails = {}
+    for name, spec in settings.POST_THUMBNAILS.items():
+        image = ImageOps.fit(original, tuple(spec["size"]),
+                             method=Image.LANCZOS,
+                             centering=spec.get("centering", (0.5, 0.5)))
+        sources = []
+        for fmt in formats:
+            path = f"{_folder(post.pk)}/{name}-{digest}.{fmt}"
+            default_storage.delete(path)
+            default_storage.save(path, ContentFile(_encode(image, fmt)))
+            sources.append([default_storage.url(path), MIME_TYPES[fmt]])
+        thumbnails[name] = sources
+    updated = Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        thumbnails=json.dumps(thumbnails), updated=timezone.now())
+    if updated:
+        caching.bump(*caching.post_scopes(post.author_id, post.group_id))
+
+
+def _encode(image, fmt):
+    if fmt == "jpeg" or image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB" if fmt == "jpeg" else "RGBA")
+    buffer = BytesIO()
+    image.save(buffer, format=fmt.upper(),
+               quality=settings.THUMBNAIL_QUALITY)
+    return buffer.getvalue()
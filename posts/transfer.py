@@ -0,0 +1,381 @@
+"""Выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Записи читаются и пишутся потоком в NDJSON (объект JSON на строку) или
+CSV. Авторы и группы в файле указываются по ``username`` и ``slug``,
+посты и комментарии сохраняют свои первичные ключи, поэтому комментарии
+ссылаются на пост по ``id``. Посты, комментарии и подписки загружаются
+пачками одним ``executemany`` с ``INSERT OR IGNORE`` (``ON CONFLICT DO
+NOTHING``), минуя экземпляры моделей: уже загруженные записи
+пропускаются, и прерванный импорт можно безопасно продолжить с последней
+сохранённой пачки.
+
+Сигналы при этом не отправляются: новые посты и комментарии добавляются
+в индекс поиска вместе со своей пачкой, а счётчики, ленты подписок и кэш
+лент после загрузки обновляет ``Importer.finish()``.
+"""
+import csv
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import bulk, caching, counters, feed, search
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FORMATS = ("ndjson", "csv")
+# Сколько ключей помнит KeyCache, прежде чем начать заново.
+LOOKUP_CACHE_SIZE = 100_000
+# По сколько авторов, групп и подписок обрабатывает Importer.finish().
+FINISH_CHUNK_SIZE = 500
+
+FIELDS = {
+    "groups": ("slug", "title", "description"),
+    "posts": ("id", "author", "group", "text", "pub_date", "updated",
+              "image"),
+    "comments": ("id", "post", "author", "text", "created"),
+    "follows": ("user", "author"),
+}
+KINDS = tuple(FIELDS)
+
+
+class TransferError(Exception):
+    """Запись файла нельзя загрузить."""
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Позволить ``bulk_create`` сохранить заданные даты.
+
+    ``auto_now``/``auto_now_add`` иначе перезаписывают их текущим временем.
+    """
+    fields = [field for model in models for field in model._meta.fields
+              if getattr(field, "auto_now", False)
+              or getattr(field, "auto_now_add", False)]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def guess_format(path):
+    return "csv" if path.endswith(".csv") else "ndjson"
+
+
+# Выгрузка
+
+
+def _export_querysets():
+    return {
+        "groups": Group.objects.order_by("pk").values_list(
+            "slug", "title", "description"),
+        "posts": Post.objects.order_by("pk").values_list(
+            "pk", "author__username", "group__slug", "text", "pub_date",
+            "updated", "image"),
+        "comments": Comment.objects.order_by("pk").values_list(
+            "pk", "post_id", "author__username", "text", "created"),
+        "follows": Follow.objects.order_by("pk").values_list(
+            "user__username", "author__username"),
+    }
+
+
+def _dump(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def export_records(kind, chunk_size=2000):
+    """Записи ``kind`` в порядке первичного ключа, по одному словарю."""
+    fields = FIELDS[kind]
+    rows = _export_querysets()[kind].iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield dict(zip(fields, map(_dump, row)))
+
+
+def write_records(records, stream, fmt, fields):
+    """Записать ``records`` в текстовый ``stream``; вернуть их число."""
+    total = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({name: "" if value is None else value
+                             for name, value in record.items()})
+            total += 1
+        return total
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False))
+        stream.write("\n")
+        total += 1
+    return total
+
+
+# Загрузка
+
+
+def read_records(stream, fmt):
+    """Словари из NDJSON или CSV; пустые строки NDJSON пропускаются."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise TransferError(f"строка {number}: {error}")
+
+
+class KeyCache:
+    """Первичные ключи по естественному ключу (``username``, ``slug``).
+
+    Недостающие ключи пачки запрашиваются одним запросом; если задан
+    ``create``, отсутствующие в базе объекты создаются им же пачкой.
+    """
+
+    def __init__(self, model, field, create=None):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.keys = {}
+        self.created = 0
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key not in self.keys}
+        if not missing:
+            return
+        if len(self.keys) + len(missing) > LOOKUP_CACHE_SIZE:
+            self.keys.clear()
+        self._load(missing)
+        missing.difference_update(self.keys)
+        if missing and self.create is not None:
+            self.model.objects.bulk_create(
+                [self.create(key) for key in sorted(missing)],
+                ignore_conflicts=True)
+            self.created += len(missing)
+            self._load(missing)
+            missing.difference_update(self.keys)
+        if missing:
+            raise TransferError(
+                f"{self.model._meta.verbose_name}: нет {self.field} "
+                f"{', '.join(sorted(missing)[:5])}")
+
+    def _load(self, keys):
+        self.keys.update(self.model.objects.filter(**{
+            f"{self.field}__in": keys,
+        }).values_list(self.field, "pk"))
+
+    def __getitem__(self, key):
+        return self.keys[key]
+
+
+def _new_user(username):
+    # Пароль, с которым нельзя войти: пользователь восстановит его сам.
+    return User(username=username, password="!")
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Importer:
+    """Загрузка записей одного вида пачками по ``batch_size``.
+
+    ``state`` — то, что нужно ``finish()``: границы первичных ключей
+    загруженных постов или последняя подписка до начала загрузки. Его
+    сохраняют вместе с точкой продолжения и передают при ``--resume``,
+    так что память не растёт с размером файла.
+    """
+
+    def __init__(self, kind, batch_size=5000, state=None):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.users = KeyCache(User, "username", create=_new_user)
+        self.groups = KeyCache(Group, "slug")
+        self.state = dict(state or {})
+        if kind == "follows" and "follows_after" not in self.state:
+            self.state["follows_after"] = Follow.objects.aggregate(
+                last=Max("pk"))["last"] or 0
+        self.parse_datetime = Post._meta.get_field("pub_date").to_python
+
+    def run(self, records, skip=0, on_batch=None):
+        """Загрузить ``records``, пропустив первые ``skip``.
+
+        После каждой зафиксированной пачки вызывается
+        ``on_batch(число обработанных записей)``. Возвращает общее число
+        обработанных записей вместе с пропущенными.
+        """
+        done = 0
+        batch = []
+        for record in records:
+            done += 1
+            if done <= skip:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self.load(batch, done)
+                batch = []
+                if on_batch is not None:
+                    on_batch(done)
+        if batch:
+            self.load(batch, done)
+            if on_batch is not None:
+                on_batch(done)
+        return done
+
+    def load(self, records, last):
+        first = last - len(records) + 1
+        try:
+            with transaction.atomic():
+                getattr(self, f"load_{self.kind}")(records)
+        except (KeyError, TypeError, ValueError, ValidationError) as error:
+            raise TransferError(
+                f"записи {first}–{last}: неверное поле {error}")
+        except TransferError as error:
+            raise TransferError(f"записи {first}–{last}: {error}")
+
+    def datetime(self, value):
+        """Дата из файла в виде, готовом для базы."""
+        try:
+            # Выгрузка пишет isoformat(): его fromisoformat разбирает
+            # быстрее, чем DateTimeField.to_python.
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            value = self.parse_datetime(value)
+        if (value is not None and settings.USE_TZ
+                and timezone.is_naive(value)):
+            value = timezone.make_aware(value)
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def load_groups(self, records):
+        Group.objects.bulk_create([
+            Group(slug=record["slug"], title=record["title"],
+                  description=record.get("description") or "")
+            for record in records
+        ], ignore_conflicts=True)
+
+    def load_posts(self, records):
+        self.users.resolve({record["author"] for record in records})
+        self.groups.resolve({record["group"] for record in records
+                             if record.get("group")})
+        rows = []
+        for record in records:
+            pub_date = self.datetime(record["pub_date"])
+            group = record.get("group")
+            rows.append((
+                int(record["id"]),
+                self.users[record["author"]],
+                self.groups[group] if group else None,
+                record["text"],
+                pub_date,
+                self.datetime(record.get("updated")) or pub_date,
+                record.get("image") or None,
+            ))
+        self._insert(Post, ("id", "author", "group", "text", "pub_date",
+                            "updated", "image"),
+                     rows, search.POST, lambda row: (row[0], row[3]))
+        first = min(row[0] for row in rows)
+        last = max(row[0] for row in rows)
+        self.state["first_post"] = min(first,
+                                       self.state.get("first_post", first))
+        self.state["last_post"] = max(last, self.state.get("last_post", last))
+
+    def load_comments(self, records):
+        self.users.resolve({record["author"] for record in records})
+        post_ids = {int(record["post"]) for record in records}
+        missing = post_ids - set(Post.objects.filter(pk__in=post_ids)
+                                 .values_list("pk", flat=True))
+        if missing:
+            raise TransferError(
+                f"нет постов {', '.join(map(str, sorted(missing)[:5]))}")
+        rows = [(int(record["id"]), int(record["post"]),
+                 self.users[record["author"]], record["text"],
+                 self.datetime(record["created"]))
+                for record in records]
+        self._insert(Comment, ("id", "post", "author", "text", "created"),
+                     rows, search.COMMENT, lambda row: (row[1], row[3]))
+
+    def load_follows(self, records):
+        self.users.resolve({record[name] for record in records
+                            for name in ("user", "author")})
+        bulk.insert_rows(Follow, ("user", "author"), [
+            (self.users[record["user"]], self.users[record["author"]])
+            for record in records
+            if record["user"] != record["author"]
+        ])
+
+    def _insert(self, model, fields, rows, kind, document):
+        """Сохранить новые ``rows`` и добавить их в индекс поиска.
+
+        Первое поле строки — первичный ключ; ``document(row)`` возвращает
+        пост и текст для индекса. Уже существующие записи вставка
+        пропустит; они есть в индексе с тех пор, как были сохранены.
+        """
+        existing = set(model.objects.filter(
+            pk__in=[row[0] for row in rows]).values_list("pk", flat=True))
+        bulk.insert_rows(model, fields, rows)
+        new = {}
+        for row in rows:
+            # Из повторов одного ключа в пачке сохраняется первый.
+            if row[0] not in existing:
+                new.setdefault(row[0], row)
+        search.get_index().bulk_update([
+            (search.doc_id(kind, pk), *document(row))
+            for pk, row in new.items()
+        ])
+
+    def finish(self):
+        """Обновить то, что при обычном сохранении делают сигналы.
+
+        Затронутые авторы, группы и подписки читаются из базы частями
+        по ``FINISH_CHUNK_SIZE``, каждая часть — в своей транзакции.
+        """
+        counters.reconcile()
+        if "first_post" in self.state:
+            posts = Post.objects.filter(pk__range=(
+                self.state["first_post"], self.state["last_post"]))
+            authors = (posts.order_by("author_id").distinct()
+                       .values_list("author_id", flat=True))
+            for author_ids in _chunks(authors.iterator(), FINISH_CHUNK_SIZE):
+                followers = Follow.objects.filter(
+                    author_id__in=author_ids).values_list("user_id",
+                                                          "author_id")
+                with transaction.atomic():
+                    feed.backfill_pairs(followers.iterator())
+                    caching.bump(*map(caching.author_scope, author_ids))
+            groups = (posts.exclude(group=None).order_by("group_id")
+                      .distinct().values_list("group_id", flat=True))
+            for group_ids in _chunks(groups.iterator(), FINISH_CHUNK_SIZE):
+                caching.bump(*map(caching.group_scope, group_ids))
+        if "follows_after" in self.state:
+            # Сохранились только пары, не нарушившие ограничения Follow.
+            # По автору: backfill_pairs читает посты каждого автора пачки.
+            pairs = (Follow.objects
+                     .filter(pk__gt=self.state["follows_after"])
+                     .order_by("author_id", "user_id")
+                     .values_list("user_id", "author_id"))
+            for chunk in _chunks(pairs.iterator(), FINISH_CHUNK_SIZE):
+                with transaction.atomic():
+                    feed.update_pull_status(*{author for _, author in chunk})
+                    feed.backfill_pairs(chunk)
+                    caching.bump(*{caching.follows_scope(user_id)
+                                   for user_id, _ in chunk})
+        caching.bump(caching.ALL_POSTS)
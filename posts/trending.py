@@ -0,0 +1,219 @@
+"""Обсуждаемые посты и группы: оценки с затуханием по времени.
+
+Новый пост и каждый комментарий добавляют к оценке поста и его группы
+вес, который затем убывает вдвое за ``TRENDING_HALF_LIFE`` секунд.
+В поле ``trend`` хранится не сама оценка, а её логарифм, приведённый
+к началу эпохи: ``trend = ln(оценка) + t * RATE``. Затухание одинаково
+для всех, поэтому порядок по ``trend`` в любой момент совпадает с
+порядком по текущей оценке, старые значения пересчитывать не нужно,
+а событие прибавляется одним UPDATE без чтения:
+``trend = logaddexp(trend, ln(вес) + t * RATE)``.
+
+Лучшие ``TRENDING_SIZE`` постов и групп каждый процесс держит
+в ограниченных кучах (``Board``). Свои события процесс применяет к ним
+сразу, а чужие подхватывает, перечитывая кучу из индекса по ``trend``
+раз в ``TRENDING_REFRESH`` секунд и после ``recompute``. Страница
+/trending/ берёт из кучи K id и читает K строк.
+
+Удалённые комментарии и посты, перенесённые в другую группу, оценки не
+уменьшают: их поправляет ``recompute`` (команда ``recompute_trending``),
+который считает оценки заново по событиям последних
+``TRENDING_WINDOW`` секунд. События, пришедшие во время пересчёта,
+могут потеряться, поэтому запускать его стоит редко, например раз в
+час.
+"""
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from . import caching
+from .models import Comment, Group, Post
+
+POSTS = "posts"
+GROUPS = "groups"
+# Поколение в кэше меняется после recompute: процессы перечитывают кучи.
+SCOPE = "trending"
+BATCH_SIZE = 500
+
+
+def rate():
+    return math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def event_trend(weight, when):
+    """Логарифм веса события, приведённый к началу эпохи."""
+    return math.log(weight) + when.timestamp() * rate()
+
+
+def score(trend, now=None):
+    """Текущая оценка по значению ``trend``."""
+    now = (now or timezone.now()).timestamp()
+    return math.exp(trend - now * rate())
+
+
+def _added(trend):
+    # logaddexp(a, b) = max(a, b) + ln(1 + exp(-|a - b|)) без переполнения.
+    value = Value(trend, output_field=FloatField())
+    return (Greatest(F("trend"), value)
+            + Ln(Value(1.0) + Exp(Value(0.0) - Abs(F("trend") - value))))
+
+
+class Board:
+    """Ограниченная куча ``size`` id с наибольшим ``trend``."""
+
+    def __init__(self, size):
+        self.size = size
+        self.heap = []
+        self.trends = {}
+        self.loaded = None
+        self.version = None
+
+    def fill(self, rows):
+        self.trends = dict(rows)
+        self._heapify()
+
+    def offer(self, pk, trend):
+        if pk in self.trends:
+            self.trends[pk] = trend
+            self._heapify()
+        elif len(self.heap) < self.size:
+            self.trends[pk] = trend
+            heapq.heappush(self.heap, (trend, pk))
+        elif trend > self.heap[0][0]:
+            _, dropped = heapq.heapreplace(self.heap, (trend, pk))
+            del self.trends[dropped]
+            self.trends[pk] = trend
+
+    def remove(self, pk):
+        if self.trends.pop(pk, None) is not None:
+            self._heapify()
+
+    def top(self):
+        return [pk for _, pk in sorted(self.heap, reverse=True)]
+
+    def _heapify(self):
+        self.heap = [(trend, pk) for pk, trend in self.trends.items()]
+        heapq.heapify(self.heap)
+
+
+_lock = threading.Lock()
+_boards = {}
+
+
+def _board(scope):
+    """Куча ``scope`` этого процесса; перечитывается, если устарела."""
+    version = caching.feed_version(SCOPE)
+    with _lock:
+        board = _boards.get(scope)
+        if (board is None or board.version != version
+                or time.monotonic() - board.loaded
+                > settings.TRENDING_REFRESH):
+            board = Board(settings.TRENDING_SIZE)
+            model = Post if scope == POSTS else Group
+            board.fill(model.objects.filter(trend__gt=0)
+                       .order_by("-trend")
+                       .values_list("pk", "trend")[:board.size])
+            board.loaded = time.monotonic()
+            board.version = version
+            _boards[scope] = board
+        return board
+
+
+def _offer(scope, pk, trend):
+    with _lock:
+        board = _boards.get(scope)
+        if board is not None and pk is not None:
+            board.offer(pk, trend)
+
+
+def top_posts():
+    """id лучших постов по убыванию оценки."""
+    board = _board(POSTS)
+    with _lock:
+        return board.top()
+
+
+def top_groups():
+    board = _board(GROUPS)
+    with _lock:
+        return board.top()
+
+
+def record_post(post):
+    """Учесть новый пост в оценках поста и его группы."""
+    trend = event_trend(settings.TRENDING_POST_WEIGHT, post.pub_date)
+    Post.objects.filter(pk=post.pk).update(trend=_added(trend))
+    if post.group_id is not None:
+        Group.objects.filter(pk=post.group_id).update(trend=_added(trend))
+    _refresh(post.pk)
+
+
+def record_comment(comment):
+    """Учесть комментарий в оценках поста и его группы."""
+    trend = event_trend(settings.TRENDING_COMMENT_WEIGHT, comment.created)
+    Post.objects.filter(pk=comment.post_id).update(trend=_added(trend))
+    Group.objects.filter(posts__id=comment.post_id).update(
+        trend=_added(trend))
+    _refresh(comment.post_id)
+
+
+def _refresh(post_id):
+    row = (Post.objects.filter(pk=post_id)
+           .values_list("trend", "group_id", "group__trend").first())
+    if row is None:
+        return
+    post_trend, group_id, group_trend = row
+    _offer(POSTS, post_id, post_trend)
+    _offer(GROUPS, group_id, group_trend)
+
+
+def forget_post(post_id):
+    with _lock:
+        board = _boards.get(POSTS)
+        if board is not None:
+            board.remove(post_id)
+
+
+@transaction.atomic
+def recompute(now=None):
+    """Пересчитать оценки по событиям окна; вернуть число постов и групп.
+
+    Оценки одним проходом по постам и одним по комментариям окна
+    складываются в словари и записываются пачками ``bulk_update``.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    posts = defaultdict(float)
+    groups = defaultdict(float)
+    events = [
+        (Post.objects.values_list("pk", "group_id", "pub_date"),
+         "pub_date", settings.TRENDING_POST_WEIGHT),
+        (Comment.objects.values_list("post_id", "post__group_id", "created"),
+         "created", settings.TRENDING_COMMENT_WEIGHT),
+    ]
+    for queryset, field, weight in events:
+        rows = queryset.filter(**{f"{field}__gte": since}).order_by()
+        for post_id, group_id, when in rows.iterator():
+            # Оценка на момент now; ниже она переводится в trend.
+            value = weight * math.exp((when.timestamp() - now.timestamp())
+                                      * rate())
+            posts[post_id] += value
+            if group_id is not None:
+                groups[group_id] += value
+    offset = now.timestamp() * rate()
+    for model, scores in ((Post, posts), (Group, groups)):
+        model.objects.bulk_update(
+            [model(pk=pk, trend=math.log(value) + offset)
+             for pk, value in scores.items()],
+            ["trend"], batch_size=BATCH_SIZE)
+    caching.bump(SCOPE)
+    return len(posts), len(groups)
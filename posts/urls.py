@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -9,6 +9,15 @@ urlpatterns = [
     path("404/", views.page_not_found, name="404"),
     path("500/", views.server_error, name="500"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
+    path("trending/", views.trending_index, name="trending"),
+    path("profiling/", views.profiling_dashboard, name="profiling"),
+    path("profiling/metrics/", views.profiling_metrics,
+         name="profiling_metrics"),
+    path("api/posts/", api.index, name="api_index"),
+    path("api/group/<slug:slug>/posts/", api.group_posts, name="api_group"),
+    path("api/users/<str:username>/posts/", api.profile,
+         name="api_profile"),
     path("<str:username>/", views.profile, name="profile"),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
     path(
@@ -18,6 +27,8 @@ urlpatterns = [
     ),
     path("<username>/<int:post_id>/comment/",
          views.add_comment, name="add_comment"),
+    path("<str:username>/<int:post_id>/comments/",
+         views.post_comments, name="post_comments"),
     path("<str:username>/follow/", views.profile_follow,
          name="profile_follow"),
     path("<str:username>/unfollow/", views.profile_unfollow,
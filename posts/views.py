@@ -1,53 +1,148 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import get_template, render_to_string
+from django.utils.http import urlencode
+from django.views.decorators.http import require_safe
 
-from .models import Follow, Group, Post
+from . import caching, graph, profiling, suggestions, trending
+from .conditional import (cached_page, group_etag, index_etag, post_etag,
+                          profile_etag)
+from .feed import FOLLOW_ORDERING, follow_feed
+from .models import Follow, Group, Post, UserStats
 from .forms import CommentForm, PostForm
+from .pagination import (FORWARD, CursorPaginator, estimate_rows,
+                         legacy_page_redirect, paginate)
+from .search import SearchResults
 
 User = get_user_model()
 
+# Подгружаемые комментарии отдаются серверу пачками этого размера.
+COMMENT_CHUNK_SIZE = 10
 
+
+@cached_page(index_etag)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.ITEMS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(request, "index.html", {"page": page, "paginator": paginator})
+    post_list = Post.objects.select_related("author", "group")
+    legacy_redirect = legacy_page_redirect(request, post_list)
+    if legacy_redirect:
+        return legacy_redirect
+    paginator, page = paginate(
+        request, post_list, lambda: estimate_rows(Post))
+    feed_version = caching.feed_version(caching.ALL_POSTS)
+    return render(request, "index.html", {"page": page, "paginator": paginator,
+                                          "feed_version": feed_version})
 
 
+@cached_page(group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, settings.ITEMS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts = group.posts.select_related("author")
+    legacy_redirect = legacy_page_redirect(request, posts)
+    if legacy_redirect:
+        return legacy_redirect
+    # Статистика индекса знает только среднее число постов в группе,
+    # поэтому без оценки: число страниц уточняется проверкой следующей.
+    paginator, page = paginate(request, posts)
+    feed_version = caching.feed_version(caching.group_scope(group.id))
     return render(request, "group.html", {"group": group,
-                                          "page": page, "paginator": paginator})
+                                          "page": page, "paginator": paginator,
+                                          "feed_version": feed_version})
 
 
+@cached_page(profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, settings.ITEMS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = request.user.is_authenticated and Follow.objects.filter(author=author, user=request.user).exists()
-    return render(request, "profile.html", {"author": author,
-                                            "page": page,
-                                            "paginator": paginator, "following": following})
+    author = get_object_or_404(User.objects.select_related("stats"),
+                               username=username)
+    posts = author.posts.select_related("group")
+    legacy_redirect = legacy_page_redirect(request, posts)
+    if legacy_redirect:
+        return legacy_redirect
+    paginator, page = paginate(request, posts,
+                               lambda: _posts_count(author))
+    following = graph.is_following(request.user, author.id)
+    followed_by, followed_by_more = [], 0
+    if request.user.is_authenticated and request.user != author:
+        followed_by, total = graph.followed_by_followees(request.user.id,
+                                                         author.id)
+        followed_by_more = total - len(followed_by)
+    suggested_authors, suggested_groups = suggestions.for_user(
+        request.user, exclude=author.id)
+    feed_version = caching.feed_version(caching.author_scope(author.id))
+    return render(request, "profile.html",
+                  {"author": author, "page": page, "paginator": paginator,
+                   "following": following,
+                   "followed_by": followed_by,
+                   "followed_by_more": followed_by_more,
+                   "suggested_authors": suggested_authors,
+                   "suggested_groups": suggested_groups,
+                   "feed_version": feed_version})
+
 
+def _posts_count(author):
+    # Строки счётчиков может не быть до запуска reconcile_counters:
+    # тогда число постов оценит ProbedFeed.
+    try:
+        return author.stats.posts_count
+    except UserStats.DoesNotExist:
+        return None
 
+
+@cached_page(post_etag)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"),
+        id=post_id, author__username=username)
     form = CommentForm()
-    comments = post.comments.all()
+    comments = comment_paginator(post).get_page(request.GET.get("comments"))
     return render(request, "post.html", {"author": post.author,
                                          "post": post,
                                          "form": form,
-                                         "comments": comments.all()})
+                                         "comments": comments})
+
+
+def comment_paginator(post):
+    """Комментарии поста по ключу ``(created, id)`` вместе с авторами."""
+    return CursorPaginator(post.comments.select_related("author"),
+                           settings.COMMENTS_PER_PAGE,
+                           ordering=("created", "id"))
+
+
+@require_safe
+def post_comments(request, username, post_id):
+    """Следующая пачка комментариев поста для подгрузки на его странице."""
+    post = get_object_or_404(Post.objects.select_related("author"),
+                             id=post_id, author__username=username)
+    paginator = comment_paginator(post)
+    rows = paginator.forward_rows(request.GET.get("cursor"))
+    return StreamingHttpResponse(_comment_stream(post, paginator, rows))
+
+
+def _comment_stream(post, paginator, rows):
+    template = get_template("includes/comment.html")
+    chunk = []
+    count = 0
+    last = None
+    for item in rows.iterator(chunk_size=settings.COMMENTS_PER_PAGE):
+        count += 1
+        if count > paginator.per_page:
+            break
+        last = item
+        chunk.append(template.render({"item": item}))
+        if len(chunk) >= COMMENT_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk)
+    if count > paginator.per_page:
+        yield render_to_string("includes/comments_more.html", {
+            "post": post,
+            "cursor": paginator.encode_cursor(FORWARD, last),
+        })
 
 
 def post_edit(request, username, post_id):
@@ -67,9 +162,10 @@ def post_edit(request, username, post_id):
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == "POST" and form.is_valid():
-        post = form.save(commit=False)
-        post.author = request.user
-        form.save()
+        with transaction.atomic():
+            post = form.save(commit=False)
+            post.author = request.user
+            form.save()
         return redirect("index")
     return render(request, "new.html", {"form": form})
 
@@ -77,12 +173,15 @@ def new_post(request):
 @login_required
 def add_comment(request, username, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"),
+        id=post_id, author__username=username)
     if request.method == "POST" and form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        form.save()
+        with transaction.atomic():
+            comment = form.save(commit=False)
+            comment.author = request.user
+            comment.post = post
+            form.save()
         return redirect("add_comment",
                         username=username,
                         post_id=post.id)
@@ -93,15 +192,45 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user).all()
-    paginator = Paginator(post_list, settings.ITEMS_PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = follow_feed(request.user).select_related("author", "group")
+    legacy_redirect = legacy_page_redirect(request, post_list,
+                                           FOLLOW_ORDERING)
+    if legacy_redirect:
+        return legacy_redirect
+    paginator, page = paginate(request, post_list, ordering=FOLLOW_ORDERING)
+    feed_version = caching.feed_version(caching.ALL_POSTS,
+                                        caching.follows_scope(request.user.id))
+    suggested_authors, suggested_groups = suggestions.for_user(request.user)
     return render(request, "follow.html",
-                  {"page": page, "paginator": paginator})
+                  {"page": page, "paginator": paginator,
+                   "feed_version": feed_version,
+                   "suggested_authors": suggested_authors,
+                   "suggested_groups": suggested_groups})
+
+
+def trending_index(request):
+    """Обсуждаемые посты и группы: K id из куч posts.trending и K строк."""
+    post_ids = trending.top_posts()
+    group_ids = trending.top_groups()
+    posts = Post.objects.select_related("author", "group").in_bulk(post_ids)
+    groups = Group.objects.in_bulk(group_ids)
+    return render(request, "trending.html", {
+        "posts": [posts[pk] for pk in post_ids if pk in posts],
+        "groups": [groups[pk] for pk in group_ids if pk in groups],
+    })
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    paginator = Paginator(SearchResults(query), settings.ITEMS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("page"))
+    return render(request, "search.html",
+                  {"query": query, "page": page, "paginator": paginator,
+                   "page_query": urlencode({"q": query}) + "&"})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -110,11 +239,34 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
-    get_object_or_404(Follow, user=request.user, author__username=username).delete()
+    get_object_or_404(Follow, user=request.user,
+                      author__username=username).delete()
     return redirect("profile", username=username)
 
 
+@staff_member_required
+def profiling_dashboard(request):
+    view = request.GET.get("view")
+    return render(request, "misc/profiling.html",
+                  {"rows": profiling.snapshot(), "view": view,
+                   "report": profiling.profile_report(view) if view else ""})
+
+
+def profiling_metrics(request):
+    token = settings.PROFILING_METRICS_TOKEN
+    authorized = (
+        (token and request.META.get("HTTP_AUTHORIZATION")
+         == f"Bearer {token}")
+        or (request.user.is_active and request.user.is_staff)
+    )
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(profiling.prometheus(),
+                        content_type="text/plain; version=0.0.4")
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
 from django.views.generic import CreateView
 
 from django.urls import reverse_lazy
@@ -9,3 +12,15 @@ class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy("signup")
     template_name = "signup.html"
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        user = self.object
+        if user.email:
+            # EMAIL_BACKEND ставит письмо в очередь задач, ответ его не ждёт.
+            context = {"user": user, "login_url":
+                       self.request.build_absolute_uri(settings.LOGIN_URL)}
+            send_mail("Добро пожаловать в Yatube",
+                      render_to_string("signup_email.txt", context),
+                      None, [user.email])
+        return response
@@ -0,0 +1,3 @@
+# yatube.settings — настройки для разработки, как и до разделения на
+# base, dev и prod.
+from .dev import *  # noqa: F401,F403
@@ -0,0 +1,357 @@
+"""
+Django settings for yatube project.
+
+Generated by 'django-admin startproject' using Django 2.2.
+
+Общие настройки. Для разработки — yatube.settings.dev (он же
+yatube.settings), для рабочих серверов — yatube.settings.prod.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'u)xs0%$l-%c5y&nc(cnk&g86t6ciq$e9qj7ou*h3x!cu%&s6ue'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    "*",
+    "localhost",
+    "127.0.0.1",
+    "[::1]",
+    "testserver",
+]
+
+# Application definition
+
+INSTALLED_APPS = [
+    'about',
+    'users',
+    'posts',
+    'django.contrib.admin',
+
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'bootstrap',
+    # 'django-staticfiles-bootstrap',
+
+]
+
+MIDDLEWARE = [
+    'posts.profiling.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'posts.routers.ReplicaMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Без DEBUG шаблоны разбираются один раз на процесс (cached.Loader), а
+# wsgi.py разбирает их все при запуске рабочего процесса
+# (posts.template_cache). В dev.py изменения шаблонов видны сразу.
+TEMPLATE_CACHE = True
+TEMPLATE_WARMUP = TEMPLATE_CACHE
+
+
+def templates(cached):
+    """Значение TEMPLATES с cached.Loader или без него."""
+    return [
+        {
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [TEMPLATES_DIR],
+            'OPTIONS': {
+                'context_processors': [
+                    'django.template.context_processors.debug',
+                    'django.template.context_processors.request',
+                    'django.contrib.auth.context_processors.auth',
+                    'django.contrib.messages.context_processors.messages',
+                ],
+                'loaders': (
+                    [('django.template.loaders.cached.Loader',
+                      TEMPLATE_LOADERS)]
+                    if cached else TEMPLATE_LOADERS
+                ),
+            },
+        },
+    ]
+
+
+TEMPLATES = templates(TEMPLATE_CACHE)
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# Профили базы выбираются переменной окружения YATUBE_DB_PROFILE.
+# "tuned" включает WAL, чтобы читатели не ждали писателей, держит
+# соединения открытыми между запросами и начинает транзакции с
+# BEGIN IMMEDIATE (см. yatube/sqlite3/base.py); "plain" — настройки
+# SQLite по умолчанию.
+DATABASE_NAME = os.environ.get('YATUBE_DB_NAME', os.path.join(BASE_DIR, './db.sqlite3'))
+DATABASE_PROFILES = {
+    'plain': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATABASE_NAME,
+    },
+    'tuned': {
+        'ENGINE': 'yatube.sqlite3',
+        'NAME': DATABASE_NAME,
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
+    },
+}
+DATABASE_PROFILE = os.environ.get('YATUBE_DB_PROFILE', 'tuned')
+DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+# Реплики для чтения (posts.routers): пути к файлам через запятую в
+# YATUBE_DB_REPLICAS. Локально их заполняет команда replicate_sqlite.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['posts.routers.ReplicaRouter']
+# Сколько секунд после POST пользователь читает с основной базы.
+REPLICA_STICKY_SECONDS = 5
+# Фрагменты лент, собранные по данным реплики, живут не дольше этого:
+# реплика могла отставать от смены поколения ленты.
+REPLICA_CACHE_TIMEOUT = 60
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = "/static/"
+STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# STATICFILES_DIRS = [
+#     os.path.join(BASE_DIR, 'static'),
+#     os.path.join(BASE_DIR, '../venv/bootstrap/static'),
+# ]
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+LOGIN_URL = "/auth/login/"
+LOGIN_REDIRECT_URL = "index"
+LOGOUT_REDIRECT_URL = "index"
+# Письма ставятся в очередь задач (posts.tasks) и отправляются уже из
+# неё через EMAIL_DELIVERY_BACKEND, не задерживая ответ на запрос.
+EMAIL_BACKEND = "posts.mail.QueuedEmailBackend"
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+# Профиль кэша выбирается переменной окружения YATUBE_CACHE.
+# locmem — кэш внутри процесса, годится для runserver и тестов;
+# file и db — общий кэш для всех воркеров на одной машине без внешних
+# сервисов (для db нужно выполнить `manage.py createcachetable`);
+# memcached и redis — внешние серверы по адресу YATUBE_CACHE_LOCATION.
+CACHE_PROFILES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'posts.cache_backends.FileBasedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+    'redis': {
+        # Нужен пакет django-redis.
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION',
+                                   'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHE_PROFILE = os.environ.get('YATUBE_CACHE', 'locmem')
+CACHES = {
+    'default': CACHE_PROFILES[CACHE_PROFILE],
+}
+
+ITEMS_PER_PAGE = 10
+# Комментариев на странице поста и в одной подгружаемой пачке.
+COMMENTS_PER_PAGE = 50
+# Миниатюры изображений постов строятся заранее (posts.thumbnails).
+# Форматы перечислены по убыванию предпочтения, последний — запасной
+# для браузеров без поддержки остальных; неподдерживаемые Pillow
+# форматы пропускаются.
+POST_THUMBNAILS = {
+    "card": {"size": (960, 339), "centering": (0.5, 0.5)},
+}
+THUMBNAIL_FORMATS = ["avif", "webp", "jpeg"]
+THUMBNAIL_QUALITY = 85
+# Миниатюры строятся в очереди задач, а не в запросе.
+THUMBNAIL_ASYNC = True
+# Фрагменты лент сбрасываются сменой поколения (posts.caching), поэтому
+# время жизни в кэше может быть большим.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько секунд остальные процессы ждут, пока первый строит фрагмент.
+FEED_CACHE_LOCK_TIMEOUT = 5
+# "offset" — обычный Paginator с номерами страниц,
+# "keyset" — курсорная навигация ?cursor= без COUNT(*) и OFFSET.
+FEED_PAGINATION = "offset"
+# Число страниц в режиме "offset": "exact" — SELECT COUNT(*) на каждый
+# запрос, "estimated" — счётчики постов, статистика SQLite (sqlite_stat1,
+# её обновляет команда update_db_stats) и проверка, есть ли следующая
+# страница (posts.pagination.ProbedFeed).
+FEED_COUNT = "estimated"
+# Сколько секунд хранить прочитанную статистику SQLite.
+FEED_STAT_TIMEOUT = 60 * 10
+# Сколько номеров страниц показывать по обе стороны от текущей.
+FEED_PAGE_WINDOW = 3
+# Сколько секунд хранить в кэше множество авторов, на которых подписан
+# пользователь (posts.graph). Ключ меняется при каждой подписке и отписке.
+FOLLOWEES_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько авторов и групп сохраняет для пользователя команда
+# compute_suggestions и сколько из них показывают страницы.
+SUGGESTIONS_PER_USER = 10
+SUGGESTIONS_SHOWN = 5
+# Обсуждаемое (posts.trending): вес нового поста и комментария убывает
+# вдвое за TRENDING_HALF_LIFE секунд. recompute_trending пересчитывает
+# оценки по событиям последних TRENDING_WINDOW секунд.
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_WINDOW = 60 * 60 * 24 * 7
+TRENDING_POST_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 1.0
+# Сколько постов и групп держит куча процесса и показывает /trending/.
+TRENDING_SIZE = 20
+# Раз в сколько секунд процесс перечитывает кучи из базы, чтобы увидеть
+# события других процессов.
+TRENDING_REFRESH = 60
+# Посты авторов, у которых подписчиков больше этого числа, не раскладываются
+# по лентам подписчиков, а подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 5000
+# Посты авторов, у которых подписчиков больше этого числа, раскладываются
+# по лентам в очереди задач, а не в запросе.
+FEED_FANOUT_ASYNC_FROM = 100
+# Сколько последних постов автора попадает в ленту при подписке на него.
+FEED_BACKFILL_LIMIT = 100
+# Индекс поиска (posts.search): "fts5" — виртуальная таблица SQLite,
+# "table" — таблица SearchTerm, "auto" — FTS5, если таблица создана.
+SEARCH_BACKEND = "auto"
+# Больше результатов поиск не показывает.
+SEARCH_MAX_RESULTS = 1000
+# Страницы лент и постов (posts.conditional) отвечают 304 по ETag.
+# Ответы анонимам обратный прокси может хранить ANONYMOUS_CACHE_S_MAXAGE
+# секунд, браузер — ANONYMOUS_CACHE_MAX_AGE без сверки с сервером.
+ANONYMOUS_CACHE_MAX_AGE = 0
+ANONYMOUS_CACHE_S_MAXAGE = 30
+# Версия выкладки входит в ETag страниц: после обновления шаблонов старые
+# копии в кэшах не подходят.
+RELEASE = os.environ.get('YATUBE_RELEASE', '')
+# JSON API лент (posts.api): наибольший ?limit= одной страницы. Страница
+# отдаётся потоком, поэтому память от него не зависит.
+API_MAX_PAGE_SIZE = 10000
+
+# Очередь фоновых задач в базе (posts.tasks). "sync" — выполнять сразу,
+# "thread" — в потоках процесса после коммита, "worker" — только
+# в отдельном процессе `manage.py run_tasks`.
+TASKS_MODE = os.environ.get('YATUBE_TASKS_MODE', 'thread')
+# Потоков на процесс в режиме "thread" и по умолчанию у run_tasks.
+TASKS_CONCURRENCY = 2
+TASKS_MAX_ATTEMPTS = 5
+# Пауза перед первым повтором упавшей задачи, дальше она удваивается.
+TASKS_RETRY_DELAY = 10
+TASKS_RETRY_MAX_DELAY = 60 * 60
+# Как часто run_tasks проверяет пустую очередь, секунд.
+TASKS_POLL_INTERVAL = 1
+# Задача, блокировку которой обработчик не продлевал дольше, считается
+# брошенной.
+TASKS_LOCK_TIMEOUT = 60 * 10
+
+# Профилирование запросов (posts.profiling): гистограммы времени по
+# страницам всегда, профиль cProfile — для доли запросов.
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILING_SAMPLE_RATE', 0.002))
+# Сколько последних профилей каждой страницы хранить для отчёта.
+PROFILING_KEEP = 50
+PROFILING_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Токен для сборщика Prometheus: заголовок "Authorization: Bearer <токен>".
+# Без токена метрики видит только персонал.
+PROFILING_METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
+# Запуск рабочего процесса (команда bench_startup): сколько миллисекунд
+# может занимать импорт модулей и какие модули при запуске с
+# yatube.settings.prod загружаться не должны — они нужны только для
+# разработки или при первом обращении к изображениям.
+STARTUP_IMPORT_BUDGET_MS = 1000
+STARTUP_FORBIDDEN_MODULES = [
+    "debug_toolbar",
+    "sorl",
+    "fontawesome",
+    "PIL",
+    "pkg_resources",
+]
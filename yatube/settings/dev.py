@@ -0,0 +1,28 @@
+"""Настройки для разработки: DEBUG, django-debug-toolbar, шаблоны
+перечитываются без перезапуска, фоновые задачи выполняются сразу."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE, templates
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + [
+    'debug_toolbar',
+]
+
+MIDDLEWARE = MIDDLEWARE + [
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+INTERNAL_IPS = [
+    "127.0.0.1",
+]
+
+TEMPLATE_CACHE = False
+TEMPLATE_WARMUP = TEMPLATE_CACHE
+TEMPLATES = templates(TEMPLATE_CACHE)
+
+# runserver и тесты выполняют задачи сразу: потоки очереди работали бы
+# с тестовой базой в памяти одновременно с тестом.
+TASKS_MODE = os.environ.get('YATUBE_TASKS_MODE', 'sync')
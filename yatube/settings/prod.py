@@ -0,0 +1,21 @@
+"""Настройки рабочих серверов.
+
+Ключ и имена хостов берутся из окружения: YATUBE_SECRET_KEY и
+YATUBE_ALLOWED_HOSTS (через запятую). Приложения и промежуточные
+слои для разработки сюда не попадают и при запуске не импортируются.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = False
+
+try:
+    SECRET_KEY = os.environ['YATUBE_SECRET_KEY']
+except KeyError:
+    raise ImproperlyConfigured('Не задана переменная YATUBE_SECRET_KEY')
+
+ALLOWED_HOSTS = [host for host in os.environ.get(
+    'YATUBE_ALLOWED_HOSTS', 'localhost').split(',') if host]
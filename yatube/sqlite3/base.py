@@ -0,0 +1,32 @@
+"""SQLite с настройкой соединения для работы под нагрузкой.
+
+Дополнительные ключи ``OPTIONS``:
+
+* ``pragmas`` — словарь PRAGMA, которые выполняются на каждом новом
+  соединении (журнал WAL, ``synchronous``, ``mmap_size`` и т. п.);
+* ``transaction_mode`` — режим ``BEGIN`` для ``transaction.atomic()``.
+  С ``IMMEDIATE`` транзакция сразу берёт блокировку записи и ждёт её
+  ``busy_timeout``, а не получает «database is locked», когда читающая
+  транзакция пытается начать запись.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        self.transaction_mode = params.pop("transaction_mode", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
+        else:
+            super()._start_transaction_under_autocommit()
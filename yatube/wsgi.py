@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings.prod')
 
 application = get_wsgi_application()
+
+if settings.TEMPLATE_WARMUP:
+    # Первые запросы к страницам не ждут разбора шаблонов.
+    from posts.template_cache import warm_templates
+    warm_templates()
+
+if settings.TASKS_MODE == "thread":
+    # Задачи, оставшиеся от прошлого запуска, не ждут следующего enqueue.
+    from posts.tasks import start_threads
+    start_threads()